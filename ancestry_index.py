@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Index d'ascendance des pages / databases
+Pointeurs parent construits une fois depuis les résultats de /search
+
+Remplace les remontées récursives (un get_page par ancêtre, pour chaque
+database candidate) par un index en mémoire :
+- id → parent, alimenté par les pages et databases déjà retournées par /search
+- Racine (page top-level d'un workspace / teamspace) résolue à la demande,
+  puis mémoïsée pour tout le chemin : O(profondeur) la première fois, O(1) ensuite
+- Ancêtre absent de /search (bloc, page non partagée...) : `resolver`
+  optionnel, appelé au plus une fois par id
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Garde-fou contre un cycle dans les données
+MAX_DEPTH = 64
+
+# Types de parent Notion → clé de l'id dans l'objet "parent"
+PARENT_KEYS = {
+    "page_id": "page_id",
+    "database_id": "database_id",
+    "block_id": "block_id"
+}
+
+
+def normalize_id(notion_id: str) -> str:
+    """Id Notion sans tirets, en minuscules (les deux formes circulent)"""
+    return (notion_id or "").replace("-", "").lower()
+
+
+def item_title(item: Dict) -> str:
+    """Titre d'une page ou d'une database telle que retournée par l'API"""
+    if item.get("object") == "database":
+        return "".join(t.get("plain_text", "") for t in item.get("title", []))
+
+    for prop in item.get("properties", {}).values():
+        if prop.get("type") == "title" or "title" in prop:
+            return "".join(t.get("plain_text", "") for t in prop.get("title", []))
+    return ""
+
+
+class AncestryIndex:
+    """Index parent-pointer des objets Notion, racines mémoïsées"""
+
+    def __init__(self, resolver: Optional[Callable[[str, str], Optional[Dict]]] = None):
+        """
+        `resolver(parent_type, parent_id)` retourne l'objet Notion d'un
+        ancêtre absent de l'index (ou None). Sans resolver, la remontée
+        s'arrête au premier ancêtre inconnu.
+        """
+        self.resolver = resolver
+
+        # id → (type de parent, id du parent) ; parent None = racine workspace
+        self._parents: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._titles: Dict[str, str] = {}
+        self._roots: Dict[str, Optional[str]] = {}
+        self._resolved = set()  # Ids déjà passés au resolver
+        self._lock = threading.Lock()
+
+        self.resolver_calls = 0
+
+    @classmethod
+    def from_search(cls, *result_sets: List[Dict], resolver=None) -> "AncestryIndex":
+        """Index construit depuis un ou plusieurs résultats de /search"""
+        index = cls(resolver)
+        for results in result_sets:
+            index.add_all(results)
+        return index
+
+    def add_all(self, items: List[Dict]):
+        for item in items:
+            self.add(item)
+
+    def add(self, item: Dict):
+        """Ajoute un objet Notion (page, database ou bloc) à l'index"""
+        item_id = normalize_id(item.get("id"))
+        if not item_id:
+            return
+
+        parent = item.get("parent", {})
+        parent_type = parent.get("type", "")
+        parent_id = parent.get(PARENT_KEYS[parent_type]) if parent_type in PARENT_KEYS else None
+
+        with self._lock:
+            self._parents[item_id] = (parent_type, normalize_id(parent_id) or None)
+            title = item_title(item)
+            if title:
+                self._titles[item_id] = title
+
+    def __contains__(self, notion_id: str) -> bool:
+        return normalize_id(notion_id) in self._parents
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    def title(self, notion_id: str) -> str:
+        return self._titles.get(normalize_id(notion_id), "")
+
+    def parent_of(self, notion_id: str) -> Optional[str]:
+        """Id du parent direct (résolu via le resolver si besoin), None si racine / inconnu"""
+        entry = self._lookup(normalize_id(notion_id))
+        return entry[1] if entry else None
+
+    def _lookup(self, item_id: str, item_type: str = "page_id") -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Parent d'un id ; le resolver est appelé au plus une fois par id inconnu.
+        `item_type` : type de l'id tel que vu par son enfant (page_id, block_id...)
+        """
+        entry = self._parents.get(item_id)
+        if entry is not None or self.resolver is None:
+            return entry
+
+        with self._lock:
+            if item_id in self._resolved:
+                return self._parents.get(item_id)
+            self._resolved.add(item_id)
+
+        self.resolver_calls += 1
+        item = self.resolver(item_type, item_id)
+        if item:
+            self.add(item)
+        return self._parents.get(item_id)
+
+    def ancestors(self, notion_id: str) -> List[str]:
+        """Chaîne des ancêtres, du parent direct à la racine connue"""
+        chain = []
+        current = normalize_id(notion_id)
+        current_type = "page_id"
+        for _ in range(MAX_DEPTH):
+            entry = self._lookup(current, current_type)
+            if not entry or not entry[1]:
+                break
+            current_type, current = entry
+            chain.append(current)
+        return chain
+
+    def root_of(self, notion_id: str) -> Optional[str]:
+        """
+        Racine d'un objet : la page top-level (parent workspace) qui le contient.
+        None si la chaîne est coupée par un ancêtre introuvable.
+        """
+        start = normalize_id(notion_id)
+        if start in self._roots:
+            return self._roots[start]
+
+        # Remontée jusqu'à une racine (ou un nœud déjà mémoïsé)
+        path = []
+        current = start
+        current_type = "page_id"
+        root = None
+        for _ in range(MAX_DEPTH):
+            if current in self._roots:
+                root = self._roots[current]
+                break
+            path.append(current)
+
+            entry = self._lookup(current, current_type)
+            if entry is None:
+                break  # Ancêtre inconnu : chaîne coupée
+            parent_type, parent_id = entry
+            if parent_type == "workspace":
+                root = current
+                break
+            if not parent_id:
+                break
+            current_type, current = parent_type, parent_id
+
+        # Tout le chemin partage la même racine
+        with self._lock:
+            for node in path:
+                self._roots[node] = root
+        return root
+
+    def is_descendant(self, notion_id: str, ancestor_id: str) -> bool:
+        """True si `ancestor_id` est un ancêtre (direct ou non) de `notion_id`"""
+        return normalize_id(ancestor_id) in self.ancestors(notion_id)
+
+    def roots(self) -> Dict[str, str]:
+        """Racines connues : id → titre"""
+        return {
+            item_id: self._titles.get(item_id, "")
+            for item_id, (parent_type, _) in self._parents.items()
+            if parent_type == "workspace"
+        }
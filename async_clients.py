@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Clients asynchrones (asyncio)
+Équivalents non bloquants de NotionClient et SiYuanClient
+
+Toutes les requêtes tournent sur une seule boucle asyncio :
+- Des milliers de fetchs / écritures en vol sur un seul cœur, sans thread
+- Sémaphore de concurrence par hôte (ASYNC_MAX_PER_HOST)
+- Même rate limiter (bucket partagé) et même cache disque que les clients bloquants
+- Lectures disque (cache SQLite, snapshot gzip) dans des threads (asyncio.to_thread) :
+  elles ne bloquent jamais la boucle
+- Nécessite httpx (optionnel) : pip install httpx
+"""
+
+import asyncio
+import os
+import time
+from itertools import islice
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401 (requis par httpx pour HTTP/2)
+except ImportError:
+    h2 = None
+
+from ancestry_index import AncestryIndex
+from http_session import Config as HttpConfig, notify_request, register_session
+from notion_cache import get_cache
+from notion_fixtures import AsyncFixtureSession, fixture_limiter, get_fixture_session
+from notion_snapshot import get_snapshot
+from rate_limiter import ConnectError, notion_limiter, siyuan_limiter
+from import_data_to_siyuan import Config as NotionConfig, NotionClient, NotionFetchError, SiYuanClient
+from extract_by_workspace import NotionClient as WorkspaceNotionClient
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    # Requêtes en vol max par hôte (le débit reste borné par rate_limiter.py)
+    ASYNC_MAX_PER_HOST = int(os.getenv("ASYNC_MAX_PER_HOST", "64"))
+
+# =============================================================================
+# SESSION ASYNC
+# =============================================================================
+
+class AsyncSession:
+    """Client httpx.AsyncClient partagé, avec un sémaphore par hôte"""
+
+    def __init__(self, name: str, max_per_host: int = None):
+        if httpx is None:
+            raise ImportError("Le mode async nécessite httpx : pip install httpx")
+
+        self.name = name
+        self.max_per_host = max(1, max_per_host or Config.ASYNC_MAX_PER_HOST)
+        self.requests = 0
+        self.connections = 0  # Nouvelles connexions TCP (via trace)
+
+        self.http2 = HttpConfig.HTTP2 and h2 is not None
+
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(HttpConfig.HTTP_READ_TIMEOUT, connect=HttpConfig.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=None,  # Borné par les sémaphores par hôte
+                max_keepalive_connections=self.max_per_host if HttpConfig.HTTP_KEEP_ALIVE else 0
+            )
+        )
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+    async def request(self, method: str, url: str, headers: Dict = None, **kwargs):
+        """Envoie une requête (attend une place libre pour cet hôte)"""
+        async with self._semaphore(url):
+            self.requests += 1
+            start = time.perf_counter()
+            response = None
+            kwargs.setdefault("extensions", {"trace": self._trace})
+            try:
+                response = await self._client.request(method, url, headers=headers, **kwargs)
+                return response
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                raise ConnectError(str(e)) from e
+            except httpx.TransportError as e:
+                # Même contrat que requests (OSError) pour rate_limiter.py
+                raise ConnectionError(str(e)) from e
+            finally:
+                notify_request(self.name, method, url, response, time.perf_counter() - start)
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def _trace(self, event_name: str, info: Dict):
+        """Hook httpcore (async) : compte les nouvelles connexions TCP"""
+        if event_name == "connection.connect_tcp.complete":
+            self.connections += 1
+
+    def stats(self) -> Dict:
+        """Même format que PooledSession.stats() (pour print_pool_stats)"""
+        return {
+            "backend": "httpx/async/h2" if self.http2 else "httpx/async",
+            "pool_size": self.max_per_host,
+            "keep_alive": HttpConfig.HTTP_KEEP_ALIVE,
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "connections_reused": max(0, self.requests - self.connections)
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+
+# =============================================================================
+# REGISTRE PARTAGÉ (une session par service, pour la boucle courante)
+# =============================================================================
+
+_sessions: Dict[str, AsyncSession] = {}
+
+
+def get_async_session(name: str) -> AsyncSession:
+    """Retourne la session async partagée d'un service (créée au premier appel)"""
+    if name not in _sessions:
+        _sessions[name] = AsyncSession(name)
+        # Visible dans pool_stats() / print_pool_stats(), y compris après fermeture
+        register_session(f"{name} (async)", _sessions[name])
+    return _sessions[name]
+
+
+async def close_async_sessions():
+    """Ferme toutes les sessions async (à appeler avant la fin de la boucle)"""
+    for session in _sessions.values():
+        await session.aclose()
+    _sessions.clear()
+
+# =============================================================================
+# CLIENTS API
+# =============================================================================
+
+class AsyncNotionClient:
+    """Client async pour l'API Notion"""
+
+    NO_DESCEND_TYPES = NotionClient.NO_DESCEND_TYPES
+
+    def __init__(self, token: str, max_depth: int = 10):
+        self.base_url = NotionConfig.NOTION_API_URL
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Notion-Version": "2022-06-28",
+            "Content-Type": "application/json"
+        }
+        self.max_depth = max_depth
+        if NotionConfig.NOTION_FIXTURES:
+            self.http = AsyncFixtureSession(get_fixture_session(NotionConfig.NOTION_FIXTURES))
+            self.rate_limiter = fixture_limiter()
+        else:
+            self.http = get_async_session("Notion")
+            self.rate_limiter = notion_limiter()
+        self.cache = get_cache()
+        self.offline = bool(self.cache and self.cache.offline) or get_snapshot() is not None
+
+        # Replay offline ou snapshot : le client bloquant lit le disque, dans un thread
+        self.blocking = NotionClient(token) if self.offline else None
+
+        # /search mémoïsé : les appels concurrents attendent la même passe
+        self._search_tasks: Dict[str, asyncio.Task] = {}
+
+    async def _request(self, method: str, path: str, **kwargs):
+        return await self.rate_limiter.call_async(lambda: self.http.request(
+            method, f"{self.base_url}{path}", headers=self.headers, **kwargs
+        ))
+
+    async def iter_database(self, database_id: str, limit: int = 0,
+                            edited_since: Optional[str] = None, status: Dict = None):
+        """Itère sur les entrées d'une database (voir NotionClient.iter_database)"""
+        if status is None:
+            status = {}
+        status["complete"] = False
+
+        if self.offline:
+            # Lecture par lots de 100 (une page de query) hors de la boucle
+            entries = self.blocking.iter_database(database_id, limit, edited_since, status)
+            while True:
+                batch = await asyncio.to_thread(lambda: list(islice(entries, 100)))
+                if not batch:
+                    return
+                for entry in batch:
+                    yield entry
+
+        cacheable = self.cache is not None and limit == 0 and not edited_since
+        if cacheable:
+            await asyncio.to_thread(self.cache.invalidate_query, database_id)
+
+        count = 0
+        pages = 0
+        has_more = True
+        start_cursor = None
+
+        while has_more:
+            page_size = min(100, limit - count) if limit > 0 else 100
+            payload = {"page_size": page_size}
+            if start_cursor:
+                payload["start_cursor"] = start_cursor
+            if edited_since:
+                payload["filter"] = {
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": edited_since}
+                }
+
+            response = await self._request("POST", f"/databases/{database_id}/query", json=payload)
+
+            if response.status_code != 200:
+                print(f"❌ Erreur query database: {response.status_code} ({count} entrées partielles)")
+                return
+
+            data = response.json()
+            batch = data.get("results", [])
+            has_more = data.get("has_more", False)
+            start_cursor = data.get("next_cursor")
+
+            if cacheable:
+                await asyncio.to_thread(self.cache.put, "query_page", f"{database_id}:{pages}", batch)
+            pages += 1
+
+            for entry in batch:
+                yield entry
+                count += 1
+
+            if limit > 0 and count >= limit:
+                return
+
+        status["complete"] = True
+
+        if cacheable:
+            await asyncio.to_thread(self.cache.put, "query", database_id, {"pages": pages, "entries": count})
+
+    async def query_database(self, database_id: str, limit: int = 0,
+                             edited_since: Optional[str] = None) -> List[Dict]:
+        """Récupère toutes les entrées d'une database dans une liste"""
+        return [entry async for entry in self.iter_database(database_id, limit, edited_since)]
+
+    async def get_block_children(self, block_id: str) -> List[Dict]:
+        """Récupère tous les blocs enfants directs (lève NotionFetchError en cas d'échec)"""
+        blocks = []
+        has_more = True
+        start_cursor = None
+
+        while has_more:
+            params = {"page_size": 100}
+            if start_cursor:
+                params["start_cursor"] = start_cursor
+
+            response = await self._request("GET", f"/blocks/{block_id}/children", params=params)
+
+            if response.status_code != 200:
+                raise NotionFetchError(f"blocs {block_id}: HTTP {response.status_code} ({len(blocks)} blocs lus)")
+
+            data = response.json()
+            blocks.extend(data.get("results", []))
+
+            has_more = data.get("has_more", False)
+            start_cursor = data.get("next_cursor")
+
+        return blocks
+
+    async def get_block_tree(self, block_id: str, last_edited_time: str = None) -> List[Dict]:
+        """Arbre complet des blocs : chaque niveau est récupéré en une vague de coroutines"""
+        if self.offline:
+            return await asyncio.to_thread(self.blocking.get_block_tree, block_id, self.max_depth, last_edited_time)
+
+        if self.cache and last_edited_time:
+            cached = await asyncio.to_thread(self.cache.get, "blocks", block_id, last_edited_time)
+            if cached is not None:
+                return cached
+
+        tree = await self.get_block_children(block_id)
+        level = tree
+        depth = 1
+
+        while level and depth < self.max_depth:
+            parents = [
+                block for block in level
+                if block.get("has_children") and block.get("type") not in self.NO_DESCEND_TYPES
+            ]
+            if not parents:
+                break
+
+            children = await asyncio.gather(*(self.get_block_children(block["id"]) for block in parents))
+
+            level = []
+            for block, block_children in zip(parents, children):
+                block["children"] = block_children
+                level.extend(block_children)
+            depth += 1
+
+        if self.cache and last_edited_time:
+            await asyncio.to_thread(self.cache.put, "blocks", block_id, tree, last_edited_time)
+
+        return tree
+
+    async def get_page_content(self, page_id: str, last_edited_time: str = None) -> str:
+        """Récupère le contenu Markdown d'une page"""
+        tree = await self.get_block_tree(page_id, last_edited_time)
+        return NotionClient.render_markdown(tree)
+
+    async def search(self, object_type: str) -> List[Dict]:
+        """Résultat complet de /search pour un type d'objet (une seule passe par process)"""
+        task = self._search_tasks.get(object_type)
+        if task is None:
+            task = self._search_tasks[object_type] = asyncio.ensure_future(self._crawl_search(object_type))
+        return await task
+
+    async def _crawl_search(self, object_type: str) -> List[Dict]:
+        """Pagine /search pour un type d'objet ("page" ou "database")"""
+        if self.offline:
+            # Snapshot sans cache disque : pas de /search rejouable
+            results = None
+            if self.cache is not None:
+                results = await asyncio.to_thread(self.cache.get, "search", object_type)
+            if results is None:
+                print(f"⚠️  /search {object_type} absent du cache (offline)")
+            return results or []
+
+        results = []
+        has_more = True
+        start_cursor = None
+        complete = False
+
+        while has_more:
+            payload = {
+                "filter": {"property": "object", "value": object_type},
+                "page_size": 100
+            }
+            if start_cursor:
+                payload["start_cursor"] = start_cursor
+
+            response = await self._request("POST", "/search", json=payload)
+
+            if response.status_code != 200:
+                print(f"❌ Erreur Notion API: {response.status_code}")
+                break
+
+            data = response.json()
+            results.extend(data.get("results", []))
+
+            has_more = data.get("has_more", False)
+            start_cursor = data.get("next_cursor")
+            complete = not has_more
+
+        if self.cache and complete:
+            await asyncio.to_thread(self.cache.put, "search", object_type, results, version=str(time.time()))
+
+        return results
+
+    async def list_workspaces(self) -> List[Dict]:
+        """Liste tous les workspaces accessibles"""
+        return WorkspaceNotionClient.group_workspaces(await self.search("page"))
+
+    async def search_databases(self, workspace_filter: Optional[str] = None) -> List[Dict]:
+        """Récupère toutes les databases (filtrées par workspace si demandé)"""
+        databases = await self.search("database")
+        if workspace_filter:
+            # Index sans resolver : les ancêtres hors /search coupent la chaîne
+            index = AncestryIndex.from_search(await self.search("page"), databases)
+            databases = WorkspaceNotionClient.filter_by_workspace(databases, workspace_filter, index)
+        return databases
+
+
+class AsyncSiYuanClient:
+    """Client async pour l'API SiYuan"""
+
+    def __init__(self, url: str, token: str):
+        self.url = url
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Content-Type": "application/json"
+        }
+        self.http = get_async_session("SiYuan")
+        self.rate_limiter = siyuan_limiter()
+
+    async def _call_api(self, endpoint: str, data: Dict = None) -> Dict:
+        """Appel générique à l'API SiYuan (voir SiYuanClient._call_api)"""
+        response = await self.rate_limiter.call_async(lambda: self.http.post(
+            f"{self.url}/api{endpoint}",
+            headers=self.headers,
+            json=data or {}
+        ), idempotent=endpoint not in SiYuanClient.NOT_IDEMPOTENT)
+
+        if response.status_code != 200:
+            print(f"❌ Erreur SiYuan API {endpoint}: {response.status_code}")
+            return {"code": -1, "msg": "Error", "data": None}
+
+        return response.json()
+
+    async def create_document(self, notebook_id: str, path: str, markdown: str) -> Optional[str]:
+        """Crée un document dans SiYuan"""
+        result = await self._call_api("/filetree/createDocWithMd", {
+            "notebook": notebook_id,
+            "path": path,
+            "markdown": markdown
+        })
+
+        if result.get("code") == 0:
+            return result.get("data")
+        return None
+
+    async def set_block_attrs(self, block_id: str, attrs: Dict[str, str]) -> bool:
+        """Définit les attributes d'un bloc"""
+        result = await self._call_api("/attr/setBlockAttrs", {
+            "id": block_id,
+            "attrs": attrs
+        })
+
+        return result.get("code") == 0
+
+    async def get_block_attrs(self, block_id: str) -> Dict:
+        """Récupère les attributes d'un bloc"""
+        result = await self._call_api("/attr/getBlockAttrs", {
+            "id": block_id
+        })
+
+        if result.get("code") == 0:
+            return result.get("data", {})
+        return {}
+
+    async def set_blocks_attrs(self, items: List[tuple]) -> bool:
+        """Attributes de plusieurs blocs en une requête (voir SiYuanClient.set_blocks_attrs)"""
+        operations = [
+            {"action": "updateAttrs", "id": block_id, "data": {"old": {}, "new": attrs}}
+            for block_id, attrs in items
+        ]
+        result = await self._call_api("/transactions", {
+            "session": "notion-migrator",
+            "app": "notion-migrator",
+            "reqId": int(time.time() * 1000),
+            "transactions": [{"doOperations": operations, "undoOperations": []}]
+        })
+
+        return result.get("code") == 0
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Benchmark de bout en bout de l'import
+Extraction + DataImporter contre les serveurs mock (mock_servers.py)
+
+Pour chaque taille de database :
+- Lance un mock Notion (workspace synthétique) et un mock SiYuan en sous-processus
+- Lance l'import complet dans un sous-processus neuf (RSS mesurée proprement)
+- Mesure entrées/s, latences p50 / p99 par service, pic de RSS, requêtes envoyées
+
+Usage :
+    python3 benchmark_import.py                          # 1k et 10k entrées
+    python3 benchmark_import.py --sizes 1000,10000,100000
+    python3 benchmark_import.py --siyuan-latency-ms 20 --error-rate 0.01 --async
+    python3 benchmark_import.py --fixtures fixtures/ --notion-latency-ms 150
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    OUTPUT_DIR = "migration_output"
+    NOTEBOOK_ID = "20250101000000-benchmk"
+    # 0 = débit illimité côté client (le rate limiter ne doit pas être le goulot)
+    UNLIMITED_RPS = "100000"
+
+# =============================================================================
+# MESURES
+# =============================================================================
+
+class LatencyRecorder:
+    """Latences exactes par service (percentiles), via un observateur de http_session.py"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, service: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(service, []).append(seconds)
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self) -> Dict[str, Dict]:
+        return {
+            service: {
+                "requests": len(values),
+                "p50_ms": round(self.percentile(values, 50) * 1000, 2),
+                "p99_ms": round(self.percentile(values, 99) * 1000, 2)
+            }
+            for service, values in self.samples.items()
+        }
+
+    def instrument(self):
+        """Branche le recorder sur toutes les sessions HTTP (sync, async, fixtures)"""
+        from http_session import add_request_observer
+        add_request_observer(lambda service, method, url, response, seconds: self.record(service, seconds))
+
+# =============================================================================
+# WORKER (sous-processus : un import complet)
+# =============================================================================
+
+def run_worker(result_path: str, use_async: bool):
+    """Extraction + import contre les mocks (URLs et tokens dans l'environnement)"""
+    recorder = LatencyRecorder()
+    recorder.instrument()
+
+    import extract_by_workspace
+    import import_data_to_siyuan
+
+    output_dir = tempfile.mkdtemp(prefix="benchmark-")
+    extract_by_workspace.Config.OUTPUT_DIR = output_dir
+    import_data_to_siyuan.Config.OUTPUT_DIR = output_dir
+
+    start = time.perf_counter()
+    extract_by_workspace.MigrationAnalyzer().run()
+    extracted = time.perf_counter()
+
+    recorder.samples.clear()  # Seules les requêtes de l'import comptent
+    importer = import_data_to_siyuan.DataImporter(use_async=use_async)
+    importer.run()
+    finished = time.perf_counter()
+
+    imported = importer.stats["entries_imported"]
+    duration = finished - extracted
+    result = {
+        "entries": imported,
+        "errors": len(importer.stats["errors"]),
+        "extract_seconds": round(extracted - start, 2),
+        "import_seconds": round(duration, 2),
+        "entries_per_second": round(imported / duration, 1) if duration else 0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "latency": recorder.summary(),
+        "stages": importer.metrics.snapshot()["stages"]
+    }
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+# =============================================================================
+# ORCHESTRATEUR
+# =============================================================================
+
+def start_mock(args: List[str]):
+    """Démarre un mock_servers.py, retourne (processus, port)"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_servers.py")] + args,
+        stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line.startswith("PORT "):
+        process.kill()
+        raise RuntimeError(f"mock_servers.py {args[0]} n'a pas démarré")
+    return process, int(line.split()[1])
+
+
+def run_size(size: int, options) -> Dict:
+    """Un benchmark complet pour une taille de database (ou pour les fixtures)"""
+    source = (["--fixtures", options.fixtures] if options.fixtures
+              else ["--synthetic", str(size), "--databases", str(options.databases)])
+    notion, notion_port = start_mock(
+        ["notion"] + source +
+        ["--latency-ms", str(options.notion_latency_ms), "--error-rate", str(options.error_rate),
+         "--error-status", "429", "--retry-after", "0.1", "--seed", str(options.seed)]
+    )
+    siyuan, siyuan_port = start_mock(
+        ["siyuan", "--latency-ms", str(options.siyuan_latency_ms), "--error-rate", str(options.error_rate),
+         "--seed", str(options.seed)]
+    )
+
+    notion_rps = str(options.notion_rps) if options.notion_rps else Config.UNLIMITED_RPS
+    env = dict(
+        os.environ,
+        NOTION_API_URL=f"http://127.0.0.1:{notion_port}/v1",
+        SIYUAN_URL=f"http://127.0.0.1:{siyuan_port}",
+        NOTION_TOKEN="benchmark",
+        SIYUAN_TOKEN="benchmark",
+        TARGET_NOTEBOOK_ID=Config.NOTEBOOK_ID,
+        NOTION_CACHE="false",
+        DRY_RUN="false",
+        TEST_LIMIT="0",
+        NOTION_MAX_RPS=notion_rps,
+        NOTION_BURST=str(max(10, int(float(notion_rps)))),
+        SIYUAN_MAX_RPS=Config.UNLIMITED_RPS,
+        SIYUAN_BURST=Config.UNLIMITED_RPS,
+        IMPORT_WORKERS=str(options.workers),
+        BACKOFF_BASE="0.05"
+    )
+    env.pop("FILTER_WORKSPACE", None)  # Tout le workspace synthétique
+    env.pop("NOTION_FIXTURES", None)   # Notion passe par le mock HTTP
+
+    result_path = tempfile.mktemp(suffix=".json")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", result_path]
+    if options.use_async:
+        command.append("--async")
+
+    try:
+        completed = subprocess.run(command, env=env, stdout=subprocess.DEVNULL if not options.verbose else None)
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            raise RuntimeError(f"Le worker a échoué (taille {size}, code {completed.returncode})")
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        notion.kill()
+        siyuan.kill()
+        if os.path.exists(result_path):
+            os.remove(result_path)
+
+    result["size"] = size
+    return result
+
+
+def print_table(results: List[Dict]):
+    print("\n" + "="*80)
+    print("📊 BENCHMARK IMPORT")
+    print("="*80)
+    print(f"{'Entrées':>9} {'Durée (s)':>10} {'Entrées/s':>10} {'Notion p50/p99 (ms)':>21} "
+          f"{'SiYuan p50/p99 (ms)':>21} {'RSS (Mo)':>9}")
+    for result in results:
+        latency = result["latency"]
+        notion = latency.get("Notion", {})
+        siyuan = latency.get("SiYuan", {})
+        print(f"{result['entries']:>9} {result['import_seconds']:>10} {result['entries_per_second']:>10} "
+              f"{notion.get('p50_ms', 0):>10}/{notion.get('p99_ms', 0):<10} "
+              f"{siyuan.get('p50_ms', 0):>10}/{siyuan.get('p99_ms', 0):<10} {result['peak_rss_mb']:>9}")
+        if result["errors"]:
+            print(f"          ⚠️  {result['errors']} erreurs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'import Notion → SiYuan sur serveurs mock")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="Entrées par database, séparées par des virgules (ex: 1000,10000,100000)")
+    parser.add_argument("--databases", type=int, default=1, help="Databases par run")
+    parser.add_argument("--fixtures", help="Workspace généré (generate_workspace.py) au lieu du synthétique")
+    parser.add_argument("--notion-latency-ms", type=float, default=0)
+    parser.add_argument("--siyuan-latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0,
+                        help="Proportion de réponses en erreur (429 côté Notion, 503 côté SiYuan)")
+    parser.add_argument("--notion-rps", type=float, default=0, help="Rate limit Notion côté client (0 = illimité)")
+    parser.add_argument("--workers", type=int, default=8, help="IMPORT_WORKERS")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Import --async (httpx)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(Config.OUTPUT_DIR, "benchmark.json"))
+    parser.add_argument("--verbose", action="store_true", help="Affiche la sortie de l'import")
+    parser.add_argument("--worker", metavar="RESULT_PATH", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.worker:
+        run_worker(options.worker, options.use_async)
+        return
+
+    sizes = [int(value) for value in options.sizes.split(",") if value.strip()]
+    if options.fixtures:
+        sizes = [0]  # Un seul run : la taille est celle des fixtures
+
+    results = []
+    for size in sizes:
+        if options.fixtures:
+            print(f"⏱️  Fixtures {options.fixtures}...", flush=True)
+        else:
+            print(f"⏱️  {size} entrées × {options.databases} database(s)...", flush=True)
+        result = run_size(size, options)
+        print(f"   ✅ {result['entries_per_second']} entrées/s, RSS {result['peak_rss_mb']} Mo")
+        results.append(result)
+
+    print_table(results)
+
+    directory = os.path.dirname(options.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(options.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "options": {key: value for key, value in vars(options).items() if key != "worker"},
+            "results": results
+        }, f, indent=2)
+    print(f"\n💾 Résultats: {options.output}")
+
+
+if __name__ == "__main__":
+    main()
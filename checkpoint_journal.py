@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Journal de checkpoints de l'import
+Journal append-only (JSONL) pour reprendre un import interrompu
+
+Chaque ligne enregistre une étape terminée pour une entrée :
+    {"db": ..., "entry": ..., "stage": "doc_created" | "attrs_set", "block": ...}
+
+- Écriture bufferisée, fsync par batch (nombre de lignes ou délai)
+- Au démarrage avec --resume, le journal est rechargé en un index
+  entry_id → (étape, block_id) : le test "déjà fait ?" est en O(1)
+- Une dernière ligne tronquée (crash pendant l'écriture) est ignorée
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    JOURNAL_FSYNC_EVERY = int(os.getenv("JOURNAL_FSYNC_EVERY", "50"))           # lignes
+    JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "2.0"))  # secondes
+
+# =============================================================================
+# JOURNAL
+# =============================================================================
+
+class CheckpointJournal:
+    """Journal append-only des étapes terminées, fsyncé par batch"""
+
+    STAGE_DOC_CREATED = "doc_created"
+    STAGE_ATTRS_SET = "attrs_set"
+
+    # Ordre des étapes : une étape plus avancée remplace la précédente
+    STAGE_ORDER = {STAGE_DOC_CREATED: 1, STAGE_ATTRS_SET: 2}
+
+    def __init__(self, path: str, fsync_every: int = None, fsync_interval: float = None):
+        self.path = path
+        self.fsync_every = fsync_every or Config.JOURNAL_FSYNC_EVERY
+        self.fsync_interval = fsync_interval or Config.JOURNAL_FSYNC_INTERVAL
+
+        # entry_id → (stage, block_id)
+        self.index: Dict[str, Tuple[str, str]] = {}
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def load(self) -> int:
+        """Recharge le journal existant dans l'index (retourne le nb de lignes)"""
+        if not os.path.exists(self.path):
+            return 0
+
+        count = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Ligne tronquée par un crash
+                self._index_record(record["entry"], record["stage"], record.get("block"))
+                count += 1
+
+        return count
+
+    def start(self, resume: bool):
+        """Ouvre le journal (append si reprise, sinon archive l'ancien)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if not resume and os.path.exists(self.path):
+            archived = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+            os.replace(self.path, archived)
+            print(f"📒 Ancien journal archivé: {archived}")
+
+        self._file = open(self.path, "a", encoding="utf-8")
+
+        # Ligne tronquée en fin de fichier : on repart sur une ligne propre
+        if self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def _index_record(self, entry_id: str, stage: str, block_id: Optional[str]):
+        current = self.index.get(entry_id)
+        if current is None or self.STAGE_ORDER[stage] >= self.STAGE_ORDER[current[0]]:
+            self.index[entry_id] = (stage, block_id or (current[1] if current else None))
+
+    def status(self, entry_id: str) -> Optional[Tuple[str, str]]:
+        """Dernière étape terminée pour une entrée : (stage, block_id) ou None"""
+        return self.index.get(entry_id)
+
+    def record(self, db_id: str, entry_id: str, stage: str, block_id: str):
+        """Enregistre une étape terminée (thread-safe)"""
+        line = json.dumps({
+            "db": db_id,
+            "entry": entry_id,
+            "stage": stage,
+            "block": block_id,
+            "ts": round(time.time(), 3)
+        }, separators=(",", ":"))
+
+        with self._lock:
+            self._index_record(entry_id, stage, block_id)
+            self._file.write(line + "\n")
+            self._unsynced += 1
+
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def completed_mapping(self) -> Dict[str, str]:
+        """Mapping Notion → SiYuan de toutes les entrées dont le doc existe"""
+        return {entry_id: block_id for entry_id, (_, block_id) in self.index.items() if block_id}
+
+    def close(self):
+        with self._lock:
+            if self._file and not self._file.closed:
+                self._sync()
+                self._file.close()
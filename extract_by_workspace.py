@@ -4,12 +4,21 @@ Notion to SiYuan - Extraction par WORKSPACE
 Permet de choisir quel espace de travail Notion extraire
 """
 
-import requests
 import os
 import json
+import argparse
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+
+from ancestry_index import AncestryIndex
+from http_session import get_session, print_pool_stats
+from notion_cache import get_cache, print_cache_stats
+from notion_fixtures import fixture_limiter, get_fixture_session
+from profiling import add_profile_arguments, profiled
+from rate_limiter import notion_limiter
 
 # =============================================================================
 # CONFIGURATION
@@ -17,6 +26,8 @@ from typing import Dict, List, Any, Optional
 
 class Config:
     NOTION_TOKEN = os.getenv("NOTION_TOKEN")
+    NOTION_API_URL = os.getenv("NOTION_API_URL", "https://api.notion.com/v1")  # Surchargé par les mocks (benchmark)
+    NOTION_FIXTURES = os.getenv("NOTION_FIXTURES")  # Répertoire de fixtures : Notion lu sur disque (generate_workspace.py)
     SIYUAN_URL = os.getenv("SIYUAN_URL", "http://192.168.1.11:6806")
     SIYUAN_TOKEN = os.getenv("SIYUAN_TOKEN")
     
@@ -25,8 +36,19 @@ class Config:
     # Si défini, extrait seulement ce workspace
     FILTER_WORKSPACE = os.getenv("FILTER_WORKSPACE", None)
     
-    # Options
-    DELAY_BETWEEN_CALLS = float(os.getenv("DELAY_BETWEEN_CALLS", "0.5"))
+    # /search mémoïsé pour la durée du process ; avec SEARCH_CACHE_TTL > 0
+    # (secondes), le résultat du cache disque est réutilisé entre deux runs
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "0"))
+    
+    # Pré-passe : nombre d'entrées par database, pour que l'import traite
+    # les plus grosses d'abord (DB_WORKERS). Au plus COUNT_MAX_PAGES pages de
+    # 100 par database (propriété titre seule) : au-delà, le compte est un
+    # minimum. Requêtes en parallèle (EXTRACT_WORKERS), sous le même budget
+    # global (rate limit Notion : voir rate_limiter.py)
+    COUNT_ENTRIES = os.getenv("COUNT_ENTRIES", "true").lower() == "true"
+    COUNT_MAX_PAGES = int(os.getenv("COUNT_MAX_PAGES", "10"))
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "4"))
+    
     OUTPUT_DIR = "migration_output"
 
 # =============================================================================
@@ -38,47 +60,101 @@ class NotionClient:
     
     def __init__(self, token: str):
         self.token = token
-        self.base_url = "https://api.notion.com/v1"
+        self.base_url = Config.NOTION_API_URL
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json"
         }
+        if Config.NOTION_FIXTURES:
+            # Workspace sur disque : aucun appel réseau, pas de rate limit
+            self.http = get_fixture_session(Config.NOTION_FIXTURES)
+            self.rate_limiter = fixture_limiter()
+        else:
+            self.http = get_session("Notion")
+            self.rate_limiter = notion_limiter()
+        self.cache = get_cache()
+        self.offline = bool(self.cache and self.cache.offline)
+        
+        # Une seule passe /search par type d'objet pour tout le process
+        self._search_results: Dict[str, List[Dict]] = {}
+        self._search_lock = threading.Lock()
+        self._ancestry: Optional[AncestryIndex] = None
     
-    def list_workspaces(self) -> List[Dict]:
-        """Liste tous les workspaces accessibles"""
-        print("🔍 Recherche des workspaces Notion...")
-        
-        # On va chercher toutes les pages top-level
-        # Chaque workspace aura son propre parent
-        all_items = []
+    def search(self, object_type: str) -> List[Dict]:
+        """
+        Résultat complet de /search pour un type d'objet ("page" ou "database").
+        
+        Mémoïsé : détection des workspaces, filtrage et analyse travaillent
+        sur le même résultat, /search n'est parcouru qu'une fois.
+        """
+        with self._search_lock:
+            if object_type not in self._search_results:
+                self._search_results[object_type] = self._crawl_search(object_type)
+            return self._search_results[object_type]
+    
+    def _crawl_search(self, object_type: str) -> List[Dict]:
+        """Pagine /search pour un type d'objet"""
+        # Replay : dernier /search complet gardé en cache
+        if self.offline:
+            results = self.cache.get("search", object_type)
+            if results is None:
+                print(f"⚠️  /search {object_type} absent du cache (offline)")
+            return results or []
+        
+        if self.cache and Config.SEARCH_CACHE_TTL > 0:
+            results = self.cache.get("search", object_type, max_age=Config.SEARCH_CACHE_TTL)
+            if results is not None:
+                print(f"📦 /search {object_type}: résultat du cache disque (< {Config.SEARCH_CACHE_TTL}s)")
+                return results
+        
+        results = []
         has_more = True
         start_cursor = None
+        complete = False
         
         while has_more:
             payload = {
-                "page_size": 100,
-                "filter": {"property": "object", "value": "page"}
+                "filter": {"property": "object", "value": object_type},
+                "page_size": 100
             }
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: self.http.post(
                 f"{self.base_url}/search",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             
             if response.status_code != 200:
+                print(f"❌ Erreur Notion API: {response.status_code}")
                 break
             
             data = response.json()
-            all_items.extend(data.get("results", []))
+            results.extend(data.get("results", []))
             
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
+            complete = not has_more
         
+        if self.cache and complete:
+            # Version = horodatage du fetch (SEARCH_CACHE_TTL)
+            self.cache.put("search", object_type, results, version=str(time.time()))
+        
+        return results
+    
+    def list_workspaces(self) -> List[Dict]:
+        """Liste tous les workspaces accessibles"""
+        print("🔍 Recherche des workspaces Notion...")
+        
+        # On va chercher toutes les pages top-level
+        # Chaque workspace aura son propre parent
+        return self.group_workspaces(self.search("page"))
+    
+    @staticmethod
+    def group_workspaces(all_items: List[Dict]) -> List[Dict]:
+        """Regroupe les pages top-level (parent workspace) par workspace"""
         # Identifier les workspaces via les pages workspace
         workspaces = {}
         for item in all_items:
@@ -102,6 +178,45 @@ class NotionClient:
         
         return list(workspaces.values())
     
+    def ancestry(self) -> AncestryIndex:
+        """Index d'ascendance construit une fois depuis /search (pages + databases)"""
+        with self._search_lock:
+            built = self._ancestry is not None
+        if not built:
+            index = AncestryIndex.from_search(
+                self.search("page"), self.search("database"), resolver=self._fetch_ancestor
+            )
+            with self._search_lock:
+                if self._ancestry is None:
+                    self._ancestry = index
+        return self._ancestry
+    
+    def _fetch_ancestor(self, parent_type: str, parent_id: str) -> Optional[Dict]:
+        """Ancêtre absent de /search (bloc, page non partagée) : un appel, mis en cache"""
+        endpoint = {"page_id": "pages", "database_id": "databases", "block_id": "blocks"}.get(parent_type)
+        if not endpoint:
+            return None
+        
+        if self.cache:
+            cached = self.cache.get("ancestor", parent_id)
+            if cached is not None or self.offline:
+                return cached
+        
+        response = self.rate_limiter.call(lambda: self.http.get(
+            f"{self.base_url}/{endpoint}/{parent_id}",
+            headers=self.headers
+        ))
+        if response.status_code != 200:
+            return None
+        
+        item = response.json()
+        if self.cache:
+            # Seul le pointeur parent nous intéresse
+            self.cache.put("ancestor", parent_id, {
+                key: item.get(key) for key in ("object", "id", "parent", "properties", "title")
+            })
+        return item
+    
     def search_databases(self, workspace_filter: Optional[str] = None) -> List[Dict]:
         """Récupère toutes les databases"""
         print("🔍 Extraction des databases Notion...")
@@ -109,51 +224,87 @@ class NotionClient:
         if workspace_filter:
             print(f"📌 Filtrage workspace: {workspace_filter}")
         
-        databases = []
+        databases = self.search("database")
+        
+        # Filtrer par workspace si demandé
+        if workspace_filter:
+            databases = self.filter_by_workspace(databases, workspace_filter, self.ancestry())
+        
+        print(f"✅ {len(databases)} databases trouvées")
+        return databases
+    
+    @classmethod
+    def filter_by_workspace(cls, databases: List[Dict], workspace_name: str,
+                            index: AncestryIndex) -> List[Dict]:
+        """
+        Garde les databases dont la racine (page top-level / teamspace) porte
+        ce nom. Si aucune racine ne porte ce nom, on retombe sur le match par URL.
+        """
+        if not any(cls._same_name(title, workspace_name) for title in index.roots().values()):
+            print(f"⚠️  Aucune page racine nommée '{workspace_name}' : filtrage par URL")
+            index = None
+        
+        return [db for db in databases if cls._match_workspace(db, workspace_name, index)]
+    
+    @staticmethod
+    def _same_name(title: str, workspace_name: str) -> bool:
+        slug = workspace_name.lower().replace(" ", "-")
+        return title.lower() == workspace_name.lower() or title.lower().replace(" ", "-") == slug
+    
+
+    def count_entries(self, database_id: str, max_pages: int = None) -> Tuple[int, bool]:
+        """
+        Compte les entrées d'une database : (nombre, exact).
+        
+        Au plus `max_pages` pages de 100 (COUNT_MAX_PAGES), avec la seule
+        propriété titre (filter_properties) : réponses légères, coût borné
+        par database. Au-delà, le nombre est un minimum (exact = False),
+        suffisant pour classer les databases.
+        """
+        if self.offline:
+            marker = self.cache.get("query", database_id)
+            return (marker["entries"], True) if marker else (0, False)
+        
+        max_pages = max(1, Config.COUNT_MAX_PAGES if max_pages is None else max_pages)
+        count = 0
+        pages = 0
         has_more = True
         start_cursor = None
         
-        while has_more:
-            payload = {
-                "filter": {"property": "object", "value": "database"},
-                "page_size": 100
-            }
+        while has_more and pages < max_pages:
+            payload = {"page_size": 100}
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
-                f"{self.base_url}/search",
+            response = self.rate_limiter.call(lambda: self.http.post(
+                f"{self.base_url}/databases/{database_id}/query",
                 headers=self.headers,
+                params={"filter_properties": "title"},
                 json=payload
-            )
+            ))
             
             if response.status_code != 200:
-                print(f"❌ Erreur Notion API: {response.status_code}")
-                break
+                print(f"❌ Erreur comptage {database_id}: {response.status_code} ({count} entrées partielles)")
+                return count, False
             
             data = response.json()
-            batch = data.get("results", [])
-            
-            # Filtrer par workspace si demandé
-            if workspace_filter:
-                batch = [db for db in batch if self._match_workspace(db, workspace_filter)]
-            
-            databases.extend(batch)
-            
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
+            pages += 1
+            count += len(data.get("results", []))
         
-        print(f"✅ {len(databases)} databases trouvées")
-        return databases
+        return count, not has_more
     
-    def _match_workspace(self, db: Dict, workspace_name: str) -> bool:
+    @classmethod
+    def _match_workspace(cls, db: Dict, workspace_name: str, index: AncestryIndex = None) -> bool:
         """Vérifie si une DB appartient à un workspace (match par nom)"""
-        # Stratégie : on match par le nom du workspace dans le chemin
-        # On récupère le parent et on remonte jusqu'à trouver une page workspace
+        # Stratégie : on remonte les parents (index en mémoire) jusqu'à la
+        # page racine du workspace, et on compare son titre
+        if index is not None:
+            root = index.root_of(db["id"])
+            return bool(root) and cls._same_name(index.title(root), workspace_name)
         
-        # Pour l'instant, simple match par titre contenu dans URL
+        # Sans index : simple match par titre contenu dans URL
         url = db.get("url", "")
         
         # Le workspace apparaît dans l'URL : notion.so/workspace-name/...
@@ -259,19 +410,43 @@ class MigrationAnalyzer:
                 print("   Essaie sans filtre pour voir toutes les DBs")
             return
         
+        # Pré-passe : taille de chaque database (ordonnancement de l'import)
+        entry_counts = self._count_entries(databases) if Config.COUNT_ENTRIES else {}
+        
         # Analyser
-        analysis = self._analyze_databases(databases)
+        analysis = self._analyze_databases(databases, entry_counts)
         self._save_analysis(analysis)
         
+        print()
+        print_pool_stats()
+        print_cache_stats()
+        
         print("\n" + "="*80)
         print("✅ ANALYSE TERMINÉE")
         print("="*80 + "\n")
     
     def _detect_workspaces(self):
         """Détecte et affiche les workspaces disponibles"""
-        # Stratégie simple : regarder les URLs des databases
-        all_dbs = self.notion_client.search_databases()
+        # Racines (pages top-level / teamspaces) via l'index d'ascendance
+        # (même résultat /search que l'extraction qui suit)
+        all_dbs = self.notion_client.search("database")
+        index = self.notion_client.ancestry()
         
+        per_root = {}
+        for db in all_dbs:
+            root = index.root_of(db["id"])
+            if root:
+                per_root[root] = per_root.get(root, 0) + 1
+        
+        if per_root:
+            print(f"   Pages racines contenant des databases : {len(per_root)}")
+            for root, count in sorted(per_root.items(), key=lambda item: -item[1]):
+                print(f"      - {index.title(root) or root} ({count} databases)")
+            if index.resolver_calls:
+                print(f"   ({index.resolver_calls} ancêtres récupérés hors /search)")
+            return
+        
+        # Repli : regarder les URLs des databases
         workspaces = set()
         for db in all_dbs:
             url = db.get("url", "")
@@ -290,8 +465,25 @@ class MigrationAnalyzer:
         else:
             print("   Impossible de détecter les workspaces automatiquement")
     
-    def _analyze_databases(self, databases: List[Dict]) -> Dict:
+    def _count_entries(self, databases: List[Dict]) -> Dict[str, Tuple[int, bool]]:
+        """Compte les entrées de toutes les databases, EXTRACT_WORKERS à la fois"""
+        workers = max(1, Config.EXTRACT_WORKERS)
+        print(f"\n🔢 Comptage des entrées ({len(databases)} databases, {workers} en parallèle, "
+              f"{Config.COUNT_MAX_PAGES * 100} max par database)...")
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="count") as executor:
+            counts = executor.map(self.notion_client.count_entries, [db["id"] for db in databases])
+            entry_counts = dict(zip([db["id"] for db in databases], counts))
+        
+        total = sum(count for count, _ in entry_counts.values())
+        capped = sum(1 for _, exact in entry_counts.values() if not exact)
+        print(f"✅ {total}{'+' if capped else ''} entrées au total"
+              + (f" ({capped} databases au-delà du plafond)" if capped else "") + "\n")
+        return entry_counts
+    
+    def _analyze_databases(self, databases: List[Dict], entry_counts: Dict[str, Tuple[int, bool]] = None) -> Dict:
         """Analyse les databases"""
+        entry_counts = entry_counts or {}
         analyzed = []
         
         for db in databases:
@@ -328,13 +520,22 @@ class MigrationAnalyzer:
                 
                 analyzed_props.append(prop_info)
             
-            analyzed.append({
+            db_analysis = {
                 "id": db_id,
                 "title": title,
                 "url": db.get("url"),
                 "properties_count": len(analyzed_props),
                 "properties": analyzed_props
-            })
+            }
+            if db_id in entry_counts:
+                db_analysis["entry_count"], exact = entry_counts[db_id]
+                if not exact:
+                    db_analysis["entry_count_exact"] = False  # Minimum (COUNT_MAX_PAGES)
+            analyzed.append(db_analysis)
+        
+        # Plus grosses databases en tête : ordre de traitement de l'import
+        if entry_counts:
+            analyzed.sort(key=lambda db: db.get("entry_count", 0), reverse=True)
         
         return {
             "timestamp": datetime.now().isoformat(),
@@ -379,6 +580,8 @@ class MigrationAnalyzer:
                 f.write(f"\n{'='*80}\n")
                 f.write(f"DATABASE {idx}/{analysis['databases_count']}: {db['title']}\n")
                 f.write(f"URL: {db.get('url', 'N/A')}\n")
+                if "entry_count" in db:
+                    f.write(f"Entrées: {db['entry_count']}{'' if db.get('entry_count_exact', True) else '+'}\n")
                 f.write(f"{'='*80}\n\n")
                 
                 for prop in db["properties"]:
@@ -407,12 +610,17 @@ class MigrationAnalyzer:
 # =============================================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Extraction du workspace Notion (databases, entrées, ancêtres)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
     if not Config.NOTION_TOKEN:
         print("❌ NOTION_TOKEN non défini")
         return
     
     analyzer = MigrationAnalyzer()
-    analyzer.run()
+    with profiled("extract", args, Config.OUTPUT_DIR):
+        analyzer.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Générateur de workspace Notion synthétique
+Fixtures au format de l'API Notion, déterministes pour un seed donné
+
+Produit un répertoire lisible par notion_fixtures.py :
+- Plusieurs workspaces (pages racines), databases parfois rangées sous une
+  sous-page (exerce l'index d'ascendance de l'extraction)
+- Toutes les propriétés gérées par PropertyConverter et TypeDetector, plus
+  status / rollup / formula (ignorés à l'import)
+- Relations entre databases (et rollups dessus)
+- Pages riches : rich text annoté (liens, mentions, équations), arbres de
+  blocs profonds, blocs child_page non descendus
+
+Usage :
+    python3 generate_workspace.py fixtures/ --databases 10 --entries 10000 --seed 42
+    NOTION_FIXTURES=fixtures/ python3 extract_by_workspace.py
+    NOTION_FIXTURES=fixtures/ python3 import_data_to_siyuan.py
+    python3 mock_servers.py notion --fixtures fixtures/
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    # Date de référence des created / last_edited_time (indépendante de l'horloge)
+    EPOCH = datetime(2024, 1, 1)
+    SPAN_DAYS = 365
+
+    WORKSPACE_NAMES = ["PARA", "Work", "Personal", "Archive", "Research", "Family"]
+    DATABASE_NAMES = ["Projects", "Tasks", "Notes", "Contacts", "Books", "Meetings",
+                      "Areas", "Resources", "Journal", "Recipes", "Trips", "Ideas"]
+    PEOPLE = ["Alice Martin", "Bruno Petit", "Chloé Durand", "David Leroy", "Emma Moreau"]
+    WORDS = ("notion siyuan migration base bloc page lien tâche projet note idée revue "
+             "semaine objectif budget client réunion lecture recherche brouillon archive "
+             "priorité contexte référence résumé détail action suivi planning").split()
+    COLORS = ["default", "gray", "brown", "orange", "yellow", "green", "blue", "purple", "pink", "red"]
+
+    # Blocs feuilles / conteneurs (ces derniers peuvent avoir des enfants)
+    LEAF_BLOCKS = ["paragraph", "paragraph", "heading_1", "heading_2", "heading_3",
+                   "code", "divider", "image", "bookmark"]
+    CONTAINER_BLOCKS = ["bulleted_list_item", "numbered_list_item", "to_do", "toggle", "quote", "callout"]
+
+# =============================================================================
+# GÉNÉRATEUR
+# =============================================================================
+
+class WorkspaceGenerator:
+    """Génère un workspace complet ; chaque database a son propre générateur aléatoire"""
+
+    def __init__(self, output_dir: str, seed: int = 0, workspaces: int = 2, databases: int = 6,
+                 entries: List[int] = None, blocks: int = 8, depth: int = 4,
+                 index_entries: bool = False):
+        self.output_dir = output_dir
+        self.seed = seed
+        self.workspaces = max(1, workspaces)
+        self.databases = max(1, databases)
+        self.entries = entries or [1000]
+        self.blocks = blocks
+        self.depth = depth
+        self.index_entries = index_entries
+
+        self.counts = {"workspaces": 0, "databases": 0, "entries": 0, "blocks": 0, "bytes": 0}
+
+    def _rng(self, *scope) -> random.Random:
+        """Générateur indépendant par portée : une database ne dépend pas des autres"""
+        return random.Random(":".join(str(part) for part in (self.seed,) + scope))
+
+    @staticmethod
+    def _id(rng: random.Random) -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    @staticmethod
+    def _timestamp(rng: random.Random, after: Optional[str] = None) -> str:
+        start = datetime.strptime(after[:19], "%Y-%m-%dT%H:%M:%S") if after else Config.EPOCH
+        moment = start + timedelta(seconds=rng.randrange(Config.SPAN_DAYS * 86400))
+        return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    @staticmethod
+    def _user(rng: random.Random) -> Dict:
+        index = rng.randrange(len(Config.PEOPLE))
+        return {"object": "user", "id": str(uuid.UUID(int=index + 1)), "name": Config.PEOPLE[index]}
+
+    @staticmethod
+    def _words(rng: random.Random, low: int, high: int) -> str:
+        return " ".join(rng.choice(Config.WORDS) for _ in range(rng.randint(low, high)))
+
+    # -------------------------------------------------------------------------
+    # Rich text
+    # -------------------------------------------------------------------------
+
+    def _text(self, content: str, link: Optional[str] = None, **annotations) -> Dict:
+        return {
+            "type": "text",
+            "text": {"content": content, "link": {"url": link} if link else None},
+            "annotations": {
+                "bold": False, "italic": False, "strikethrough": False,
+                "underline": False, "code": False, "color": "default", **annotations
+            },
+            "plain_text": content,
+            "href": link
+        }
+
+    def _rich_text(self, rng: random.Random, mentions: List[str], segments: int = None) -> List[Dict]:
+        """Rich text : segments annotés, liens, mentions de pages, équations"""
+        result = []
+        for _ in range(segments or rng.randint(1, 6)):
+            roll = rng.random()
+            if roll < 0.08 and mentions:
+                page_id = rng.choice(mentions)
+                result.append({
+                    "type": "mention",
+                    "mention": {"type": "page", "page": {"id": page_id}},
+                    "annotations": self._text("")["annotations"],
+                    "plain_text": "Untitled",
+                    "href": f"https://www.notion.so/{page_id.replace('-', '')}"
+                })
+            elif roll < 0.12:
+                expression = f"x_{rng.randint(1, 9)}^2 + {rng.randint(1, 99)}"
+                result.append({
+                    "type": "equation",
+                    "equation": {"expression": expression},
+                    "annotations": self._text("")["annotations"],
+                    "plain_text": expression,
+                    "href": None
+                })
+            elif roll < 0.2:
+                result.append(self._text(self._words(rng, 1, 3) + " ",
+                                         link=f"https://example.com/{rng.randrange(10000)}"))
+            else:
+                result.append(self._text(
+                    self._words(rng, 3, 18) + " ",
+                    bold=rng.random() < 0.15,
+                    italic=rng.random() < 0.15,
+                    code=rng.random() < 0.05,
+                    color=rng.choice(Config.COLORS) if rng.random() < 0.1 else "default"
+                ))
+        return result
+
+    # -------------------------------------------------------------------------
+    # Blocs
+    # -------------------------------------------------------------------------
+
+    def _block(self, rng: random.Random, depth: int, mentions: List[str]) -> Dict:
+        container = depth < self.depth and rng.random() < 0.25
+        block_type = rng.choice(Config.CONTAINER_BLOCKS if container else Config.LEAF_BLOCKS)
+        block = {
+            "object": "block",
+            "id": self._id(rng),
+            "type": block_type,
+            "has_children": False,
+            "archived": False
+        }
+
+        if block_type == "divider":
+            block[block_type] = {}
+        elif block_type == "image":
+            block[block_type] = {"type": "external", "caption": [],
+                                 "external": {"url": f"https://picsum.photos/seed/{rng.randrange(10**6)}/640/480"}}
+        elif block_type == "bookmark":
+            block[block_type] = {"url": f"https://example.com/{rng.randrange(10**6)}", "caption": []}
+        elif block_type == "code":
+            block[block_type] = {"rich_text": [self._text(f"print({rng.randrange(1000)})")],
+                                 "language": "python", "caption": []}
+        else:
+            content = {"rich_text": self._rich_text(rng, mentions), "color": "default"}
+            if block_type == "to_do":
+                content["checked"] = rng.random() < 0.5
+            if block_type == "callout":
+                content["icon"] = {"type": "emoji", "emoji": "💡"}
+            block[block_type] = content
+
+        if container:
+            children = [self._block(rng, depth + 1, mentions) for _ in range(rng.randint(1, 3))]
+            block["has_children"] = True
+            block["children"] = children
+        self.counts["blocks"] += 1
+        return block
+
+    def _page_tree(self, rng: random.Random, mentions: List[str]) -> List[Dict]:
+        count = max(0, int(rng.gauss(self.blocks, self.blocks / 3)))
+        tree = [self._block(rng, 1, mentions) for _ in range(count)]
+
+        # Sous-page : has_children mais non descendue par l'import (NO_DESCEND_TYPES)
+        if rng.random() < 0.05:
+            tree.append({
+                "object": "block", "id": self._id(rng), "type": "child_page",
+                "has_children": True, "archived": False,
+                "child_page": {"title": self._words(rng, 1, 3).title()}
+            })
+            self.counts["blocks"] += 1
+        return tree
+
+    # -------------------------------------------------------------------------
+    # Databases
+    # -------------------------------------------------------------------------
+
+    def _page_object(self, rng: random.Random, page_id: str, title: str, parent: Dict) -> Dict:
+        created = self._timestamp(rng)
+        return {
+            "object": "page",
+            "id": page_id,
+            "created_time": created,
+            "last_edited_time": self._timestamp(rng, created),
+            "parent": parent,
+            "archived": False,
+            "url": f"https://www.notion.so/{title.replace(' ', '-')}-{page_id.replace('-', '')}",
+            "properties": {"title": {"id": "title", "type": "title", "title": [self._text(title)]}}
+        }
+
+    def _schema(self, db_index: int, db_id: str, related_id: str) -> Dict:
+        """Propriétés d'une database : tous les types gérés à l'import et à l'extraction"""
+        rng = self._rng("schema", db_index)
+        options = lambda names: {"options": [
+            {"id": f"opt-{n}", "name": name, "color": Config.COLORS[n % len(Config.COLORS)]}
+            for n, name in enumerate(names)
+        ]}
+        tags = sorted({rng.choice(Config.WORDS) for _ in range(8)})
+
+        schema = {
+            "Name": ("title", {}),
+            "Status": ("status", options(["Not started", "In progress", "Done"])),
+            "Priority": ("select", options(["Low", "Medium", "High", "Urgent"])),
+            "Tags": ("multi_select", options(tags)),
+            "Estimate": ("number", {"format": "number"}),
+            "Done": ("checkbox", {}),
+            "Due": ("date", {}),
+            "Summary": ("rich_text", {}),
+            "Website": ("url", {}),
+            "Email": ("email", {}),
+            "Phone": ("phone_number", {}),
+            "Owner": ("people", {}),
+            "Attachments": ("files", {}),
+            "Cover image": ("files", {}),
+            "Created": ("created_time", {}),
+            "Updated": ("last_edited_time", {}),
+            "Created by": ("created_by", {}),
+            "Edited by": ("last_edited_by", {}),
+            "Related": ("relation", {"database_id": related_id, "type": "single_property", "single_property": {}}),
+            "Parent item": ("relation", {"database_id": db_id, "type": "single_property", "single_property": {}}),
+            "Related count": ("rollup", {"relation_property_name": "Related", "relation_property_id": "rel",
+                                         "rollup_property_name": "Name", "rollup_property_id": "title",
+                                         "function": "count"}),
+            "Score": ("formula", {"expression": 'prop("Estimate") * 2'})
+        }
+
+        return {
+            name: {"id": "title" if prop_type == "title" else f"p{n}", "name": name, "type": prop_type, prop_type: config}
+            for n, (name, (prop_type, config)) in enumerate(schema.items())
+        }
+
+    def _value(self, rng: random.Random, prop: Dict, entry: Dict, relations: Dict[str, List[str]]):
+        """Valeur Notion d'une propriété (parfois vide, comme dans un vrai workspace)"""
+        prop_type = prop["type"]
+        empty = rng.random() < 0.1 and prop_type not in ("title", "created_time", "last_edited_time",
+                                                           "created_by", "last_edited_by", "checkbox",
+                                                           "rollup", "formula")
+
+        if prop_type == "title":
+            return [self._text(self._words(rng, 2, 6).capitalize())]
+        if prop_type == "rich_text":
+            return [] if empty else self._rich_text(rng, relations["mentions"], rng.randint(1, 3))
+        if prop_type in ("select", "status"):
+            return None if empty else dict(rng.choice(prop[prop_type]["options"]))
+        if prop_type == "multi_select":
+            options = prop["multi_select"]["options"]
+            return [] if empty else [dict(option) for option in rng.sample(options, rng.randint(1, 3))]
+        if prop_type == "number":
+            return None if empty else round(rng.uniform(0, 100), rng.choice([0, 2]))
+        if prop_type == "checkbox":
+            return rng.random() < 0.5
+        if prop_type == "date":
+            if empty:
+                return None
+            start = self._timestamp(rng)[:10]
+            end = self._timestamp(rng, start + "T00:00:00")[:10] if rng.random() < 0.2 else None
+            return {"start": start, "end": end, "time_zone": None}
+        if prop_type == "url":
+            return None if empty else f"https://example.com/{rng.randrange(10**6)}"
+        if prop_type == "email":
+            return None if empty else f"{rng.choice(Config.WORDS)}{rng.randrange(1000)}@example.com"
+        if prop_type == "phone_number":
+            return None if empty else f"+33 6 {rng.randrange(10**8):08d}"
+        if prop_type == "people":
+            return [] if empty else [self._user(rng)]
+        if prop_type == "files":
+            if empty:
+                return []
+            return [{"name": f"file{n}.pdf", "type": "external",
+                     "external": {"url": f"https://files.example.com/{rng.randrange(10**6)}.pdf"}}
+                    for n in range(rng.randint(1, 2))]
+        if prop_type == "created_time":
+            return entry["created_time"]
+        if prop_type == "last_edited_time":
+            return entry["last_edited_time"]
+        if prop_type in ("created_by", "last_edited_by"):
+            return self._user(rng)
+        if prop_type == "relation":
+            targets = relations[prop["relation"]["database_id"]]
+            if empty or not targets:
+                return []
+            return [{"id": target} for target in rng.sample(targets, min(len(targets), rng.randint(1, 3)))]
+        if prop_type == "rollup":
+            return {"type": "number", "number": len(entry["properties"].get("Related", {}).get("relation", [])),
+                    "function": "count"}
+        if prop_type == "formula":
+            estimate = entry["properties"].get("Estimate", {}).get("number")
+            return {"type": "number", "number": estimate * 2 if estimate is not None else None}
+        return None
+
+    def _entry(self, rng: random.Random, entry_id: str, db: Dict, relations: Dict[str, List[str]]) -> Dict:
+        created = self._timestamp(rng)
+        entry = {
+            "object": "page",
+            "id": entry_id,
+            "created_time": created,
+            "last_edited_time": self._timestamp(rng, created),
+            "created_by": self._user(rng),
+            "last_edited_by": self._user(rng),
+            "parent": {"type": "database_id", "database_id": db["id"]},
+            "archived": False,
+            "url": f"https://www.notion.so/{entry_id.replace('-', '')}",
+            "properties": {}
+        }
+        # Ordre du schéma : rollup / formula après les propriétés dont ils dépendent
+        for name, prop in db["properties"].items():
+            value = self._value(rng, prop, entry, relations)
+            entry["properties"][name] = {"id": prop["id"], "type": prop["type"], prop["type"]: value}
+        return entry
+
+    # -------------------------------------------------------------------------
+    # Écriture
+    # -------------------------------------------------------------------------
+
+    def _write_json(self, value, *parts):
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        with open(os.path.join(self.output_dir, *parts), "w", encoding="utf-8") as f:
+            f.write(data)
+        self.counts["bytes"] += len(data)
+
+    def generate(self) -> Dict:
+        for sub in ("databases", "queries", "blocks", "pages"):
+            os.makedirs(os.path.join(self.output_dir, sub), exist_ok=True)
+
+        rng = self._rng("layout")
+
+        # Workspaces (pages racines) et une sous-page "Hub" par workspace
+        roots, hubs, pages = [], [], []
+        for index in range(self.workspaces):
+            name = Config.WORKSPACE_NAMES[index % len(Config.WORKSPACE_NAMES)]
+            if index >= len(Config.WORKSPACE_NAMES):
+                name = f"{name} {index // len(Config.WORKSPACE_NAMES) + 1}"
+            root = self._page_object(rng, self._id(rng), name, {"type": "workspace", "workspace": True})
+            hub = self._page_object(rng, self._id(rng), f"{name} Hub", {"type": "page_id", "page_id": root["id"]})
+            roots.append(root)
+            hubs.append(hub)
+            pages.extend([root, hub])
+        self.counts["workspaces"] = len(roots)
+
+        # Databases : une sur trois rangée sous le Hub de son workspace
+        databases = []
+        for index in range(self.databases):
+            name = Config.DATABASE_NAMES[index % len(Config.DATABASE_NAMES)]
+            if index >= len(Config.DATABASE_NAMES):
+                name = f"{name} {index // len(Config.DATABASE_NAMES) + 1}"
+            workspace = index % self.workspaces
+            parent = hubs[workspace] if index % 3 == 2 else roots[workspace]
+            db_id = self._id(rng)
+            created = self._timestamp(rng)
+            databases.append({
+                "object": "database",
+                "id": db_id,
+                "created_time": created,
+                "last_edited_time": self._timestamp(rng, created),
+                "title": [self._text(name)],
+                "description": [],
+                "parent": {"type": "page_id", "page_id": parent["id"]},
+                "url": f"https://www.notion.so/{db_id.replace('-', '')}",
+                "archived": False,
+                "is_inline": False
+            })
+
+        for index, db in enumerate(databases):
+            db["properties"] = self._schema(index, db["id"], databases[(index + 1) % len(databases)]["id"])
+
+        # Ids des entrées connus d'avance : les relations pointent vers de vraies entrées
+        sizes = [self.entries[index % len(self.entries)] for index in range(len(databases))]
+        entry_ids = {}
+        for index, db in enumerate(databases):
+            ids_rng = self._rng("ids", index)
+            entry_ids[db["id"]] = [self._id(ids_rng) for _ in range(sizes[index])]
+
+        search_pages = open(os.path.join(self.output_dir, "search_page.json"), "w", encoding="utf-8")
+        search_pages.write("[" + ",".join(json.dumps(page, ensure_ascii=False) for page in pages))
+        for page in pages:
+            self._write_json(page, "pages", f"{page['id']}.json")
+
+        for index, db in enumerate(databases):
+            self._write_json(db, "databases", f"{db['id']}.json")
+            self._generate_entries(index, db, entry_ids, search_pages)
+            self.counts["databases"] += 1
+
+        search_pages.write("]")
+        search_pages.close()
+        self._write_json(databases, "search_database.json")
+
+        manifest = {
+            "seed": self.seed,
+            "workspaces": self.workspaces,
+            "databases": self.databases,
+            "entries": self.entries,
+            "blocks": self.blocks,
+            "depth": self.depth,
+            "index_entries": self.index_entries,
+            "counts": self.counts
+        }
+        self._write_json(manifest, "manifest.json")
+        return self.counts
+
+    def _generate_entries(self, index: int, db: Dict, entry_ids: Dict[str, List[str]], search_pages):
+        rng = self._rng("entries", index)
+        ids = entry_ids[db["id"]]
+        relations = dict(entry_ids)
+        relations["mentions"] = ids[:1000]  # Mentions vers des pages de la même database
+
+        title = db["title"][0]["plain_text"]
+        started = time.time()
+        with open(os.path.join(self.output_dir, "queries", f"{db['id']}.jsonl"), "w", encoding="utf-8") as query:
+            for entry_id in ids:
+                entry = self._entry(rng, entry_id, db, relations)
+                line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+                query.write(line + "\n")
+                self.counts["bytes"] += len(line) + 1
+
+                if self.index_entries:
+                    search_pages.write("," + line)
+
+                self._write_json(self._page_tree(rng, relations["mentions"]), "blocks", f"{entry_id}.json")
+                self.counts["entries"] += 1
+
+        print(f"   ✅ {title}: {len(ids)} entrées ({time.time() - started:.1f}s)")
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un workspace Notion synthétique (fixtures)")
+    parser.add_argument("output_dir", help="Répertoire de sortie (NOTION_FIXTURES)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workspaces", type=int, default=2, help="Pages racines (workspaces)")
+    parser.add_argument("--databases", type=int, default=6)
+    parser.add_argument("--entries", default="1000",
+                        help="Entrées par database, liste appliquée en boucle (ex: 50000,20000,500)")
+    parser.add_argument("--blocks", type=int, default=8, help="Blocs de premier niveau par page (moyenne)")
+    parser.add_argument("--depth", type=int, default=4, help="Profondeur max des arbres de blocs")
+    parser.add_argument("--index-entries", action="store_true",
+                        help="Entrées aussi retournées par /search page (comme l'API réelle)")
+    args = parser.parse_args()
+
+    entries = [int(value) for value in args.entries.split(",") if value.strip()]
+
+    print(f"🧪 Génération du workspace (seed {args.seed}) → {args.output_dir}")
+    started = time.time()
+    generator = WorkspaceGenerator(args.output_dir, args.seed, args.workspaces, args.databases,
+                                   entries, args.blocks, args.depth, args.index_entries)
+    counts = generator.generate()
+
+    print(f"\n📊 {counts['workspaces']} workspaces, {counts['databases']} databases, "
+          f"{counts['entries']} entrées, {counts['blocks']} blocs, "
+          f"{counts['bytes'] / 1024 / 1024:.1f} Mo en {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
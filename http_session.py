@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Sessions HTTP poolées
+Une session keep-alive par service (Notion, SiYuan) partagée par tous les clients
+
+Remplace les appels requests.get/requests.post module-level (une connexion
+TCP + TLS par requête) par un pool de connexions réutilisées :
+- Taille de pool, keep-alive et timeouts configurables
+- HTTP/2 optionnel via httpx (si installé : pip install 'httpx[http2]')
+- Statistiques du pool (connexions ouvertes / réutilisées)
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from rate_limiter import ConnectError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    HTTP_KEEP_ALIVE = os.getenv("HTTP_KEEP_ALIVE", "true").lower() == "true"
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+    HTTP2 = os.getenv("HTTP2", "false").lower() == "true"
+
+# =============================================================================
+# SESSION POOLÉE
+# =============================================================================
+
+class PooledSession:
+    """Session HTTP poolée (requests, ou httpx si HTTP/2 demandé)"""
+
+    def __init__(self, name: str, pool_size: int = None, keep_alive: bool = None,
+                 connect_timeout: float = None, read_timeout: float = None,
+                 http2: bool = None):
+        self.name = name
+        self.pool_size = pool_size or Config.HTTP_POOL_SIZE
+        self.keep_alive = Config.HTTP_KEEP_ALIVE if keep_alive is None else keep_alive
+        self.timeout = (
+            connect_timeout or Config.HTTP_CONNECT_TIMEOUT,
+            read_timeout or Config.HTTP_READ_TIMEOUT
+        )
+        http2 = Config.HTTP2 if http2 is None else http2
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections = 0  # Backend httpx uniquement (via trace)
+
+        if http2 and httpx is None:
+            print(f"⚠️  {name}: HTTP2=true mais httpx absent, fallback HTTP/1.1")
+            print("   pip install 'httpx[http2]'")
+            http2 = False
+
+        self.http2 = http2
+        if http2:
+            self._client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size if self.keep_alive else 0
+                )
+            )
+        else:
+            self._client = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=self.pool_size,
+                pool_block=True,
+                max_retries=0  # Les retries sont gérés par rate_limiter.py
+            )
+            self._client.mount("https://", adapter)
+            self._client.mount("http://", adapter)
+            self._adapter = adapter
+
+    def request(self, method: str, url: str, headers: Dict = None, **kwargs):
+        """Envoie une requête via le pool (chronométrée si un observateur est branché)"""
+        if not _observers:
+            return self._send(method, url, headers, **kwargs)
+
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self._send(method, url, headers, **kwargs)
+            return response
+        finally:
+            notify_request(self.name, method, url, response, time.perf_counter() - start)
+
+    def _send(self, method: str, url: str, headers: Dict = None, **kwargs):
+        headers = dict(headers or {})
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+
+        with self._lock:
+            self._requests += 1
+
+        if not self.http2:
+            kwargs.setdefault("timeout", self.timeout)
+            try:
+                return self._client.request(method, url, headers=headers, **kwargs)
+            except requests.ConnectionError as e:
+                # Connexion refusée / DNS / timeout de connexion : rien n'a été envoyé
+                reason = getattr(e.args[0], "reason", None) if e.args else None
+                if isinstance(e, requests.ConnectTimeout) or isinstance(reason, ConnectTimeoutError):
+                    raise ConnectError(str(e)) from e
+                raise
+
+        kwargs.setdefault("extensions", {"trace": self._trace})
+        try:
+            return self._client.request(method, url, headers=headers, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            raise ConnectError(str(e)) from e
+        except httpx.TransportError as e:
+            # Même contrat que requests (OSError) pour rate_limiter.py
+            raise ConnectionError(str(e)) from e
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _trace(self, event_name: str, info: Dict):
+        """Hook httpcore : compte les nouvelles connexions TCP"""
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._connections += 1
+
+    def stats(self) -> Dict:
+        """Connexions ouvertes / réutilisées depuis la création de la session"""
+        if self.http2:
+            opened = self._connections
+        else:
+            pools = self._adapter.poolmanager.pools
+            opened = sum(pools[key].num_connections for key in pools.keys())
+
+        return {
+            "backend": "httpx/h2" if self.http2 else "requests",
+            "pool_size": self.pool_size,
+            "keep_alive": self.keep_alive,
+            "requests": self._requests,
+            "connections_opened": opened,
+            "connections_reused": max(0, self._requests - opened)
+        }
+
+    def close(self):
+        self._client.close()
+
+# =============================================================================
+# REGISTRE PARTAGÉ
+# =============================================================================
+
+_sessions: Dict[str, PooledSession] = {}
+_registry_lock = threading.Lock()
+
+# Observateurs de requêtes : callback(service, method, url, response, secondes)
+# (response None = erreur réseau), voir import_metrics.py
+_observers: List[Callable] = []
+
+
+def add_request_observer(callback: Callable):
+    """Branche un observateur appelé après chaque requête de toutes les sessions"""
+    _observers.append(callback)
+
+
+def notify_request(service: str, method: str, url: str, response, seconds: float):
+    for callback in _observers:
+        callback(service, method, url, response, seconds)
+
+
+def get_session(name: str) -> PooledSession:
+    """Retourne la session partagée d'un service (créée au premier appel)"""
+    with _registry_lock:
+        if name not in _sessions:
+            _sessions[name] = PooledSession(name)
+        return _sessions[name]
+
+
+def register_session(key: str, session):
+    """Ajoute aux statistiques une session créée ailleurs (sessions httpx async, voir async_clients.py)"""
+    with _registry_lock:
+        _sessions[key] = session
+
+
+def pool_stats() -> Dict[str, Dict]:
+    """Statistiques de toutes les sessions du process"""
+    with _registry_lock:
+        return {name: session.stats() for name, session in _sessions.items()}
+
+
+def print_pool_stats():
+    """Affiche les statistiques des pools (fin de run)"""
+    for name, stats in pool_stats().items():
+        print(f"🔌 {name}: {stats['requests']} requêtes, "
+              f"{stats['connections_opened']} connexions ouvertes, "
+              f"{stats['connections_reused']} réutilisées ({stats['backend']})")
@@ -7,19 +7,36 @@ Notion to SiYuan - Import des données dans les Attribute Views
 Ils doivent être recréés manuellement dans SiYuan (voir PROJECT_PLAN.md Phase 5)
 """
 
-import requests
 import os
 import json
 import time
+import argparse
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+from http_session import get_session, pool_stats, print_pool_stats
+from notion_cache import get_cache, print_cache_stats
+from notion_fixtures import fixture_limiter, get_fixture_session
+from notion_renderer import render_markdown
+from notion_snapshot import get_snapshot, Config as SnapshotConfig
+from checkpoint_journal import CheckpointJournal
+from import_metrics import get_metrics
+from profiling import add_profile_arguments, profiled
+from rate_limiter import notion_limiter, siyuan_limiter
+from render_pool import RenderPool
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 
 class Config:
     NOTION_TOKEN = os.getenv("NOTION_TOKEN")
+    NOTION_API_URL = os.getenv("NOTION_API_URL", "https://api.notion.com/v1")  # Surchargé par les mocks (benchmark)
+    NOTION_FIXTURES = os.getenv("NOTION_FIXTURES")  # Répertoire de fixtures : Notion lu sur disque (generate_workspace.py)
     SIYUAN_URL = os.getenv("SIYUAN_URL", "http://192.168.1.11:6806")
     SIYUAN_TOKEN = os.getenv("SIYUAN_TOKEN")
     
@@ -28,9 +45,30 @@ class Config:
     
     # Options
     BATCH_SIZE = int(os.getenv("BATCH_SIZE", "10"))
-    DELAY_BETWEEN_CALLS = float(os.getenv("DELAY_BETWEEN_CALLS", "0.3"))
     DRY_RUN = os.getenv("DRY_RUN", "false").lower() == "true"
     
+    # Import concurrent : nombre d'entrées traitées en parallèle (1 = séquentiel)
+    IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+    
+    # Databases importées en parallèle, les plus grosses d'abord (1 = l'une après l'autre).
+    # Le budget de requêtes reste global : un seul token bucket par service.
+    DB_WORKERS = int(os.getenv("DB_WORKERS", "2"))
+    
+    # Arbre des blocs : profondeur max et fetchs de sous-arbres en parallèle
+    BLOCK_TREE_MAX_DEPTH = int(os.getenv("BLOCK_TREE_MAX_DEPTH", "10"))
+    BLOCK_FETCH_CONCURRENCY = int(os.getenv("BLOCK_FETCH_CONCURRENCY", "4"))
+    
+    # Mode --async : entrées en vol sur la boucle asyncio (voir async_clients.py)
+    ASYNC_IN_FLIGHT = int(os.getenv("ASYNC_IN_FLIGHT", "256"))
+    
+    # Écriture des attributes par lots (1 = un setBlockAttrs par entrée)
+    ATTR_BATCH_SIZE = int(os.getenv("ATTR_BATCH_SIZE", "50"))
+    ATTR_FLUSH_INTERVAL = float(os.getenv("ATTR_FLUSH_INTERVAL", "2.0"))  # secondes
+    
+    # Rate limits par service : voir rate_limiter.py (NOTION_MAX_RPS, SIYUAN_MAX_RPS...)
+    
+    # Rendu Markdown sur un pool de processus en mode snapshot : voir render_pool.py (RENDER_WORKERS...)
+    
     # Test limité
     TEST_LIMIT = int(os.getenv("TEST_LIMIT", "0"))  # 0 = tous, N = limiter à N entrées
     
@@ -40,116 +78,285 @@ class Config:
 # CLIENTS API
 # =============================================================================
 
+class NotionFetchError(Exception):
+    """Lecture Notion en échec : le contenu de la page serait incomplet"""
+
+
 class NotionClient:
     """Client pour l'API Notion"""
     
+    # Blocs dont les enfants sont des documents à part entière
+    NO_DESCEND_TYPES = {"child_page", "child_database"}
+    
     def __init__(self, token: str):
         self.token = token
-        self.base_url = "https://api.notion.com/v1"
+        self.base_url = Config.NOTION_API_URL
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json"
         }
+        if Config.NOTION_FIXTURES:
+            # Workspace sur disque : aucun appel réseau, pas de rate limit
+            self.http = get_fixture_session(Config.NOTION_FIXTURES)
+            self.rate_limiter = fixture_limiter()
+        else:
+            self.http = get_session("Notion")
+            self.rate_limiter = notion_limiter()
+        self.cache = get_cache()
+        self.offline = bool(self.cache and self.cache.offline)
+        self.snapshot = get_snapshot()  # Export local (notion_snapshot.py) : prioritaire sur tout le reste
+        self._block_executor = None
+        self._executor_lock = threading.Lock()
     
     def get_database(self, database_id: str) -> Dict:
         """Récupère les infos d'une database"""
-        response = requests.get(
+        if self.snapshot:
+            return self.snapshot.database(database_id)
+        if self.offline:
+            return self.cache.get("database", database_id) or {}
+        
+        response = self.rate_limiter.call(lambda: self.http.get(
             f"{self.base_url}/databases/{database_id}",
             headers=self.headers
-        )
-        return response.json() if response.status_code == 200 else {}
+        ))
+        if response.status_code != 200:
+            return {}
+        
+        database = response.json()
+        if self.cache:
+            self.cache.put("database", database_id, database, database.get("last_edited_time", ""))
+        return database
     
-    def query_database(self, database_id: str, limit: int = 0) -> List[Dict]:
-        """Récupère les entrées d'une database"""
-        entries = []
+    def iter_database(self, database_id: str, limit: int = 0,
+                      edited_since: Optional[str] = None, status: Dict = None):
+        """
+        Itère sur les entrées d'une database, page de curseur par page.
+        
+        Les entrées sont yieldées dès que chaque page de 100 arrive : la
+        mémoire reste constante et l'import démarre sans attendre la fin
+        de la query. `limit` arrête le curseur au lieu de tronquer après.
+        
+        Avec `edited_since` (ISO 8601), seules les entrées modifiées depuis
+        cette date sont retournées (filtre last_edited_time côté Notion).
+        
+        Si `status` est fourni, status["complete"] passe à True quand le
+        curseur est arrivé au bout sans erreur.
+        """
+        if status is None:
+            status = {}
+        status["complete"] = False
+        
+        if self.snapshot:
+            yield from self.snapshot.iter_entries(database_id, limit, edited_since)
+            status["complete"] = True
+            return
+        
+        if self.offline:
+            status["complete"] = yield from self._replay_database(database_id, limit, edited_since)
+            return
+        
+        # Seule une query complète (non filtrée) est rejouable
+        cacheable = self.cache is not None and limit == 0 and not edited_since
+        if cacheable:
+            self.cache.invalidate_query(database_id)
+        
+        count = 0
+        pages = 0
         has_more = True
         start_cursor = None
         
         while has_more:
-            payload = {"page_size": 100}
+            page_size = min(100, limit - count) if limit > 0 else 100
+            payload = {"page_size": page_size}
             if start_cursor:
                 payload["start_cursor"] = start_cursor
+            if edited_since:
+                payload["filter"] = {
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": edited_since}
+                }
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: self.http.post(
                 f"{self.base_url}/databases/{database_id}/query",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             
             if response.status_code != 200:
-                print(f"❌ Erreur query database: {response.status_code}")
-                break
+                print(f"❌ Erreur query database: {response.status_code} ({count} entrées partielles)")
+                return
             
             data = response.json()
             batch = data.get("results", [])
-            entries.extend(batch)
+            has_more = data.get("has_more", False)
+            start_cursor = data.get("next_cursor")
             
-            # Limiter si demandé
-            if limit > 0 and len(entries) >= limit:
-                entries = entries[:limit]
-                break
+            if cacheable:
+                self.cache.put("query_page", f"{database_id}:{pages}", batch)
+            pages += 1
+            
+            for entry in batch:
+                yield entry
+                count += 1
+            
+            # Limiter si demandé : on n'avance plus le curseur
+            if limit > 0 and count >= limit:
+                return
+        
+        status["complete"] = True
+        
+        # Query complète : marqueur pour le replay offline
+        if cacheable:
+            self.cache.put("query", database_id, {"pages": pages, "entries": count})
+    
+    def _replay_database(self, database_id: str, limit: int, edited_since: Optional[str]):
+        """
+        Replay offline d'une query complète, page par page depuis le cache.
+        
+        Retourne (valeur du générateur) True si toutes les pages étaient en
+        cache, False si le replay est incomplet.
+        """
+        marker = self.cache.get("query", database_id)
+        if marker is None:
+            print(f"⚠️  Database {database_id} absente du cache (offline)")
+            return False
+        
+        count = 0
+        for page in range(marker["pages"]):
+            batch = self.cache.get("query_page", f"{database_id}:{page}")
+            if batch is None:
+                print(f"❌ Database {database_id} : page {page + 1}/{marker['pages']} absente du cache, "
+                      f"replay incomplet (relancer sans NOTION_CACHE_OFFLINE)")
+                return False
+            for entry in batch:
+                if edited_since and entry.get("last_edited_time", "") < edited_since:
+                    continue
+                yield entry
+                count += 1
+                if limit > 0 and count >= limit:
+                    return True
+        return True
+    
+    def query_database(self, database_id: str, limit: int = 0,
+                       edited_since: Optional[str] = None) -> List[Dict]:
+        """Récupère toutes les entrées d'une database dans une liste"""
+        return list(self.iter_database(database_id, limit, edited_since))
+    
+    def get_block_children(self, block_id: str) -> List[Dict]:
+        """
+        Récupère tous les blocs enfants directs (suit les curseurs has_more).
+        Lève NotionFetchError si une page de résultats est en échec.
+        """
+        blocks = []
+        has_more = True
+        start_cursor = None
+        
+        while has_more:
+            params = {"page_size": 100}
+            if start_cursor:
+                params["start_cursor"] = start_cursor
+            
+            response = self.rate_limiter.call(lambda: self.http.get(
+                f"{self.base_url}/blocks/{block_id}/children",
+                headers=self.headers,
+                params=params
+            ))
+            
+            if response.status_code != 200:
+                # Jamais d'arbre tronqué : il serait caché (et exporté) comme complet
+                raise NotionFetchError(f"blocs {block_id}: HTTP {response.status_code} ({len(blocks)} blocs lus)")
+            
+            data = response.json()
+            blocks.extend(data.get("results", []))
             
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
+        
+        return blocks
+    
+    def get_block_tree(self, block_id: str, max_depth: int = None,
+                       last_edited_time: str = None) -> List[Dict]:
+        """
+        Récupère l'arbre complet des blocs d'une page.
+        
+        Parcours niveau par niveau : tous les sous-arbres d'un même niveau
+        sont récupérés en parallèle (BLOCK_FETCH_CONCURRENCY). Les enfants
+        sont attachés sous la clé "children" de chaque bloc.
+        Les sous-pages et sous-databases ne sont pas parcourues.
+        
+        Avec `last_edited_time`, l'arbre est servi par le cache disque
+        tant que la page n'a pas été modifiée. Seul un arbre complet est
+        caché : un fetch en échec lève NotionFetchError.
+        """
+        if max_depth is None:
+            max_depth = Config.BLOCK_TREE_MAX_DEPTH
+        
+        if self.snapshot:
+            return self.snapshot.blocks(block_id)
+        
+        if self.cache and (last_edited_time or self.offline):
+            cached = self.cache.get("blocks", block_id, last_edited_time)
+            if cached is not None:
+                return cached
+            if self.offline:
+                return []
+        
+        tree = self.get_block_children(block_id)
+        level = tree
+        depth = 1
+        
+        while level and depth < max_depth:
+            parents = [
+                block for block in level
+                if block.get("has_children") and block.get("type") not in self.NO_DESCEND_TYPES
+            ]
+            if not parents:
+                break
             
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
+            executor = self._get_block_executor()
+            futures = [executor.submit(self.get_block_children, block["id"]) for block in parents]
+            
+            level = []
+            for block, future in zip(parents, futures):
+                block["children"] = future.result()
+                level.extend(block["children"])
+            depth += 1
+        
+        if self.cache and last_edited_time:
+            self.cache.put("blocks", block_id, tree, last_edited_time)
         
-        return entries
+        return tree
     
-    def get_page_content(self, page_id: str) -> str:
+    def _get_block_executor(self) -> ThreadPoolExecutor:
+        """Pool partagé pour les fetchs de sous-arbres (borne la concurrence globale)"""
+        with self._executor_lock:
+            if self._block_executor is None:
+                self._block_executor = ThreadPoolExecutor(
+                    max_workers=max(1, Config.BLOCK_FETCH_CONCURRENCY),
+                    thread_name_prefix="notion-blocks"
+                )
+            return self._block_executor
+    
+    def get_page_content(self, page_id: str, last_edited_time: str = None) -> str:
         """Récupère le contenu Markdown d'une page"""
-        # Récupérer les blocs
-        response = requests.get(
-            f"{self.base_url}/blocks/{page_id}/children",
-            headers=self.headers,
-            params={"page_size": 100}
-        )
-        
-        if response.status_code != 200:
-            return ""
-        
-        blocks = response.json().get("results", [])
-        
-        # Conversion simplifiée en Markdown
-        markdown_lines = []
-        for block in blocks:
-            block_type = block.get("type")
-            if block_type == "paragraph":
-                text = self._extract_rich_text(block.get("paragraph", {}).get("rich_text", []))
-                if text:
-                    markdown_lines.append(text)
-            elif block_type == "heading_1":
-                text = self._extract_rich_text(block.get("heading_1", {}).get("rich_text", []))
-                if text:
-                    markdown_lines.append(f"# {text}")
-            elif block_type == "heading_2":
-                text = self._extract_rich_text(block.get("heading_2", {}).get("rich_text", []))
-                if text:
-                    markdown_lines.append(f"## {text}")
-            elif block_type == "heading_3":
-                text = self._extract_rich_text(block.get("heading_3", {}).get("rich_text", []))
-                if text:
-                    markdown_lines.append(f"### {text}")
-            elif block_type == "bulleted_list_item":
-                text = self._extract_rich_text(block.get("bulleted_list_item", {}).get("rich_text", []))
-                if text:
-                    markdown_lines.append(f"- {text}")
-            elif block_type == "numbered_list_item":
-                text = self._extract_rich_text(block.get("numbered_list_item", {}).get("rich_text", []))
-                if text:
-                    markdown_lines.append(f"1. {text}")
-        
-        return "\n\n".join(markdown_lines)
-    
-    def _extract_rich_text(self, rich_text: List[Dict]) -> str:
-        """Extrait le texte d'un tableau de rich_text"""
-        return "".join([t.get("plain_text", "") for t in rich_text])
+        # Récupérer l'arbre des blocs (paginé + récursif, caché par last_edited_time)
+        tree = self.get_block_tree(page_id, last_edited_time=last_edited_time)
+        return self.render_markdown(tree)
+    
+    @staticmethod
+    def render_markdown(tree: List[Dict]) -> str:
+        """Arbre des blocs → Markdown (notion_renderer.py)"""
+        return render_markdown(tree)
 
 
 class SiYuanClient:
     """Client pour l'API SiYuan"""
     
+    # Écritures rejouées seulement si SiYuan ne les a pas reçues (429, connexion
+    # impossible) : après un 5xx ou un timeout, le document existe peut-être déjà
+    NOT_IDEMPOTENT = frozenset({"/filetree/createDocWithMd"})
+    
     def __init__(self, url: str, token: str):
         self.url = url
         self.token = token
@@ -157,14 +364,16 @@ class SiYuanClient:
             "Authorization": f"token {token}",
             "Content-Type": "application/json"
         }
+        self.http = get_session("SiYuan")
+        self.rate_limiter = siyuan_limiter()
     
     def _call_api(self, endpoint: str, data: Dict = None) -> Dict:
         """Appel générique à l'API SiYuan"""
-        response = requests.post(
+        response = self.rate_limiter.call(lambda: self.http.post(
             f"{self.url}/api{endpoint}",
             headers=self.headers,
             json=data or {}
-        )
+        ), idempotent=endpoint not in self.NOT_IDEMPOTENT)
         
         if response.status_code != 200:
             print(f"❌ Erreur SiYuan API {endpoint}: {response.status_code}")
@@ -214,6 +423,181 @@ class SiYuanClient:
         if result.get("code") == 0:
             return result.get("data", {})
         return {}
+    
+    def query_sql(self, stmt: str) -> Optional[List[Dict]]:
+        """Requête SQL en lecture sur la base de SiYuan (None si erreur)"""
+        result = self._call_api("/query/sql", {"stmt": stmt})
+        
+        if result.get("code") == 0:
+            return result.get("data") or []
+        return None
+    
+    def set_blocks_attrs(self, items: List[tuple]) -> bool:
+        """
+        Définit les attributes de plusieurs blocs en une seule requête
+        (/api/transactions, opérations updateAttrs).
+        `items` : liste de (block_id, attrs)
+        """
+        operations = [
+            {"action": "updateAttrs", "id": block_id, "data": {"old": {}, "new": attrs}}
+            for block_id, attrs in items
+        ]
+        result = self._call_api("/transactions", {
+            "session": "notion-migrator",
+            "app": "notion-migrator",
+            "reqId": int(time.time() * 1000),
+            "transactions": [{"doOperations": operations, "undoOperations": []}]
+        })
+        
+        return result.get("code") == 0
+    
+    def flush_transactions(self) -> bool:
+        """Attend que SiYuan ait appliqué les transactions en file (traitées en asynchrone)"""
+        result = self._call_api("/sqlite/flushTransaction")
+        return result.get("code") == 0
+
+
+class AttrBatchWriter:
+    """
+    Regroupe les écritures d'attributes et les envoie par lots.
+    
+    Un lot part dès ATTR_BATCH_SIZE blocs en attente, ou quand le plus ancien
+    attend depuis ATTR_FLUSH_INTERVAL secondes. Si /api/transactions échoue,
+    on repasse en setBlockAttrs unitaire pour le reste du run.
+    
+    SiYuan applique /api/transactions en asynchrone : les callbacks de succès
+    (checkpoint ATTRS_SET) ne partent qu'après /api/sqlite/flushTransaction.
+    Sans cet endpoint, ils ne partent pas : --resume réécrit alors ces
+    attributes (idempotent) au lieu de risquer de les sauter.
+    """
+    
+    def __init__(self, client: SiYuanClient, batch_size: int, flush_interval: float):
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.batching = self.batch_size > 1
+        
+        self._failed = []  # (tag, block_id) en échec, relevés via take_failures()
+        self.requests_sent = 0
+        self.flush_supported = True  # /api/sqlite/flushTransaction disponible
+        
+        self._buffer = []  # (block_id, attrs, on_success, tag)
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._sending = 0  # Lots en cours d'envoi (flush attend qu'ils soient confirmés)
+        self._stop = threading.Event()
+        self._timer = None
+        if self.batching:
+            self._timer = threading.Thread(target=self._flush_loop, name="attr-flush", daemon=True)
+            self._timer.start()
+    
+    def add(self, block_id: str, attrs: Dict[str, str], on_success=None, tag: str = None):
+        """
+        Met en file les attributes d'un bloc (thread-safe).
+        `tag` (id de database) permet de relever les échecs par database.
+        """
+        item = (block_id, attrs, on_success, tag)
+        if not self.batching:
+            with self._lock:
+                self._sending += 1
+            self._send([item])
+            return
+        
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(item)
+            batch = self._take() if len(self._buffer) >= self.batch_size else None
+        
+        if batch:
+            self._send(batch)
+    
+    def flush(self):
+        """Envoie tout ce qui est en attente et attend la fin des envois en cours"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+        
+        with self._idle:
+            while self._sending:
+                self._idle.wait()
+    
+    def close(self):
+        self._stop.set()
+        if self._timer:
+            self._timer.join()
+        self.flush()
+    
+    def take_failures(self, tag: str = None) -> List[str]:
+        """Retire et retourne les block_ids en échec (d'un tag, ou tous)"""
+        with self._lock:
+            taken = [block_id for t, block_id in self._failed if tag is None or t == tag]
+            self._failed = [(t, block_id) for t, block_id in self._failed if tag is not None and t != tag]
+        return taken
+    
+    def _take(self) -> List[tuple]:
+        # Appelé sous self._lock ; le lot retourné doit passer par _send()
+        batch, self._buffer = self._buffer, []
+        if batch:
+            self._sending += 1
+        return batch
+    
+    def _flush_loop(self):
+        """Flush temporel : un lot ne reste jamais plus de flush_interval en attente"""
+        while not self._stop.wait(self.flush_interval / 2):
+            with self._lock:
+                due = self._buffer and time.monotonic() - self._oldest >= self.flush_interval
+                batch = self._take() if due else None
+            if batch:
+                self._send(batch)
+    
+    def _send(self, batch: List[tuple]):
+        try:
+            with get_metrics().stage("set_attrs"):
+                self._send_batch(batch)
+        finally:
+            with self._idle:
+                self._sending -= 1
+                self._idle.notify_all()
+    
+    def _count_request(self):
+        with self._lock:
+            self.requests_sent += 1
+    
+    def _confirm_transactions(self) -> bool:
+        """Transactions appliquées par SiYuan ? (False si on ne peut pas le savoir)"""
+        if not self.flush_supported:
+            return False
+        self._count_request()
+        if self.client.flush_transactions():
+            return True
+        print("⚠️  /api/sqlite/flushTransaction indisponible : attributes non journalisés (--resume les réécrira)")
+        self.flush_supported = False
+        return False
+    
+    def _send_batch(self, batch: List[tuple]):
+        if self.batching and len(batch) > 1:
+            self._count_request()
+            if self.client.set_blocks_attrs([(block_id, attrs) for block_id, attrs, _, _ in batch]):
+                if self._confirm_transactions():
+                    for _, _, on_success, _ in batch:
+                        if on_success:
+                            on_success()
+                return
+            
+            print("⚠️  /api/transactions indisponible, retour à setBlockAttrs unitaire")
+            self.batching = False
+        
+        for block_id, attrs, on_success, tag in batch:
+            self._count_request()
+            if self.client.set_block_attrs(block_id, attrs):
+                if on_success:
+                    on_success()
+            else:
+                with self._lock:
+                    self._failed.append((tag, block_id))
 
 
 # =============================================================================
@@ -223,98 +607,186 @@ class SiYuanClient:
 class PropertyConverter:
     """Convertit les propriétés Notion en attributes SiYuan"""
     
+    # ⚠️ SKIP : Rollups et formules ne sont PAS importés
+    # Raison : Risque d'erreurs, complexité du mapping
+    # Action : Recréer manuellement dans SiYuan après import
+    SKIPPED_TYPES = frozenset({"rollup", "formula"})
+    
     @staticmethod
-    def convert_property_value(prop_type: str, prop_value: Any) -> Optional[str]:
+    def _convert_text(prop_value: Any) -> Optional[str]:
+        # Title, Rich text
+        if isinstance(prop_value, list):
+            return "".join([t.get("plain_text", "") for t in prop_value])
+        return None
+    
+    @staticmethod
+    def _convert_number(prop_value: Any) -> Optional[str]:
+        return str(prop_value) if prop_value is not None else None
+    
+    @staticmethod
+    def _convert_select(prop_value: Any) -> Optional[str]:
+        if isinstance(prop_value, dict):
+            return prop_value.get("name")
+        return None
+    
+    @staticmethod
+    def _convert_multi_select(prop_value: Any) -> Optional[str]:
+        if isinstance(prop_value, list):
+            return ", ".join([opt.get("name", "") for opt in prop_value])
+        return None
+    
+    @staticmethod
+    def _convert_date(prop_value: Any) -> Optional[str]:
+        if isinstance(prop_value, dict):
+            start = prop_value.get("start", "")
+            end = prop_value.get("end")
+            if end:
+                return f"{start} → {end}"
+            return start
+        return None
+    
+    @staticmethod
+    def _convert_checkbox(prop_value: Any) -> Optional[str]:
+        return "true" if prop_value else "false"
+    
+    @staticmethod
+    def _convert_string(prop_value: Any) -> Optional[str]:
+        # URL, Email, Phone, Created/Last edited time
+        return prop_value if isinstance(prop_value, str) else None
+    
+    @staticmethod
+    def _convert_relation(prop_value: Any) -> Optional[str]:
+        # On stocke les IDs pour reconnexion plus tard
+        if isinstance(prop_value, list):
+            ids = [rel.get("id") for rel in prop_value]
+            return ",".join(ids) if ids else None
+        return None
+    
+    @staticmethod
+    def _convert_files(prop_value: Any) -> Optional[str]:
+        if isinstance(prop_value, list):
+            urls = [f.get("file", {}).get("url", "") or f.get("external", {}).get("url", "") 
+                   for f in prop_value]
+            return ", ".join([u for u in urls if u])
+        return None
+    
+    @staticmethod
+    def _convert_people(prop_value: Any) -> Optional[str]:
+        if isinstance(prop_value, list):
+            names = [p.get("name", "") for p in prop_value]
+            return ", ".join([n for n in names if n])
+        return None
+    
+    @staticmethod
+    def _convert_user(prop_value: Any) -> Optional[str]:
+        # Created by, Last edited by
+        if isinstance(prop_value, dict):
+            return prop_value.get("name", "")
+        return None
+    
+    # Table de dispatch : type Notion → convertisseur
+    CONVERTERS = {
+        "title": _convert_text.__func__,
+        "rich_text": _convert_text.__func__,
+        "number": _convert_number.__func__,
+        "select": _convert_select.__func__,
+        "multi_select": _convert_multi_select.__func__,
+        "date": _convert_date.__func__,
+        "checkbox": _convert_checkbox.__func__,
+        "url": _convert_string.__func__,
+        "email": _convert_string.__func__,
+        "phone_number": _convert_string.__func__,
+        "relation": _convert_relation.__func__,
+        "files": _convert_files.__func__,
+        "people": _convert_people.__func__,
+        "created_time": _convert_string.__func__,
+        "last_edited_time": _convert_string.__func__,
+        "created_by": _convert_user.__func__,
+        "last_edited_by": _convert_user.__func__,
+    }
+    
+    @staticmethod
+    def attr_name(prop_name: str) -> str:
+        """Normalise le nom de l'attribute (custom-XXX)"""
+        return f"custom-{prop_name.lower().replace(' ', '-')}"
+    
+    @classmethod
+    def convert_property_value(cls, prop_type: str, prop_value: Any) -> Optional[str]:
         """Convertit une valeur de propriété Notion en string pour SiYuan"""
         
         if not prop_value:
             return None
         
-        # Title
-        if prop_type == "title":
-            if isinstance(prop_value, list):
-                return "".join([t.get("plain_text", "") for t in prop_value])
-        
-        # Rich text
-        elif prop_type == "rich_text":
-            if isinstance(prop_value, list):
-                return "".join([t.get("plain_text", "") for t in prop_value])
-        
-        # Number
-        elif prop_type == "number":
-            return str(prop_value) if prop_value is not None else None
-        
-        # Select
-        elif prop_type == "select":
-            if isinstance(prop_value, dict):
-                return prop_value.get("name")
-        
-        # Multi-select
-        elif prop_type == "multi_select":
-            if isinstance(prop_value, list):
-                return ", ".join([opt.get("name", "") for opt in prop_value])
-        
-        # Date
-        elif prop_type == "date":
-            if isinstance(prop_value, dict):
-                start = prop_value.get("start", "")
-                end = prop_value.get("end")
-                if end:
-                    return f"{start} → {end}"
-                return start
-        
-        # Checkbox
-        elif prop_type == "checkbox":
-            return "true" if prop_value else "false"
-        
-        # URL
-        elif prop_type == "url":
-            return prop_value if isinstance(prop_value, str) else None
-        
-        # Email
-        elif prop_type == "email":
-            return prop_value if isinstance(prop_value, str) else None
-        
-        # Phone
-        elif prop_type == "phone_number":
-            return prop_value if isinstance(prop_value, str) else None
-        
-        # Relation (on stocke les IDs pour reconnexion plus tard)
-        elif prop_type == "relation":
-            if isinstance(prop_value, list):
-                ids = [rel.get("id") for rel in prop_value]
-                return ",".join(ids) if ids else None
-        
-        # Rollup et Formula → SKIP (à recréer manuellement)
-        elif prop_type in ["rollup", "formula"]:
-            # ⚠️ SKIP : Ces propriétés ne sont PAS importées
-            # Raison : Risque d'erreurs, complexité du mapping
-            # Action : Recréer manuellement dans SiYuan après import
-            return None  # Retourne None pour ignorer
-        
-        # Files
-        elif prop_type == "files":
-            if isinstance(prop_value, list):
-                urls = [f.get("file", {}).get("url", "") or f.get("external", {}).get("url", "") 
-                       for f in prop_value]
-                return ", ".join([u for u in urls if u])
-        
-        # People
-        elif prop_type == "people":
-            if isinstance(prop_value, list):
-                names = [p.get("name", "") for p in prop_value]
-                return ", ".join([n for n in names if n])
-        
-        # Created time, Last edited time
-        elif prop_type in ["created_time", "last_edited_time"]:
-            return prop_value if isinstance(prop_value, str) else None
+        converter = cls.CONVERTERS.get(prop_type)
+        return converter(prop_value) if converter else None
+    
+    @classmethod
+    def compile_plan(cls, db_info: Dict) -> "ConversionPlan":
+        """Compile le plan de conversion d'une database (une fois par database)"""
+        return ConversionPlan(db_info, cls.CONVERTERS, cls.SKIPPED_TYPES)
+
+
+class ConversionPlan:
+    """
+    Plan de conversion précompilé pour une database du migration_plan.json :
+    clé du titre, noms d'attributes, table de dispatch et types ignorés.
+    La conversion d'une entrée se réduit à une boucle sur ses propriétés.
+    """
+    
+    def __init__(self, db_info: Dict, converters: Dict, skipped_types: frozenset):
+        self.db_id = db_info["id"]
+        self.db_title = db_info["title"]
+        self.converters = converters
+        self.skipped_types = skipped_types
+        
+        properties = db_info["properties"]
+        self.title_key = next((p["name"] for p in properties if p.get("notion_type") == "title"), None)
+        self.attr_names = {p["name"]: PropertyConverter.attr_name(p["name"]) for p in properties}
+        self.db_attr_names = frozenset(self.attr_names.values())
+        self.relation_attr_names = frozenset(
+            self.attr_names[p["name"]] for p in properties if p.get("notion_type") == "relation"
+        )
         
-        # Created by, Last edited by
-        elif prop_type in ["created_by", "last_edited_by"]:
-            if isinstance(prop_value, dict):
-                return prop_value.get("name", "")
+        self.rollups = sum(1 for p in properties if p.get("notion_type") == "rollup")
+        self.formulas = sum(1 for p in properties if p.get("notion_type") == "formula")
+    
+    def title(self, entry: Dict) -> str:
+        """Titre d'une entrée"""
+        if not self.title_key:
+            return "Sans titre"
+        title_value = entry.get("properties", {}).get(self.title_key, {})
+        return PropertyConverter._convert_text(title_value.get("title", [])) or "Sans titre"
+    
+    def convert(self, entry: Dict) -> Dict[str, str]:
+        """Convertit les propriétés d'une entrée en attributes SiYuan"""
+        attrs = {}
+        converters = self.converters
+        skipped_types = self.skipped_types
+        attr_names = self.attr_names
         
-        return None
+        for prop_name, prop_data in entry.get("properties", {}).items():
+            prop_type = prop_data.get("type")
+            if prop_type in skipped_types:
+                continue
+            
+            converter = converters.get(prop_type)
+            prop_value = prop_data.get(prop_type)
+            if converter is None or not prop_value:
+                continue
+            
+            converted = converter(prop_value)
+            if converted:
+                # Propriété absente du plan (plan ancien) : nom calculé puis mémorisé
+                attr_name = attr_names.get(prop_name)
+                if attr_name is None:
+                    attr_name = attr_names[prop_name] = PropertyConverter.attr_name(prop_name)
+                attrs[attr_name] = converted
+        
+        # Ajouter des metadata
+        attrs["custom-notion-id"] = entry["id"]
+        attrs["custom-notion-db"] = self.db_title
+        
+        return attrs
 
 
 # =============================================================================
@@ -324,18 +796,46 @@ class PropertyConverter:
 class DataImporter:
     """Importe les données Notion dans les Attribute Views SiYuan"""
     
-    def __init__(self):
+    def __init__(self, resume: bool = False, sync: bool = False, use_async: bool = False):
+        self.resume = resume
+        self.sync = sync
+        self.use_async = use_async and not Config.DRY_RUN
+        self.async_notion = None  # Clients async, créés dans la boucle (--async)
+        self.async_siyuan = None
         self.notion_client = NotionClient(Config.NOTION_TOKEN)
         self.siyuan_client = SiYuanClient(Config.SIYUAN_URL, Config.SIYUAN_TOKEN)
+        self.attr_writer = None  # AttrBatchWriter, créé au lancement de l'import
+        self.render_pool = None  # RenderPool, en mode snapshot (rendu = CPU pur)
+        self._rendered = {}      # Notion page ID → Markdown rendu en amont par le pool
         self.converter = PropertyConverter()
+        self._plans = {}  # db_id → ConversionPlan
         
         # Mappings
         self.notion_to_siyuan_ids = {}  # Notion page ID → SiYuan block ID
+        self._mapping_lock = threading.Lock()  # Écrit depuis les workers
+        self._stats_lock = threading.Lock()    # Plusieurs databases en parallèle
+        self._stop = threading.Event()         # Ctrl-C : plus de nouvelles entrées
+        
+        # Timers par étape, requêtes par endpoint, progression (import_metrics.py)
+        self.metrics = get_metrics()
+        self._done = 0               # Entrées terminées, toutes databases
+        self._expected = None        # Total attendu (entry_count du plan), si connu
+        
+        # Journal de checkpoints (reprise avec --resume)
+        self.journal = CheckpointJournal(os.path.join(Config.OUTPUT_DIR, "import_journal.jsonl"))
+        
+        # Sync incrémental : high-water mark last_edited_time par database
+        self.sync_state_file = os.path.join(Config.OUTPUT_DIR, "sync_state.json")
+        self.sync_state = {}
         
         # Stats
         self.stats = {
             "databases_processed": 0,
             "entries_imported": 0,
+            "entries_resumed": 0,
+            "entries_updated": 0,
+            "entries_unchanged": 0,
+            "attrs_changed": 0,
             "rollups_skipped": 0,
             "formulas_skipped": 0,
             "errors": []
@@ -354,8 +854,11 @@ class DataImporter:
             print(f"🧪 TEST MODE: Limité à {Config.TEST_LIMIT} entrées par database")
         print()
         
-        # Charger le plan de migration
+        # Charger le plan de migration (celui du snapshot s'il y en a un)
         plan_file = os.path.join(Config.OUTPUT_DIR, "migration_plan.json")
+        snapshot = self.notion_client.snapshot
+        if snapshot and os.path.exists(snapshot.plan_file):
+            plan_file = snapshot.plan_file
         if not os.path.exists(plan_file):
             print(f"❌ Fichier {plan_file} introuvable")
             print("   Lance d'abord: python3 notion_to_siyuan_complete.py avec DRY_RUN=true")
@@ -373,74 +876,375 @@ class DataImporter:
             print("   export TARGET_NOTEBOOK_ID=your-notebook-id")
             return
         
-        # Traiter chaque database
-        for idx, db_info in enumerate(databases, 1):
-            print(f"\n{'='*80}")
-            print(f"📊 DATABASE {idx}/{len(databases)}: {db_info['title']}")
-            print(f"{'='*80}\n")
+        # Journal de checkpoints
+        if self.resume:
+            count = self.journal.load()
+            self.notion_to_siyuan_ids.update(self.journal.completed_mapping())
+            print(f"🔁 REPRISE: {count} checkpoints, {len(self.journal.index)} entrées déjà traitées\n")
+        
+        # Sync incrémental : mapping existant + high-water marks du run précédent
+        if os.path.exists(self.sync_state_file):
+            with open(self.sync_state_file) as f:
+                self.sync_state = json.load(f)
+        if self.sync:
+            self._load_existing_mapping()
+            print(f"🔄 SYNC: {len(self.notion_to_siyuan_ids)} entrées déjà dans SiYuan\n")
+        
+        if not Config.DRY_RUN:
+            self.journal.start(resume=self.resume or self.sync)
+            self.attr_writer = AttrBatchWriter(
+                self.siyuan_client, Config.ATTR_BATCH_SIZE, Config.ATTR_FLUSH_INTERVAL
+            )
             
-            self._process_database(db_info)
-            self.stats["databases_processed"] += 1
+            # Snapshot : plus d'attente réseau côté Notion, le rendu passe sur tous les cœurs
+            if snapshot and not self.sync and not self.use_async:
+                pool = RenderPool(render_markdown, snapshot_dir=snapshot.directory)
+                if pool.parallel:
+                    self.render_pool = pool
+                    print(f"🧮 Rendu Markdown sur {pool.workers} processus\n")
+        
+        # Les plus grosses databases d'abord : le temps total tend vers
+        # celui de la plus longue au lieu de la somme
+        databases = self._schedule_databases(databases)
+        self._expected = self._expected_entries(databases)
+        
+        # Traiter les databases
+        try:
+            if self.use_async:
+                asyncio.run(self._run_async(databases))
+            else:
+                self._run_threaded(databases)
+        except KeyboardInterrupt:
+            print("\n⚠️  Interrompu - relancer avec --resume pour continuer")
+        finally:
+            if self.render_pool:
+                self.render_pool.close()
+            if self.attr_writer:
+                self.attr_writer.close()
+                self._collect_attr_failures("", None)
+            self.journal.close()
+            self._save_sync_state()
         
         # Rapport final
         self._display_report()
     
-    def _process_database(self, db_info: Dict):
-        """Traite une database"""
+    @staticmethod
+    def _schedule_databases(databases: List[Dict]) -> List[Dict]:
+        """Ordre de traitement : entry_count décroissant (pré-passe de l'extraction)"""
+        if not any("entry_count" in db for db in databases):
+            return databases
+        
+        ordered = sorted(databases, key=lambda db: db.get("entry_count", 0), reverse=True)
+        workers = min(max(1, Config.DB_WORKERS), len(databases))
+        print(f"🗓️  {workers} database(s) en parallèle, plus grosses d'abord: "
+              + ", ".join(f"{db['title']} ({db.get('entry_count', '?')}{'' if db.get('entry_count_exact', True) else '+'})"
+                          for db in ordered[:5])
+              + ("..." if len(ordered) > 5 else "") + "\n")
+        return ordered
+    
+    def _expected_entries(self, databases: List[Dict]) -> Optional[int]:
+        """Total d'entrées attendu pour l'ETA (inconnu en --sync, sans entry_count ou si plafonné)"""
+        if self.sync or not all("entry_count" in db and db.get("entry_count_exact", True) for db in databases):
+            return None
+        limit = Config.TEST_LIMIT
+        return sum(min(db["entry_count"], limit) if limit else db["entry_count"] for db in databases)
+    
+    def _run_threaded(self, databases: List[Dict]):
+        """Databases traitées par DB_WORKERS threads (chacune avec son pool d'entrées)"""
+        workers = max(1, Config.DB_WORKERS)
+        if workers == 1 or Config.DRY_RUN:
+            for idx, db_info in enumerate(databases, 1):
+                self._display_database_header(idx, len(databases), db_info)
+                self._process_database(db_info)
+                self._count("databases_processed")
+            return
+        
+        def process(idx: int, db_info: Dict):
+            self._display_database_header(idx, len(databases), db_info)
+            self._process_database(db_info)
+            self._count("databases_processed")
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="database")
+        try:
+            futures = [executor.submit(process, idx, db_info) for idx, db_info in enumerate(databases, 1)]
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # Les databases en cours vident leur fenêtre puis s'arrêtent
+            self._stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown()
+    
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+    
+    def _record_error(self, message: str):
+        with self._stats_lock:
+            self.stats["errors"].append(message)
+    
+    def _display_database_header(self, idx: int, total: int, db_info: Dict):
+        print(f"\n{'='*80}")
+        print(f"📊 DATABASE {idx}/{total}: {db_info['title']}")
+        print(f"{'='*80}\n")
+    
+    def _prepare_database(self, db_info: Dict) -> Optional[str]:
+        """Compte les propriétés skippées ; retourne le filtre edited_since (--sync)"""
         db_id = db_info["id"]
-        db_title = db_info["title"]
+        
+        # Plan de conversion compilé une fois pour toute la database
+        plan = self._get_plan(db_info)
         
         # Compter les rollups/formules dans cette DB
-        rollups_in_db = sum(1 for p in db_info["properties"] if p.get("notion_type") == "rollup")
-        formulas_in_db = sum(1 for p in db_info["properties"] if p.get("notion_type") == "formula")
+        rollups_in_db = plan.rollups
+        formulas_in_db = plan.formulas
         
         if rollups_in_db > 0 or formulas_in_db > 0:
             print(f"⚠️  {rollups_in_db} rollups et {formulas_in_db} formules seront SKIPPÉS")
-            self.stats["rollups_skipped"] += rollups_in_db
-            self.stats["formulas_skipped"] += formulas_in_db
+            self._count("rollups_skipped", rollups_in_db)
+            self._count("formulas_skipped", formulas_in_db)
         
         # Extraire les entrées de Notion
-        print(f"📥 Extraction des entrées de Notion...")
-        entries = self.notion_client.query_database(db_id, limit=Config.TEST_LIMIT)
+        edited_since = self.sync_state.get(db_id) if self.sync else None
+        if edited_since:
+            print(f"📥 Extraction des entrées modifiées depuis {edited_since}...")
+        else:
+            print(f"📥 Extraction des entrées de Notion...")
         
-        if not entries:
-            print(f"⚠️  Aucune entrée trouvée")
-            return
+        return edited_since
+    
+    def _process_database(self, db_info: Dict):
+        """Traite une database"""
+        db_id = db_info["id"]
+        db_title = db_info["title"]
+        edited_since = self._prepare_database(db_info)
         
-        print(f"✅ {len(entries)} entrées trouvées\n")
+        # Streaming : les entrées arrivent page par page pendant l'import
+        query_status = {"complete": False}
+        entries = self.metrics.timed_iter("fetch_entries", self.notion_client.iter_database(
+            db_id, limit=Config.TEST_LIMIT, edited_since=edited_since, status=query_status
+        ))
         
         if Config.DRY_RUN:
+            first_entries = list(islice(entries, 3))
+            entries.close()  # Arrête le curseur
+            if not first_entries:
+                print(f"⚠️  Aucune entrée trouvée")
+                return
             print("🧪 DRY RUN - Affichage des 3 premières entrées:")
-            for entry in entries[:3]:
+            for entry in first_entries:
                 self._display_entry(entry, db_info)
             return
         
         # Import réel
-        print(f"⚡ Import des {len(entries)} entrées...")
+        workers = max(1, Config.IMPORT_WORKERS)
+        print(f"⚡ Import des entrées au fil de la query ({workers} workers)...")
+        if self.render_pool:
+            entries = self._prerendered(entries)
+        
+        # Fenêtre bornée : on ne soumet pas plus de 2x workers entrées à la fois.
+        # Les compteurs de la database ne sont tenus que dans ce thread.
+        pending = {}
+        submitted = 0
+        completed = 0
+        imported = 0
+        errors = 0
+        high_water = ""
+        entries_iter = enumerate(entries, 1)
+        process_entry = self._sync_entry if self.sync else self._import_entry
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for idx, entry in entries_iter:
+                    if self._stop.is_set():
+                        break
+                    submitted = idx
+                    high_water = max(high_water, entry.get("last_edited_time", ""))
+                    
+                    # Reprise : lookup O(1) dans l'index du journal
+                    checkpoint = None if self.sync else self.journal.status(entry["id"])
+                    if checkpoint and checkpoint[0] == CheckpointJournal.STAGE_ATTRS_SET:
+                        self._count("entries_resumed")
+                        self._entry_done()
+                        completed += 1
+                        continue
+                    
+                    block_id = checkpoint[1] if checkpoint else None
+                    future = executor.submit(process_entry, entry, db_info, block_id)
+                    pending[future] = idx
+                    if len(pending) >= workers * 2:
+                        break
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = pending.pop(future)
+                    completed += 1
+                    self._entry_done()
+                    
+                    if future.result():
+                        imported += 1  # Importée, ou traitée par --sync (compteurs dans process_entry)
+                    else:
+                        errors += 1
+                        self._record_error(f"{db_title}: Entrée {idx}")
+                    
+                    self._display_progress(db_title, completed, submitted, query_status["complete"])
+        
+        query_complete = query_status["complete"] and not self._stop.is_set()
+        self._finish_database(db_info, submitted, imported, errors, high_water, query_complete)
+    
+    def _prerendered(self, entries):
+        """
+        Entrées dont le Markdown est rendu en amont sur le pool de processus,
+        dans l'ordre de la query. _import_entry reprend le résultat.
+        """
+        snapshot = self.notion_client.snapshot
+        pack = snapshot.pack
+        
+        def task(entry: Dict):
+            if self.journal.status(entry["id"]):
+                return None  # Document déjà créé (reprise) : rien à rendre
+            if pack is not None:
+                snapshot.forget(entry["id"])
+                return entry["id"]  # Le processus lit l'arbre dans le pack
+            return snapshot.blocks(entry["id"])
         
-        for idx, entry in enumerate(entries, 1):
-            if idx % 10 == 0:
-                print(f"   Progression: {idx}/{len(entries)}...")
+        for entry, content, error in self.render_pool.map(entries, task):
+            if error:
+                print(f"⚠️  Rendu {entry['id'][:8]} en échec ({error}), rendu dans le thread d'import")
+            elif content is not None:
+                self._rendered[entry["id"]] = content
+            yield entry
+    
+    def _entry_done(self):
+        with self._stats_lock:
+            self._done += 1
+    
+    def _display_progress(self, db_title: str, completed: int, submitted: int, query_complete: bool):
+        """Ligne de progression (au plus une toutes les PROGRESS_INTERVAL secondes) avec débit et ETA"""
+        if not self.metrics.progress_due():
+            return
+        in_progress = "" if query_complete else " (query en cours)"
+        # Plusieurs databases en parallèle : on préfixe par le titre
+        prefix = f"[{db_title}] " if Config.DB_WORKERS > 1 else ""
+        total = f" · total {self._done}/{self._expected}" if self._expected else ""
+        print(f"   {prefix}Progression: {completed}/{submitted}{in_progress}{total} · "
+              f"{self.metrics.rate_and_eta(self._done, self._expected)}")
+    
+    def _finish_database(self, db_info: Dict, submitted: int, imported: int, errors: int,
+                         high_water: str, query_complete: bool):
+        """Flush des attributes, bilan et high-water mark d'une database"""
+        db_id = db_info["id"]
+        db_title = db_info["title"]
+        
+        if not submitted:
+            print(f"⚠️  Aucune entrée trouvée ({db_title})")
+            return
+        
+        # Les attributes en attente partent maintenant
+        self.attr_writer.flush()
+        errors += self._collect_attr_failures(db_title, db_id)
+        
+        print(f"✅ Import terminé ({db_title}): {imported}/{submitted} entrées\n")
+        
+        # Nouveau high-water mark seulement si toute la database est passée
+        if query_complete and not Config.TEST_LIMIT and not errors:
+            if high_water > self.sync_state.get(db_id, ""):
+                self.sync_state[db_id] = high_water
+    
+    async def _run_async(self, databases: List[Dict]):
+        """Mode --async : toutes les databases sur une seule boucle asyncio"""
+        # Import différé : httpx n'est requis qu'en mode --async
+        from async_clients import AsyncNotionClient, AsyncSiYuanClient, close_async_sessions
+        
+        self.async_notion = AsyncNotionClient(Config.NOTION_TOKEN, Config.BLOCK_TREE_MAX_DEPTH)
+        self.async_siyuan = AsyncSiYuanClient(Config.SIYUAN_URL, Config.SIYUAN_TOKEN)
+        
+        # DB_WORKERS databases à la fois, dans l'ordre du scheduler
+        db_slots = asyncio.Semaphore(max(1, Config.DB_WORKERS))
+        
+        async def process(idx: int, db_info: Dict):
+            async with db_slots:
+                self._display_database_header(idx, len(databases), db_info)
+                await self._process_database_async(db_info)
+                self._count("databases_processed")
+        
+        try:
+            await asyncio.gather(*(process(idx, db_info) for idx, db_info in enumerate(databases, 1)))
+        finally:
+            await close_async_sessions()
+    
+    async def _process_database_async(self, db_info: Dict):
+        """Traite une database : une coroutine par entrée, ASYNC_IN_FLIGHT en vol au plus"""
+        db_id = db_info["id"]
+        db_title = db_info["title"]
+        edited_since = self._prepare_database(db_info)
+        
+        in_flight = max(1, Config.ASYNC_IN_FLIGHT)
+        print(f"⚡ Import des entrées au fil de la query (async, {in_flight} en vol)...")
+        
+        slots = asyncio.Semaphore(in_flight)
+        tasks = set()
+        submitted = 0
+        completed = 0
+        imported = 0
+        errors = 0
+        high_water = ""
+        query_status = {"complete": False}
+        process_entry = self._sync_entry_async if self.sync else self._import_entry_async
+        
+        async def run_entry(idx: int, entry: Dict, block_id: Optional[str]):
+            nonlocal completed, imported, errors
+            try:
+                ok = await process_entry(entry, db_info, block_id)
+            finally:
+                slots.release()
             
-            success = self._import_entry(entry, db_info)
-            if success:
-                self.stats["entries_imported"] += 1
+            completed += 1
+            self._entry_done()
+            if ok:
+                imported += 1
             else:
-                self.stats["errors"].append(f"{db_title}: Entrée {idx}")
+                errors += 1
+                self._record_error(f"{db_title}: Entrée {idx}")
             
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
+            self._display_progress(db_title, completed, submitted, query_status["complete"])
         
-        print(f"✅ Import terminé: {self.stats['entries_imported']} entrées\n")
+        entries = self.metrics.timed_aiter("fetch_entries", self.async_notion.iter_database(
+            db_id, limit=Config.TEST_LIMIT, edited_since=edited_since, status=query_status
+        ))
+        async for entry in entries:
+            submitted += 1
+            high_water = max(high_water, entry.get("last_edited_time", ""))
+            
+            checkpoint = None if self.sync else self.journal.status(entry["id"])
+            if checkpoint and checkpoint[0] == CheckpointJournal.STAGE_ATTRS_SET:
+                self._count("entries_resumed")
+                self._entry_done()
+                completed += 1
+                continue
+            
+            await slots.acquire()
+            task = asyncio.create_task(run_entry(submitted, entry, checkpoint[1] if checkpoint else None))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        
+        if tasks:
+            await asyncio.gather(*tasks)
+        
+        # Le flush des attributes est bloquant : hors de la boucle
+        await asyncio.to_thread(
+            self._finish_database, db_info, submitted, imported, errors, high_water,
+            query_status["complete"]
+        )
     
     def _display_entry(self, entry: Dict, db_info: Dict):
         """Affiche une entrée (mode DRY_RUN)"""
         # Extraire le titre
-        title_prop = next((p for p in db_info["properties"] if p["notion_type"] == "title"), None)
-        if title_prop:
-            title_value = entry.get("properties", {}).get(title_prop["name"], {})
-            title = self.converter.convert_property_value("title", title_value.get("title", []))
-        else:
-            title = "Sans titre"
+        title = self._get_plan(db_info).title(entry)
         
         print(f"\n📄 {title}")
         print(f"   ID Notion: {entry['id']}")
@@ -454,85 +1258,206 @@ class DataImporter:
             if converted:
                 print(f"   - {prop_name}: {converted[:50]}...")
     
-    def _import_entry(self, entry: Dict, db_info: Dict) -> bool:
-        """Importe une entrée"""
+    def _import_entry(self, entry: Dict, db_info: Dict, block_id: Optional[str] = None) -> bool:
+        """Importe une entrée (si `block_id` est fourni, le document existe déjà)"""
         try:
-            # 1. Extraire le titre
-            title_prop = next((p for p in db_info["properties"] if p["notion_type"] == "title"), None)
-            if title_prop:
-                title_value = entry.get("properties", {}).get(title_prop["name"], {})
-                title = self.converter.convert_property_value("title", title_value.get("title", []))
-            else:
-                title = "Sans titre"
-            
-            # 2. Extraire le contenu de la page
-            content = self.notion_client.get_page_content(entry["id"])
-            
-            # 3. Créer le document dans SiYuan
-            path = f"/{db_info['title']}/{title}"
-            markdown = f"# {title}\n\n{content}" if content else f"# {title}"
+            plan = self._get_plan(db_info)
             
-            block_id = self.siyuan_client.create_document(
-                Config.TARGET_NOTEBOOK_ID,
-                path,
-                markdown
-            )
+            # 1. Extraire le titre
+            title = plan.title(entry)
             
             if not block_id:
-                return False
-            
-            # Sauvegarder le mapping
-            self.notion_to_siyuan_ids[entry["id"]] = block_id
-            
-            # 4. Définir les attributes
-            attrs = {}
-            props = entry.get("properties", {})
-            
-            rollups_skipped = []
-            formulas_skipped = []
-            
-            for prop_name, prop_data in props.items():
-                prop_type = prop_data.get("type")
-                prop_value = prop_data.get(prop_type)
+                # 2. Extraire le contenu de la page (déjà rendu si le pool de rendu tourne)
+                content = self._rendered.pop(entry["id"], None)
+                if content is None:
+                    with self.metrics.stage("fetch_content"):
+                        tree = self.notion_client.get_block_tree(
+                            entry["id"], last_edited_time=entry.get("last_edited_time")
+                        )
+                    with self.metrics.stage("render"):
+                        content = self.notion_client.render_markdown(tree)
+                markdown = self._document_markdown(title, content)
                 
-                # Tracker les rollups/formules skippés
-                if prop_type == "rollup":
-                    rollups_skipped.append(prop_name)
-                elif prop_type == "formula":
-                    formulas_skipped.append(prop_name)
+                # 3. Créer le document dans SiYuan
+                with self.metrics.stage("create_doc"):
+                    block_id = self.siyuan_client.create_document(
+                        Config.TARGET_NOTEBOOK_ID,
+                        f"/{db_info['title']}/{title}",
+                        markdown
+                    )
                 
-                # Convertir la valeur
-                converted = self.converter.convert_property_value(prop_type, prop_value)
+                if not block_id:
+                    return False
                 
-                if converted:
-                    # Normaliser le nom de l'attribute (custom-XXX)
-                    attr_name = f"custom-{prop_name.lower().replace(' ', '-')}"
-                    attrs[attr_name] = converted
-            
-            # Ajouter des metadata
-            attrs["custom-notion-id"] = entry["id"]
-            attrs["custom-notion-db"] = db_info["title"]
+                self.journal.record(db_info["id"], entry["id"], CheckpointJournal.STAGE_DOC_CREATED, block_id)
             
-            # Définir les attributes
-            if attrs:
-                self.siyuan_client.set_block_attrs(block_id, attrs)
+            # 4. Mapping + attributes
+            self._queue_attrs(entry, db_info, block_id)
+            self._count("entries_imported")
+            return True
+        
+        except Exception as e:
+            print(f"❌ Erreur import: {e}")
+            return False
+    
+    async def _import_entry_async(self, entry: Dict, db_info: Dict, block_id: Optional[str] = None) -> bool:
+        """Variante async de _import_entry (mode --async)"""
+        try:
+            title = self._get_plan(db_info).title(entry)
             
-            # Info sur les propriétés skippées
-            if rollups_skipped or formulas_skipped:
-                skipped_info = []
-                if rollups_skipped:
-                    skipped_info.append(f"Rollups: {', '.join(rollups_skipped)}")
-                if formulas_skipped:
-                    skipped_info.append(f"Formules: {', '.join(formulas_skipped)}")
-                # Log silencieux (pas de print pour ne pas polluer)
-                # L'utilisateur sera informé dans le rapport final
+            if not block_id:
+                with self.metrics.stage("fetch_content"):
+                    tree = await self.async_notion.get_block_tree(
+                        entry["id"], last_edited_time=entry.get("last_edited_time")
+                    )
+                with self.metrics.stage("render"):
+                    markdown = self._document_markdown(title, NotionClient.render_markdown(tree))
+                with self.metrics.stage("create_doc"):
+                    block_id = await self.async_siyuan.create_document(
+                        Config.TARGET_NOTEBOOK_ID,
+                        f"/{db_info['title']}/{title}",
+                        markdown
+                    )
+                
+                if not block_id:
+                    return False
+                
+                # record() peut faire un fsync : hors de la boucle
+                await asyncio.to_thread(
+                    self.journal.record, db_info["id"], entry["id"], CheckpointJournal.STAGE_DOC_CREATED, block_id
+                )
             
+            # Un lot plein part en HTTP bloquant : hors de la boucle
+            await asyncio.to_thread(self._queue_attrs, entry, db_info, block_id)
+            self._count("entries_imported")
             return True
         
         except Exception as e:
             print(f"❌ Erreur import: {e}")
             return False
     
+    @staticmethod
+    def _document_markdown(title: str, content: str) -> str:
+        return f"# {title}\n\n{content}" if content else f"# {title}"
+    
+    def _queue_attrs(self, entry: Dict, db_info: Dict, block_id: str):
+        """Sauvegarde le mapping et met les attributes de l'entrée en file d'écriture"""
+        with self._mapping_lock:
+            self.notion_to_siyuan_ids[entry["id"]] = block_id
+        
+        with self.metrics.stage("convert"):
+            attrs = self._get_plan(db_info).convert(entry)
+        if attrs:
+            # Écrit par lot ; le checkpoint est posé quand le lot est confirmé
+            self.attr_writer.add(block_id, attrs, lambda: self.journal.record(
+                db_info["id"], entry["id"], CheckpointJournal.STAGE_ATTRS_SET, block_id
+            ), tag=db_info["id"])
+    
+    def _get_plan(self, db_info: Dict) -> ConversionPlan:
+        """Plan de conversion de la database (compilé au premier appel)"""
+        plan = self._plans.get(db_info["id"])
+        if plan is None:
+            plan = self._plans[db_info["id"]] = self.converter.compile_plan(db_info)
+        return plan
+    
+    def _sync_entry(self, entry: Dict, db_info: Dict, block_id: Optional[str] = None) -> bool:
+        """Sync incrémental : met à jour le bloc existant, ou importe si nouvelle entrée"""
+        block_id = block_id or self.notion_to_siyuan_ids.get(entry["id"])
+        if not block_id:
+            return self._import_entry(entry, db_info)
+        
+        try:
+            with self.metrics.stage("get_attrs"):
+                current = self.siyuan_client.get_block_attrs(block_id)
+            self._queue_changed_attrs(entry, db_info, block_id, current)
+            return True
+        
+        except Exception as e:
+            print(f"❌ Erreur sync: {e}")
+            return False
+    
+    async def _sync_entry_async(self, entry: Dict, db_info: Dict, block_id: Optional[str] = None) -> bool:
+        """Variante async de _sync_entry (mode --async)"""
+        block_id = block_id or self.notion_to_siyuan_ids.get(entry["id"])
+        if not block_id:
+            return await self._import_entry_async(entry, db_info)
+        
+        try:
+            with self.metrics.stage("get_attrs"):
+                current = await self.async_siyuan.get_block_attrs(block_id)
+            await asyncio.to_thread(self._queue_changed_attrs, entry, db_info, block_id, current)
+            return True
+        
+        except Exception as e:
+            print(f"❌ Erreur sync: {e}")
+            return False
+    
+    def _queue_changed_attrs(self, entry: Dict, db_info: Dict, block_id: str, current: Dict):
+        """Met en file d'écriture les attributes qui diffèrent de `current`"""
+        plan = self._get_plan(db_info)
+        with self.metrics.stage("convert"):
+            attrs = plan.convert(entry)
+        
+        # Seulement les valeurs modifiées dans Notion, écrites telles que l'import
+        # les pose (relations en IDs Notion : la résolution reste à
+        # reconnect_relations.py) ; une propriété vidée est supprimée (valeur "")
+        changed = {
+            name: value for name, value in attrs.items()
+            if current.get(name) != value and not (
+                name in plan.relation_attr_names and self._same_relation(current.get(name), value)
+            )
+        }
+        for name in current:
+            if name in plan.db_attr_names and name not in attrs:
+                changed[name] = ""
+        
+        if changed:
+            self.attr_writer.add(block_id, changed, tag=db_info["id"])
+            self._count("entries_updated")
+            self._count("attrs_changed", len(changed))
+        else:
+            # Déjà à jour, typiquement une entrée pile sur le high-water mark
+            # (filtre on_or_after inclusif, timestamps Notion à la minute)
+            self._count("entries_unchanged")
+    
+    def _same_relation(self, stored: Optional[str], value: str) -> bool:
+        """
+        Relation inchangée : chaque cible stockée est l'ID Notion de l'import,
+        ou le bloc SiYuan que reconnect_relations.py lui a substitué
+        """
+        if not stored:
+            return False
+        stored_targets = stored.split(",")
+        targets = value.split(",")
+        return len(stored_targets) == len(targets) and all(
+            current == target or current == self.notion_to_siyuan_ids.get(target)
+            for current, target in zip(stored_targets, targets)
+        )
+    
+    def _collect_attr_failures(self, db_title: str, db_id: Optional[str]) -> int:
+        """Reporte dans les stats les écritures d'attributes en échec (d'une database, ou toutes)"""
+        failed = self.attr_writer.take_failures(db_id)
+        for block_id in failed:
+            self._record_error(f"{db_title}: Attributes {block_id}")
+        return len(failed)
+    
+    def _load_existing_mapping(self):
+        """Recharge le mapping Notion → SiYuan (rapport précédent + journal)"""
+        mapping_file = os.path.join(Config.OUTPUT_DIR, "import_mapping.json")
+        if os.path.exists(mapping_file):
+            with open(mapping_file) as f:
+                self.notion_to_siyuan_ids.update(json.load(f).get("notion_to_siyuan", {}))
+        
+        self.journal.load()
+        self.notion_to_siyuan_ids.update(self.journal.completed_mapping())
+    
+    def _save_sync_state(self):
+        """Sauvegarde les high-water marks pour le prochain --sync"""
+        if Config.DRY_RUN or not self.sync_state:
+            return
+        with open(self.sync_state_file, "w") as f:
+            json.dump(self.sync_state, f, indent=2)
+    
     def _display_report(self):
         """Affiche le rapport final"""
         print("\n" + "="*80)
@@ -541,6 +1466,11 @@ class DataImporter:
         
         print(f"✅ Databases traitées: {self.stats['databases_processed']}")
         print(f"✅ Entrées importées: {self.stats['entries_imported']}")
+        if self.sync:
+            print(f"🔄 Entrées mises à jour: {self.stats['entries_updated']} ({self.stats['attrs_changed']} attributes modifiés, "
+                  f"{self.stats['entries_unchanged']} entrées inchangées)")
+        if self.stats["entries_resumed"] > 0:
+            print(f"🔁 Entrées déjà importées (reprise): {self.stats['entries_resumed']}")
         
         if self.stats["rollups_skipped"] > 0 or self.stats["formulas_skipped"] > 0:
             print(f"\n⚠️  Propriétés skippées (recréer manuellement):")
@@ -555,12 +1485,31 @@ class DataImporter:
             for error in self.stats["errors"][:10]:
                 print(f"   - {error}")
         
+        # Réutilisation des connexions HTTP (keep-alive)
+        print()
+        if self.attr_writer:
+            print(f"🏷️  Attributes: {self.attr_writer.requests_sent} requêtes d'écriture")
+        if self.render_pool:
+            print(f"🧮 Rendu: {self.render_pool.pages} pages en {self.render_pool.chunks} lots "
+                  f"sur {self.render_pool.workers} processus ({self.render_pool.errors} erreurs)")
+        print_pool_stats()
+        print_cache_stats()
+        print()
+        self.metrics.print_summary()
+        
+        # Métriques détaillées (JSON, + Prometheus si METRICS_PROMETHEUS=true)
+        counters = {key: value for key, value in self.stats.items() if isinstance(value, int)}
+        counters["errors"] = len(self.stats["errors"])
+        for metrics_file in self.metrics.write(os.path.join(Config.OUTPUT_DIR, "import_metrics.json"), counters):
+            print(f"📈 Métriques: {metrics_file}")
+        
         # Sauvegarder le mapping
         mapping_file = os.path.join(Config.OUTPUT_DIR, "import_mapping.json")
         with open(mapping_file, "w") as f:
             json.dump({
                 "notion_to_siyuan": self.notion_to_siyuan_ids,
-                "stats": self.stats
+                "stats": self.stats,
+                "http_pools": pool_stats()
             }, f, indent=2)
         
         print(f"\n💾 Mapping sauvegardé: {mapping_file}")
@@ -573,9 +1522,21 @@ class DataImporter:
 
 def main():
     """Point d'entrée"""
+    parser = argparse.ArgumentParser(description="Import des données Notion → SiYuan")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprend un import interrompu depuis le journal de checkpoints")
+    parser.add_argument("--sync", action="store_true",
+                        help="Sync incrémental : seulement les entrées modifiées depuis le dernier run")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Clients asyncio sur une seule boucle (nécessite httpx)")
+    parser.add_argument("--snapshot", metavar="DIR", default=SnapshotConfig.NOTION_SNAPSHOT,
+                        help="Lit Notion depuis un snapshot (notion_snapshot.py export), sans appel réseau")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    SnapshotConfig.NOTION_SNAPSHOT = args.snapshot
     
     # Vérifier config
-    if not Config.NOTION_TOKEN:
+    if not Config.NOTION_TOKEN and not args.snapshot:
         print("❌ NOTION_TOKEN non défini")
         return
     
@@ -590,8 +1551,9 @@ def main():
         return
     
     # Lancer l'import
-    importer = DataImporter()
-    importer.run()
+    importer = DataImporter(resume=args.resume, sync=args.sync, use_async=args.use_async)
+    with profiled("import", args, Config.OUTPUT_DIR):
+        importer.run()
 
 
 if __name__ == "__main__":
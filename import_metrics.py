@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Instrumentation de l'import
+Où part le temps : lectures Notion, écritures SiYuan, conversion, attentes
+
+- Timers par étape (fetch_entries, fetch_content, convert, create_doc,
+  set_attrs...) : temps cumulé sur tous les workers, nombre d'appels, max
+- Par endpoint HTTP : requêtes, statuts, histogramme de latence, octets
+  envoyés / reçus (observateur branché sur http_session.py)
+- Attentes du rate limiter (token bucket + retries) par service
+- Ligne de progression avec débit et ETA
+- Export JSON (import_metrics.json) et, en option, texte Prometheus
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from http_session import add_request_observer
+from rate_limiter import limiter_stats
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    METRICS_PROMETHEUS = os.getenv("METRICS_PROMETHEUS", "false").lower() == "true"
+    PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "2.0"))  # secondes entre deux lignes
+
+# Bornes (secondes) de l'histogramme de latence, style Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Segments d'URL variables → {id} (ids Notion avec ou sans tirets, ids SiYuan)
+ID_SEGMENT = re.compile(r"^([0-9a-fA-F]{32}|[0-9a-fA-F-]{36}|\d{14}-[0-9a-z]{7})$")
+
+# =============================================================================
+# HISTOGRAMME
+# =============================================================================
+
+class Histogram:
+    """Histogramme à bornes fixes (non thread-safe : protégé par ImportMetrics)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernier : +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Quantile estimé : borne haute du bucket qui l'atteint"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict:
+        return {
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+            "count": self.count,
+            "sum": round(self.sum, 6)
+        }
+
+# =============================================================================
+# MÉTRIQUES
+# =============================================================================
+
+class ImportMetrics:
+    """Compteurs et timers de l'import, thread-safe (workers et boucle asyncio)"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict] = {}
+        self._requests: Dict[tuple, Dict] = {}
+        self._last_progress = 0.0
+
+    # -------------------------------------------------------------------------
+    # Étapes
+    # -------------------------------------------------------------------------
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {"count": 0, "seconds": 0.0, "max": 0.0}
+            stage["count"] += 1
+            stage["seconds"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Chronomètre un bloc : with metrics.stage("create_doc"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def timed_iter(self, name: str, iterator):
+        """Générateur : le temps passé dans chaque next() est compté dans `name`"""
+        iterator = iter(iterator)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.add_stage(name, time.perf_counter() - start)
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()  # Arrête le curseur sous-jacent (DRY_RUN, Ctrl-C)
+
+    async def timed_aiter(self, name: str, iterator):
+        """Variante async de timed_iter"""
+        iterator = iterator.__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                self.add_stage(name, time.perf_counter() - start)
+            yield item
+
+    # -------------------------------------------------------------------------
+    # Requêtes HTTP
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def endpoint_name(method: str, url: str) -> str:
+        """"POST /v1/databases/{id}/query" : un compteur par route, pas par id"""
+        segments = [
+            "{id}" if ID_SEGMENT.match(segment) else segment
+            for segment in urlsplit(url).path.split("/")
+        ]
+        return f"{method} {'/'.join(segments)}"
+
+    @staticmethod
+    def _payload_sizes(response) -> tuple:
+        """(octets envoyés, octets reçus) d'une réponse requests / httpx"""
+        received = len(getattr(response, "content", b"") or b"")
+        request = getattr(response, "request", None)
+        body = getattr(request, "body", None)         # requests.PreparedRequest
+        if body is None:
+            body = getattr(request, "content", None)  # httpx.Request
+        return len(body or b""), received
+
+    def observe_request(self, service: str, method: str, url: str, response, seconds: float):
+        """Observateur http_session : appelé après chaque requête (réponse None = erreur réseau)"""
+        endpoint = self.endpoint_name(method, url)
+        status = str(response.status_code) if response is not None else "network_error"
+        sent, received = self._payload_sizes(response) if response is not None else (0, 0)
+
+        with self._lock:
+            stats = self._requests.get((service, endpoint))
+            if stats is None:
+                stats = self._requests[(service, endpoint)] = {
+                    "count": 0, "status": {}, "bytes_sent": 0, "bytes_received": 0,
+                    "latency": Histogram()
+                }
+            stats["count"] += 1
+            stats["status"][status] = stats["status"].get(status, 0) + 1
+            stats["bytes_sent"] += sent
+            stats["bytes_received"] += received
+            stats["latency"].observe(seconds)
+
+    # -------------------------------------------------------------------------
+    # Progression
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+        if seconds >= 60:
+            return f"{seconds // 60}m{seconds % 60:02d}s"
+        return f"{seconds}s"
+
+    def progress_due(self) -> bool:
+        """True au plus une fois par PROGRESS_INTERVAL (tous threads confondus)"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_progress < Config.PROGRESS_INTERVAL:
+                return False
+            self._last_progress = now
+            return True
+
+    def rate_and_eta(self, done: int, expected: Optional[int]) -> str:
+        """"45.6 entrées/s · ETA 3m12s" (ETA inconnue si le total ne l'est pas)"""
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        if expected and rate > 0:
+            eta = self.format_duration(max(0, expected - done) / rate)
+        else:
+            eta = "?"
+        return f"{rate:.1f} entrées/s · ETA {eta}"
+
+    # -------------------------------------------------------------------------
+    # Export
+    # -------------------------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": stage["count"],
+                    "seconds": round(stage["seconds"], 3),
+                    "avg_ms": round(stage["seconds"] / stage["count"] * 1000, 2) if stage["count"] else 0,
+                    "max_ms": round(stage["max"] * 1000, 2)
+                }
+                for name, stage in self._stages.items()
+            }
+            requests = [
+                {
+                    "service": service,
+                    "endpoint": endpoint,
+                    "count": stats["count"],
+                    "status": dict(stats["status"]),
+                    "bytes_sent": stats["bytes_sent"],
+                    "bytes_received": stats["bytes_received"],
+                    "p50_ms": round(stats["latency"].quantile(0.5) * 1000, 1),
+                    "p99_ms": round(stats["latency"].quantile(0.99) * 1000, 1),
+                    "latency": stats["latency"].to_dict()
+                }
+                for (service, endpoint), stats in sorted(self._requests.items())
+            ]
+
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started, 3),
+            "stages": stages,
+            "requests": requests,
+            "rate_limiters": limiter_stats()
+        }
+
+    def to_prometheus(self, counters: Dict[str, int] = None) -> str:
+        """Format texte Prometheus (node_exporter textfile collector, pushgateway...)"""
+        snapshot = self.snapshot()
+        prefix = "notion_siyuan_import"
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def labels(**values) -> str:
+            return "{" + ",".join(f'{key}="{value}"' for key, value in values.items()) + "}"
+
+        metric("stage_seconds_total", "counter", "Temps cumulé par étape (tous workers)")
+        for name, stage in snapshot["stages"].items():
+            lines.append(f"{prefix}_stage_seconds_total{labels(stage=name)} {stage['seconds']}")
+        metric("stage_calls_total", "counter", "Appels par étape")
+        for name, stage in snapshot["stages"].items():
+            lines.append(f"{prefix}_stage_calls_total{labels(stage=name)} {stage['count']}")
+
+        metric("requests_total", "counter", "Requêtes HTTP par endpoint et statut")
+        for request in snapshot["requests"]:
+            for status, count in request["status"].items():
+                lines.append(f"{prefix}_requests_total"
+                             f"{labels(service=request['service'], endpoint=request['endpoint'], status=status)} {count}")
+
+        metric("request_duration_seconds", "histogram", "Latence des requêtes HTTP")
+        for request in snapshot["requests"]:
+            base = dict(service=request["service"], endpoint=request["endpoint"])
+            cumulative = 0
+            for bound, count in request["latency"]["buckets"].items():
+                cumulative += count
+                lines.append(f"{prefix}_request_duration_seconds_bucket{labels(**base, le=bound)} {cumulative}")
+            lines.append(f"{prefix}_request_duration_seconds_sum{labels(**base)} {request['latency']['sum']}")
+            lines.append(f"{prefix}_request_duration_seconds_count{labels(**base)} {request['latency']['count']}")
+
+        for direction in ("sent", "received"):
+            metric(f"request_bytes_{direction}_total", "counter", f"Octets {direction} (corps HTTP)")
+            for request in snapshot["requests"]:
+                lines.append(f"{prefix}_request_bytes_{direction}_total"
+                             f"{labels(service=request['service'], endpoint=request['endpoint'])} "
+                             f"{request['bytes_' + direction]}")
+
+        metric("rate_limit_wait_seconds_total", "counter", "Attente dans le rate limiter (bucket + retries)")
+        for name, stats in snapshot["rate_limiters"].items():
+            lines.append(f"{prefix}_rate_limit_wait_seconds_total{labels(service=name)} {stats['waited_seconds']}")
+
+        if counters:
+            metric("entries_total", "counter", "Entrées par résultat")
+            for name, value in counters.items():
+                lines.append(f"{prefix}_entries_total{labels(result=name)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, counters: Dict[str, int] = None, prometheus: bool = None) -> List[str]:
+        """Écrit le JSON (et le .prom si demandé) ; retourne les fichiers écrits"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        snapshot = self.snapshot()
+        snapshot["counters"] = counters or {}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=2)
+        written = [path]
+
+        if Config.METRICS_PROMETHEUS if prometheus is None else prometheus:
+            prom_path = os.path.splitext(path)[0] + ".prom"
+            with open(prom_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus(counters))
+            written.append(prom_path)
+        return written
+
+    def print_summary(self):
+        """Tableau de fin de run : étapes, endpoints, attentes"""
+        snapshot = self.snapshot()
+        wall = snapshot["elapsed_seconds"]
+
+        if snapshot["stages"]:
+            print(f"⏱️  Étapes (temps cumulé sur tous les workers, durée réelle {self.format_duration(wall)}):")
+            for name, stage in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["seconds"]):
+                print(f"   {name:<15} {stage['seconds']:>9.1f}s  {stage['count']:>7} appels  "
+                      f"moy {stage['avg_ms']:>8.1f} ms  max {stage['max_ms']:>8.1f} ms")
+
+        if snapshot["requests"]:
+            print("🌐 Requêtes:")
+            for request in sorted(snapshot["requests"], key=lambda r: -r["count"])[:10]:
+                errors = sum(count for status, count in request["status"].items() if not status.startswith("2"))
+                print(f"   {request['service']:<7} {request['endpoint']:<45} {request['count']:>7}  "
+                      f"p50 {request['p50_ms']:>7.1f} ms  p99 {request['p99_ms']:>7.1f} ms  "
+                      f"{(request['bytes_sent'] + request['bytes_received']) / 1024 / 1024:>7.1f} Mo"
+                      + (f"  ⚠️  {errors} erreurs" if errors else ""))
+
+        for name, stats in snapshot["rate_limiters"].items():
+            if stats["waited_seconds"] or stats["retries"]:
+                print(f"⏳ {name}: {stats['waited_seconds']:.1f}s d'attente rate limit, {stats['retries']} retries")
+
+# =============================================================================
+# INSTANCE PARTAGÉE
+# =============================================================================
+
+_metrics: Optional[ImportMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> ImportMetrics:
+    """Métriques du process (créées et branchées sur les sessions HTTP au premier appel)"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = ImportMetrics()
+            add_request_observer(_metrics.observe_request)
+        return _metrics
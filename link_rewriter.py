@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Réécriture des liens Notion après migration
+Remplace les liens vers des pages Notion par des liens vers les blocs SiYuan
+
+- .sy (documents SiYuan, JSON) : "TextMarkAHref":"https://www.notion.so/...-<id>"
+  devient "siyuan://blocks/<block_id>"
+- .md : [texte](https://www.notion.so/...-<id>) ou [texte](<id>) devient
+  une référence de bloc ((<block_id> 'texte'))
+
+Les IDs (avec ou sans tirets, dans une URL notion.so / notion.site avec slug,
+query ou ancre) sont normalisés puis résolus dans un dict. Les fichiers sont
+lus ligne à ligne (mémoire bornée même pour un gros document), réécrits dans
+un fichier temporaire remplacé atomiquement, et seulement s'ils ont changé.
+Les liens non résolus restent tels quels (aucune annotation ajoutée) et sont
+comptés. Les fichiers sont répartis sur un pool de processus.
+
+Usage :
+    python3 link_rewriter.py /path/to/siyuan/data --dry-run
+    python3 link_rewriter.py /path/to/siyuan/data --workers 8
+    python3 link_rewriter.py export_md/ --mapping migration_output/import_mapping.json
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    SIYUAN_DATA_DIR = os.getenv("SIYUAN_DATA_DIR", "./workspace/data")  # À adapter selon l'installation
+    LINK_WORKERS = int(os.getenv("LINK_WORKERS", str(os.cpu_count() or 1)))
+    OUTPUT_DIR = "migration_output"
+
+    # Fichiers par tâche envoyée aux processus (amortit les allers-retours)
+    CHUNK_SIZE = 64
+
+EXTENSIONS = (".sy", ".md")
+
+# =============================================================================
+# MOTIFS (compilés une fois)
+# =============================================================================
+
+NOTION_ID = r"[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}(?![0-9a-fA-F])"
+URL_CHAR = r"[^\s\"'()\[\]<>]"
+NOTION_URL = rf"https?://(?:www\.)?[\w.-]*notion\.(?:so|site)/(?:{URL_CHAR}*?[/-])?(?P<id>{NOTION_ID}){URL_CHAR}*"
+
+SY_LINK = re.compile(rf'(?P<prefix>"TextMarkAHref"\s*:\s*"){NOTION_URL}(?=")')
+MD_LINK = re.compile(
+    rf"\[(?P<text>[^\]\n]*)\]\((?:{NOTION_URL}|(?P<bare>{NOTION_ID}))\)"
+)
+
+# Préfiltre : une ligne sans ces sous-chaînes n'est pas passée au regex
+SY_MARKER = "notion."
+MD_MARKER = "]("
+
+
+def normalize_id(notion_id: str) -> str:
+    """32 caractères hexa minuscules (les deux formes d'ID circulent)"""
+    return notion_id.replace("-", "").lower()
+
+# =============================================================================
+# RÉÉCRITURE D'UN FICHIER
+# =============================================================================
+
+# Mapping du processus courant : envoyé une fois par processus (initializer)
+_mapping: Dict[str, str] = {}
+
+
+def _init_worker(mapping: Dict[str, str]):
+    global _mapping
+    _mapping = mapping
+
+
+class FileRewriter:
+    """Réécrit les liens d'une ligne ; compteurs agrégés (pas d'objet par lien)"""
+
+    def __init__(self, mapping: Dict[str, str], markdown: bool):
+        self.mapping = mapping
+        self.pattern = MD_LINK if markdown else SY_LINK
+        self.marker = MD_MARKER if markdown else SY_MARKER
+        self.markdown = markdown
+        self.links = 0
+        self.converted = 0
+        self.unresolved: Counter = Counter()
+
+    def _replace(self, match) -> str:
+        self.links += 1
+        notion_id = normalize_id(match.group("id") or match.group("bare"))
+        block_id = self.mapping.get(notion_id)
+        if block_id is None:
+            self.unresolved[notion_id] += 1
+            return match.group(0)
+
+        self.converted += 1
+        if self.markdown:
+            text = match.group("text").replace("'", "’")
+            return f"(({block_id} '{text}'))"
+        return f"{match.group('prefix')}siyuan://blocks/{block_id}"
+
+    def line(self, line: str) -> str:
+        if self.marker not in line:
+            return line
+        return self.pattern.sub(self._replace, line)
+
+
+def rewrite_file(path: str, dry_run: bool = False, mapping: Dict[str, str] = None) -> Dict:
+    """
+    Réécrit les liens d'un fichier (ligne à ligne, remplacement atomique).
+    Retourne les compteurs du fichier.
+    """
+    rewriter = FileRewriter(_mapping if mapping is None else mapping, markdown=path.endswith(".md"))
+    result = {"path": path, "changed": False, "links": 0, "converted": 0, "unresolved": {}, "error": None}
+
+    directory = os.path.dirname(path) or "."
+    temp = None
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as source:
+            if dry_run:
+                for line in source:
+                    rewriter.line(line)
+            else:
+                fd, temp = tempfile.mkstemp(dir=directory, prefix=".links-", suffix=".tmp")
+                changed = False
+                with os.fdopen(fd, "w", encoding="utf-8", newline="") as target:
+                    for line in source:
+                        new_line = rewriter.line(line)
+                        changed = changed or new_line != line
+                        target.write(new_line)
+
+                if changed:
+                    shutil.copymode(path, temp)
+                    os.replace(temp, path)
+                    temp = None
+                    result["changed"] = True
+    except (OSError, UnicodeDecodeError) as e:
+        result["error"] = str(e)
+    finally:
+        if temp and os.path.exists(temp):
+            os.remove(temp)
+
+    result["links"] = rewriter.links
+    result["converted"] = rewriter.converted
+    result["unresolved"] = dict(rewriter.unresolved)
+    if dry_run:
+        result["changed"] = rewriter.converted > 0
+    return result
+
+
+def _rewrite_chunk(paths: List[str], dry_run: bool) -> Dict:
+    """Un lot de fichiers dans un processus : compteurs sommés avant le retour"""
+    totals = {"files": 0, "changed": 0, "links": 0, "converted": 0, "unresolved": Counter(), "errors": []}
+    for path in paths:
+        result = rewrite_file(path, dry_run)
+        totals["files"] += 1
+        totals["changed"] += result["changed"]
+        totals["links"] += result["links"]
+        totals["converted"] += result["converted"]
+        totals["unresolved"].update(result["unresolved"])
+        if result["error"]:
+            totals["errors"].append(f"{path}: {result['error']}")
+    return totals
+
+# =============================================================================
+# WORKSPACE
+# =============================================================================
+
+def iter_files(root: str, extensions=EXTENSIONS) -> Iterator[str]:
+    """Fichiers à traiter, sans charger toute l'arborescence en mémoire"""
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]  # .siyuan, historique...
+        for name in filenames:
+            if name.endswith(extensions):
+                yield os.path.join(directory, name)
+
+
+def _chunks(paths: Iterator[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_mapping(*paths: str) -> Dict[str, str]:
+    """
+    Mapping Notion → SiYuan normalisé, depuis import_mapping.json
+    ({"notion_to_siyuan": {...}}) ou un dict plat (id_mapping.json)
+    """
+    mapping = {}
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        data = data.get("notion_to_siyuan", data)
+        mapping.update({normalize_id(notion_id): block_id for notion_id, block_id in data.items()
+                        if isinstance(block_id, str)})
+    return mapping
+
+
+def rewrite_workspace(root: str, mapping: Dict[str, str], workers: int = None,
+                      dry_run: bool = False, extensions=EXTENSIONS) -> Dict:
+    """Réécrit les liens de tous les fichiers d'un workspace, répartis sur un pool de processus"""
+    workers = max(1, workers or Config.LINK_WORKERS)
+    totals = {"files": 0, "changed": 0, "links": 0, "converted": 0, "unresolved": Counter(), "errors": []}
+
+    def merge(chunk_totals: Dict):
+        for key in ("files", "changed", "links", "converted"):
+            totals[key] += chunk_totals[key]
+        totals["unresolved"].update(chunk_totals["unresolved"])
+        totals["errors"].extend(chunk_totals["errors"])
+
+    chunks = _chunks(iter_files(root, extensions), Config.CHUNK_SIZE)
+    if workers == 1:
+        _init_worker(mapping)
+        for chunk in chunks:
+            merge(_rewrite_chunk(chunk, dry_run))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mapping,)) as executor:
+            # Fenêtre bornée : au plus 4 lots en attente par processus
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_rewrite_chunk, chunk, dry_run))
+                if len(pending) >= workers * 4:
+                    merge(pending.popleft().result())
+            for future in pending:
+                merge(future.result())
+
+    totals["unresolved_links"] = sum(totals["unresolved"].values())
+    return totals
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def print_report(totals: Dict, dry_run: bool, report_file: Optional[str] = None):
+    print("\n" + "="*80)
+    print("📊 RÉÉCRITURE DES LIENS")
+    print("="*80)
+    verb = "à réécrire" if dry_run else "réécrits"
+    print(f"📁 Fichiers: {totals['files']} parcourus, {totals['changed']} {verb}")
+    print(f"🔗 Liens Notion: {totals['links']} trouvés, {totals['converted']} convertis, "
+          f"{totals['unresolved_links']} non résolus ({len(totals['unresolved'])} pages distinctes)")
+    for error in totals["errors"][:10]:
+        print(f"   ❌ {error}")
+
+    if report_file:
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "dry_run": dry_run,
+                "files": totals["files"],
+                "files_changed": totals["changed"],
+                "links": totals["links"],
+                "converted": totals["converted"],
+                "unresolved_links": totals["unresolved_links"],
+                "unresolved_pages": len(totals["unresolved"]),
+                "top_unresolved": [{"notion_id": notion_id, "links": count}
+                                   for notion_id, count in totals["unresolved"].most_common(50)],
+                "errors": totals["errors"]
+            }, f, indent=2)
+        print(f"\n💾 Rapport: {report_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réécrit les liens Notion en liens de blocs SiYuan")
+    parser.add_argument("root", nargs="?", default=Config.SIYUAN_DATA_DIR,
+                        help=f"Répertoire à traiter (défaut: {Config.SIYUAN_DATA_DIR})")
+    parser.add_argument("--mapping", action="append",
+                        help="Mapping Notion → SiYuan (répétable, défaut: import_mapping.json)")
+    parser.add_argument("--workers", type=int, default=Config.LINK_WORKERS, help="Processus en parallèle")
+    parser.add_argument("--dry-run", action="store_true", help="Compte sans rien écrire")
+    args = parser.parse_args()
+
+    mapping_files = args.mapping or [os.path.join(Config.OUTPUT_DIR, "import_mapping.json")]
+    mapping = load_mapping(*mapping_files)
+    if not mapping:
+        print(f"❌ Mapping vide ou introuvable: {', '.join(mapping_files)}")
+        return
+    if not os.path.isdir(args.root):
+        print(f"❌ Répertoire introuvable: {args.root}")
+        return
+
+    print(f"📋 {len(mapping)} mappings chargés, {args.workers} processus")
+    totals = rewrite_workspace(args.root, mapping, args.workers, args.dry_run)
+    os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+    print_report(totals, args.dry_run, os.path.join(Config.OUTPUT_DIR, "links_report.json"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Serveurs mock (SiYuan + Notion) pour les benchmarks
+Remplacent l'instance SiYuan (192.168.1.11:6806) et l'API Notion en local
+
+- SiYuan : endpoints utilisés par SiYuanClient (createDocWithMd, setBlockAttrs,
+  getBlockAttrs, transactions, flushTransaction, listDocTree, lsNotebooks,
+  createSnapshot, query/sql),
+  documents et attributes gardés en mémoire (attributes aussi dans une table
+  SQLite `attributes` pour /api/query/sql)
+- Notion : /search, databases, query, blocks/children, pages servis depuis
+    * un workspace synthétique procédural (--synthetic N : N entrées par database,
+      générées à la volée, mémoire constante même à 100k entrées)
+    * ou un répertoire de fixtures (--fixtures DIR, voir notion_fixtures.py) :
+      généré par generate_workspace.py, ou enregistré depuis le cache disque
+      d'un vrai run (record)
+- Latence configurable (+ jitter) et injection d'erreurs (503 / 429 + Retry-After)
+- GET /_stats : nombre de requêtes par endpoint
+
+Usage :
+    python3 mock_servers.py siyuan --port 6806 --latency-ms 5
+    python3 mock_servers.py notion --port 8000 --synthetic 10000 --databases 2
+    python3 mock_servers.py notion --fixtures fixtures/
+    python3 mock_servers.py record migration_output/notion_cache.sqlite fixtures/
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from notion_fixtures import FixtureWorkspace, match_route, notion_route, record_fixtures
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class MockConfig:
+    """Latence et erreurs injectées (par serveur)"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 error_status: int = 503, retry_after: float = 1.0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+# =============================================================================
+# SERVEUR DE BASE
+# =============================================================================
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Handler JSON commun : latence, erreurs injectées, compteurs"""
+
+    protocol_version = "HTTP/1.1"
+    # Sans ça, Nagle + delayed ACK plafonnent le serveur à ~25 req/s par connexion
+    disable_nagle_algorithm = True
+
+    mock_config: MockConfig = MockConfig()
+    stats: Dict[str, int] = {}
+    stats_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload, status: int = 200, headers: Dict = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def handle_mock(self, method: str):
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        body = self.read_json() if method == "POST" else {}
+
+        if parts.path == "/_stats":
+            with self.stats_lock:
+                return self.send_json(dict(self.stats))
+
+        endpoint = self.endpoint_name(method, parts.path)
+        with self.stats_lock:
+            self.stats[endpoint] = self.stats.get(endpoint, 0) + 1
+
+        delay = self.mock_config.delay()
+        if delay:
+            time.sleep(delay)
+
+        if self.mock_config.should_fail():
+            status = self.mock_config.error_status
+            headers = {"Retry-After": str(self.mock_config.retry_after)} if status == 429 else None
+            return self.send_json({"object": "error", "status": status}, status, headers)
+
+        result = self.route(method, parts.path, query, body)
+        if result is None:
+            return self.send_json({"object": "error", "status": 404, "code": "object_not_found"}, 404)
+        self.send_json(result)
+
+    def do_GET(self):
+        self.handle_mock("GET")
+
+    def do_POST(self):
+        self.handle_mock("POST")
+
+    def endpoint_name(self, method: str, path: str) -> str:
+        return f"{method} {path}"
+
+    def route(self, method: str, path: str, query: Dict, body: Dict):
+        raise NotImplementedError
+
+
+def serve(handler_class, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Démarre un serveur dans un thread daemon (port 0 = port libre)"""
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=handler_class.__name__, daemon=True).start()
+    return server
+
+# =============================================================================
+# SIYUAN
+# =============================================================================
+
+class SiYuanStore:
+    """Notebooks, documents et attributes en mémoire"""
+
+    def __init__(self):
+        self.notebooks = {}  # notebook_id → nom
+        self.docs = {}       # block_id → {"notebook", "path", "size"}
+        self.attrs = {}      # block_id → {nom: valeur}
+        self.snapshots = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+        # Table attributes de SiYuan (colonnes utiles seulement) pour /api/query/sql
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.execute("CREATE TABLE attributes (block_id TEXT, name TEXT, value TEXT, PRIMARY KEY (block_id, name))")
+
+    def new_id(self) -> str:
+        """Id au format SiYuan : yyyymmddhhmmss-xxxxxxx"""
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        return time.strftime("%Y%m%d%H%M%S") + "-" + format(counter, "07x")[-7:]
+
+    def create_doc(self, notebook: str, path: str, markdown: str) -> str:
+        block_id = self.new_id()
+        with self._lock:
+            self.notebooks.setdefault(notebook, notebook)
+            self.docs[block_id] = {"notebook": notebook, "path": path, "size": len(markdown)}
+            self.attrs[block_id] = {"id": block_id, "title": path.rsplit("/", 1)[-1]}
+            self.db.execute("INSERT INTO attributes VALUES (?, 'title', ?)", (block_id, path.rsplit("/", 1)[-1]))
+        return block_id
+
+    def set_attrs(self, block_id: str, attrs: Dict[str, str]) -> bool:
+        with self._lock:
+            if block_id not in self.attrs:
+                return False
+            current = self.attrs[block_id]
+            for name, value in attrs.items():
+                if value == "":
+                    current.pop(name, None)  # Valeur vide = suppression (comme SiYuan)
+                    self.db.execute("DELETE FROM attributes WHERE block_id = ? AND name = ?", (block_id, name))
+                else:
+                    current[name] = value
+                    self.db.execute("INSERT OR REPLACE INTO attributes VALUES (?, ?, ?)", (block_id, name, value))
+            return True
+
+    def query(self, stmt: str) -> List[Dict]:
+        """SELECT en lecture seule sur les tables du mock"""
+        with self._lock:
+            cursor = self.db.execute(stmt)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+class SiYuanHandler(MockHandler):
+    """Endpoints SiYuan utilisés par SiYuanClient (réponses {code, msg, data})"""
+
+    store = SiYuanStore()
+    stats: Dict[str, int] = {}
+
+    def endpoint_name(self, method: str, path: str) -> str:
+        return path
+
+    @staticmethod
+    def ok(data=None) -> Dict:
+        return {"code": 0, "msg": "", "data": data}
+
+    @staticmethod
+    def fail(msg: str) -> Dict:
+        return {"code": -1, "msg": msg, "data": None}
+
+    def route(self, method: str, path: str, query: Dict, body: Dict):
+        if method != "POST" or not path.startswith("/api/"):
+            return None
+        store = self.store
+
+        if path == "/api/filetree/createDocWithMd":
+            if not body.get("notebook") or not body.get("path"):
+                return self.fail("invalid args")
+            return self.ok(store.create_doc(body["notebook"], body["path"], body.get("markdown", "")))
+
+        if path == "/api/attr/setBlockAttrs":
+            if not store.set_attrs(body.get("id", ""), body.get("attrs", {})):
+                return self.fail(f"block not found [{body.get('id')}]")
+            return self.ok()
+
+        if path == "/api/attr/getBlockAttrs":
+            return self.ok(dict(store.attrs.get(body.get("id", ""), {})))
+
+        if path == "/api/transactions":
+            for transaction in body.get("transactions", []):
+                for op in transaction.get("doOperations", []):
+                    if op.get("action") == "updateAttrs":
+                        store.set_attrs(op.get("id", ""), op.get("data", {}).get("new", {}))
+            return self.ok([])
+
+        if path == "/api/sqlite/flushTransaction":
+            return self.ok()  # Transactions appliquées en synchrone par le mock
+
+        if path == "/api/filetree/listDocTree":
+            notebook = body.get("notebook")
+            docs = [{"id": block_id} for block_id, doc in list(store.docs.items()) if doc["notebook"] == notebook]
+            return self.ok({"tree": docs})
+
+        if path == "/api/notebook/lsNotebooks":
+            return self.ok({"notebooks": [
+                {"id": notebook_id, "name": name, "closed": False}
+                for notebook_id, name in list(store.notebooks.items())
+            ]})
+
+        if path == "/api/query/sql":
+            stmt = body.get("stmt", "")
+            if not stmt.lstrip().lower().startswith("select"):
+                return self.fail("mock: SELECT uniquement")
+            try:
+                return self.ok(store.query(stmt))
+            except sqlite3.Error as e:
+                return self.fail(str(e))
+
+        if path == "/api/repo/createSnapshot":
+            store.snapshots += 1
+            return self.ok()
+
+        return self.fail(f"mock: endpoint non simulé {path}")
+
+# =============================================================================
+# NOTION : SOURCES DE DONNÉES
+# =============================================================================
+
+class SyntheticWorkspace:
+    """
+    Workspace procédural : une page racine, `databases` databases de
+    `entries` entrées chacune. Tout est dérivé des ids (UUID encodant
+    type / database / entrée / bloc) : rien n'est stocké.
+    """
+
+    KIND_ROOT, KIND_DATABASE, KIND_PAGE, KIND_BLOCK = 1, 2, 3, 4
+
+    def __init__(self, entries: int = 1000, databases: int = 1, blocks_per_page: int = 6):
+        self.entries = entries
+        self.databases = databases
+        self.blocks_per_page = blocks_per_page
+
+    @staticmethod
+    def make_id(kind: int, db: int = 0, entry: int = 0, block: int = 0) -> str:
+        return str(uuid.UUID(int=(kind << 120) | (db << 80) | (entry << 40) | block))
+
+    @staticmethod
+    def parse_id(notion_id: str):
+        try:
+            value = uuid.UUID(notion_id).int
+        except ValueError:
+            return None
+        mask = (1 << 40) - 1
+        return value >> 120, (value >> 80) & mask, (value >> 40) & mask, value & mask
+
+    def root(self) -> Dict:
+        return {
+            "object": "page",
+            "id": self.make_id(self.KIND_ROOT),
+            "parent": {"type": "workspace", "workspace": True},
+            "properties": {"title": {"id": "title", "type": "title", "title": [{"plain_text": "Benchmark"}]}}
+        }
+
+    def database(self, db_id: str) -> Optional[Dict]:
+        parsed = self.parse_id(db_id)
+        if not parsed or parsed[0] != self.KIND_DATABASE or parsed[1] >= self.databases:
+            return None
+        db = parsed[1]
+        return {
+            "object": "database",
+            "id": db_id,
+            "title": [{"plain_text": f"Bench DB {db}"}],
+            "url": f"https://www.notion.so/benchmark/{db_id.replace('-', '')}",
+            "parent": {"type": "page_id", "page_id": self.make_id(self.KIND_ROOT)},
+            "last_edited_time": "2025-01-01T00:00:00.000Z",
+            "properties": {
+                "Name": {"id": "title", "type": "title", "title": {}},
+                "Status": {"id": "st", "type": "select", "select": {"options": [
+                    {"name": name, "color": "default"} for name in ("Todo", "Doing", "Done")
+                ]}},
+                "Tags": {"id": "tg", "type": "multi_select", "multi_select": {"options": [
+                    {"name": f"tag{n}", "color": "default"} for n in range(5)
+                ]}},
+                "Score": {"id": "sc", "type": "number", "number": {}},
+                "Done": {"id": "dn", "type": "checkbox", "checkbox": {}},
+                "Due": {"id": "du", "type": "date", "date": {}},
+                "Notes": {"id": "nt", "type": "rich_text", "rich_text": {}},
+                "Link": {"id": "ln", "type": "url", "url": {}},
+                "Related": {"id": "rl", "type": "relation", "relation": {"database_id": db_id}},
+                "Count": {"id": "ct", "type": "rollup", "rollup": {
+                    "relation_property_name": "Related", "rollup_property_name": "Name", "function": "count"
+                }}
+            }
+        }
+
+    def entry(self, db: int, index: int) -> Dict:
+        page_id = self.make_id(self.KIND_PAGE, db, index)
+        text = lambda value: [{"type": "text", "plain_text": value, "text": {"content": value}}]
+        return {
+            "object": "page",
+            "id": page_id,
+            "parent": {"type": "database_id", "database_id": self.make_id(self.KIND_DATABASE, db)},
+            "last_edited_time": f"2025-01-{1 + index % 28:02d}T{index % 24:02d}:00:00.000Z",
+            "properties": {
+                "Name": {"type": "title", "title": text(f"Entry {db}-{index}")},
+                "Status": {"type": "select", "select": {"name": ("Todo", "Doing", "Done")[index % 3]}},
+                "Tags": {"type": "multi_select", "multi_select": [{"name": f"tag{index % 5}"}, {"name": f"tag{(index + 1) % 5}"}]},
+                "Score": {"type": "number", "number": index % 100},
+                "Done": {"type": "checkbox", "checkbox": index % 2 == 0},
+                "Due": {"type": "date", "date": {"start": f"2025-{1 + index % 12:02d}-01", "end": None}},
+                "Notes": {"type": "rich_text", "rich_text": text(f"Notes for entry {index}")},
+                "Link": {"type": "url", "url": f"https://example.com/{index}"},
+                "Related": {"type": "relation", "relation": [{"id": self.make_id(self.KIND_PAGE, db, (index + 1) % self.entries)}]},
+                "Count": {"type": "rollup", "rollup": {"type": "number", "number": 1}}
+            }
+        }
+
+    def search(self, object_type: str) -> List[Dict]:
+        if object_type == "database":
+            return [self.database(self.make_id(self.KIND_DATABASE, db)) for db in range(self.databases)]
+        return [self.root()]
+
+    def query(self, db_id: str, body: Dict) -> Optional[Dict]:
+        parsed = self.parse_id(db_id)
+        if not parsed or parsed[0] != self.KIND_DATABASE or parsed[1] >= self.databases:
+            return None
+        db = parsed[1]
+
+        start = int(body.get("start_cursor") or 0)
+        size = max(1, min(100, int(body.get("page_size") or 100)))
+        edited_since = body.get("filter", {}).get("last_edited_time", {}).get("on_or_after")
+
+        results = []
+        index = start
+        while index < self.entries and len(results) < size:
+            entry = self.entry(db, index)
+            index += 1
+            if not edited_since or entry["last_edited_time"] >= edited_since:
+                results.append(entry)
+
+        has_more = index < self.entries
+        return {"object": "list", "results": results, "has_more": has_more,
+                "next_cursor": str(index) if has_more else None}
+
+    def block(self, kind_db_entry_block, number: int, parent_path: int) -> Dict:
+        _, db, entry, _ = kind_db_entry_block
+        block_path = parent_path * 100 + number + 1
+        block_types = ("paragraph", "heading_2", "bulleted_list_item", "toggle", "numbered_list_item", "to_do")
+        block_type = block_types[number % len(block_types)]
+        has_children = parent_path == 0 and block_type == "toggle"
+        text = f"Block {block_path} of entry {entry} " + "lorem ipsum " * (1 + number % 4)
+        return {
+            "object": "block",
+            "id": self.make_id(self.KIND_BLOCK, db, entry, block_path),
+            "type": block_type,
+            "has_children": has_children,
+            block_type: {"rich_text": [{"type": "text", "plain_text": text, "text": {"content": text}}]}
+        }
+
+    def children(self, block_id: str) -> Optional[List[Dict]]:
+        parsed = self.parse_id(block_id)
+        if not parsed:
+            return None
+        if parsed[0] == self.KIND_PAGE:
+            return [self.block(parsed, number, 0) for number in range(self.blocks_per_page)]
+        if parsed[0] == self.KIND_BLOCK:
+            return [self.block(parsed, number, parsed[3]) for number in range(2)]
+        return []
+
+    def release(self, block_id: str):
+        pass  # Rien n'est gardé en mémoire
+
+    def page(self, page_id: str) -> Optional[Dict]:
+        parsed = self.parse_id(page_id)
+        if not parsed:
+            return None
+        if parsed[0] == self.KIND_ROOT:
+            return self.root()
+        if parsed[0] == self.KIND_PAGE:
+            return self.entry(parsed[1], parsed[2])
+        return None
+
+# =============================================================================
+# NOTION : SERVEUR
+# =============================================================================
+
+class NotionHandler(MockHandler):
+    """Sous-ensemble de l'API Notion utilisé par les clients (voir workspace)"""
+
+    workspace = SyntheticWorkspace()
+    stats: Dict[str, int] = {}
+
+    def endpoint_name(self, method: str, path: str) -> str:
+        name, _ = match_route(method, path)
+        return name or f"{method} {path}"
+
+    def route(self, method: str, path: str, query: Dict, body: Dict):
+        if not path.startswith("/v1/"):
+            return None
+        return notion_route(self.workspace, method, path, query, body)
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveurs mock SiYuan / Notion")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("siyuan", "notion"):
+        server = sub.add_parser(name)
+        server.add_argument("--host", default="127.0.0.1")
+        server.add_argument("--port", type=int, default=0, help="0 = port libre (affiché au démarrage)")
+        server.add_argument("--latency-ms", type=float, default=0)
+        server.add_argument("--jitter-ms", type=float, default=0)
+        server.add_argument("--error-rate", type=float, default=0, help="Proportion de réponses en erreur")
+        server.add_argument("--error-status", type=int, default=503, help="503, 429 (avec Retry-After)...")
+        server.add_argument("--retry-after", type=float, default=1.0)
+        server.add_argument("--seed", type=int, default=0)
+        if name == "notion":
+            server.add_argument("--synthetic", type=int, default=1000, help="Entrées par database")
+            server.add_argument("--databases", type=int, default=1)
+            server.add_argument("--blocks-per-page", type=int, default=6)
+            server.add_argument("--fixtures", help="Répertoire de fixtures (remplace --synthetic)")
+
+    record = sub.add_parser("record", help="Exporte un cache disque Notion en fixtures")
+    record.add_argument("cache_path")
+    record.add_argument("directory")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        counts = record_fixtures(args.cache_path, args.directory)
+        print(f"💾 Fixtures: {counts['databases']} databases, {counts['entries']} entrées, "
+              f"{counts['pages']} pages → {args.directory}")
+        return
+
+    handler = SiYuanHandler if args.command == "siyuan" else NotionHandler
+    handler.mock_config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                                     args.error_status, args.retry_after, args.seed)
+    if args.command == "notion":
+        handler.workspace = (FixtureWorkspace(args.fixtures) if args.fixtures
+                             else SyntheticWorkspace(args.synthetic, args.databases, args.blocks_per_page))
+
+    server = serve(handler, args.port, args.host)
+    # Première ligne lue par benchmark_import.py
+    print(f"PORT {server.server_port}", flush=True)
+    print(f"🧪 Mock {args.command} sur http://{args.host}:{server.server_port}", file=sys.stderr)
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Cache disque des lectures Notion
+Cache SQLite content-addressed devant NotionClient
+
+- Pages / arbres de blocs indexés par (id, last_edited_time) : une page
+  inchangée depuis le dernier run n'est pas re-téléchargée
+- Requêtes sans version (query database, search) gardées pour le replay ;
+  une query (marqueur + pages) est évincée d'un bloc, jamais à moitié
+- Contenu dédupliqué (sha256) et compressé (zlib)
+- Éviction LRU au-delà de NOTION_CACHE_MAX_MB
+- Mode offline (NOTION_CACHE_OFFLINE=true) : aucun appel Notion,
+  tout est rejoué depuis le cache
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    NOTION_CACHE = os.getenv("NOTION_CACHE", "false").lower() == "true"
+    NOTION_CACHE_PATH = os.getenv("NOTION_CACHE_PATH", "migration_output/notion_cache.sqlite")
+    NOTION_CACHE_MAX_MB = int(os.getenv("NOTION_CACHE_MAX_MB", "2048"))
+    NOTION_CACHE_OFFLINE = os.getenv("NOTION_CACHE_OFFLINE", "false").lower() == "true"
+
+    # Nombre d'écritures entre deux commits SQLite
+    COMMIT_EVERY = 100
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class NotionCache:
+    """Cache SQLite (kind, key) → JSON, versionné par last_edited_time"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            version TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (kind, key)
+        );
+        CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+        CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+    """
+
+    def __init__(self, path: str, max_bytes: int, offline: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()[0]
+        self._pending_writes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, key: str, version: Optional[str] = None,
+            max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Retourne la valeur en cache, ou None.
+
+        Si `version` est fourni, seule une entrée de même version est valide.
+        Si `max_age` (secondes) est fourni, la version de l'entrée est son
+        horodatage de fetch : une entrée plus ancienne est ignorée.
+        En mode offline, version et âge sont ignorés (on rejoue ce qu'on a).
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT e.version, b.data FROM entries e JOIN blobs b ON b.hash = e.hash "
+                "WHERE e.kind = ? AND e.key = ?",
+                (kind, key)
+            ).fetchone()
+
+            if row is None or (not self.offline and (
+                    (version is not None and row[0] != version)
+                    or (max_age is not None and self._age(row[0]) > max_age))):
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?",
+                (time.time(), kind, key)
+            )
+            self._mark_write()
+            self.hits += 1
+
+        return json.loads(zlib.decompress(row[1]))
+
+    @staticmethod
+    def _age(version: str) -> float:
+        """Âge (secondes) d'une entrée dont la version est un horodatage"""
+        try:
+            return time.time() - float(version)
+        except ValueError:
+            return float("inf")
+
+    def put(self, kind: str, key: str, value: Any, version: str = ""):
+        """Stocke une valeur (remplace l'entrée existante)"""
+        raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM blobs WHERE hash = ?", (digest,)
+            ).fetchone()
+
+            if not exists:
+                data = zlib.compress(raw, 6)
+                self._db.execute(
+                    "INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                    (digest, data, len(data))
+                )
+                self._total_bytes += len(data)
+
+            old = self._db.execute(
+                "SELECT hash FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (kind, key, version, hash, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, key, version or "", digest, time.time())
+            )
+
+            if old and old[0] != digest:
+                self._drop_orphan(old[0])
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+            self._mark_write()
+
+    def invalidate_query(self, database_id: str):
+        """Oublie la query d'une database (marqueur + pages), avant de la refaire"""
+        with self._lock:
+            for kind, key, digest in self._query_rows(database_id):
+                self._drop_entry(kind, key, digest)
+            self._mark_write()
+
+    def _query_rows(self, database_id: str) -> List[tuple]:
+        """Entrées d'une query : le marqueur "query" et ses "query_page" (database_id:n)"""
+        prefix = f"{database_id}:"
+        return self._db.execute(
+            "SELECT kind, key, hash FROM entries WHERE (kind = 'query' AND key = ?) "
+            "OR (kind = 'query_page' AND substr(key, 1, ?) = ?)",
+            (database_id, len(prefix), prefix)
+        ).fetchall()
+
+    def _drop_entry(self, kind: str, key: str, digest: str):
+        self._db.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+        self._drop_orphan(digest)
+
+    def _drop_orphan(self, digest: str):
+        """Supprime un blob qui n'est plus référencé"""
+        referenced = self._db.execute(
+            "SELECT 1 FROM entries WHERE hash = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if referenced:
+            return
+
+        row = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            self._total_bytes -= row[0]
+
+    def _evict(self):
+        """Éviction LRU jusqu'à 90% de la taille max"""
+        target = int(self.max_bytes * 0.9)
+        rows = self._db.execute(
+            "SELECT kind, key, hash FROM entries ORDER BY accessed ASC"
+        ).fetchall()
+
+        for kind, key, digest in rows:
+            if self._total_bytes <= target:
+                break
+            if kind == "query":
+                group = self._query_rows(key)
+            elif kind == "query_page":
+                # Sans une de ses pages, le replay d'une query serait tronqué
+                group = self._query_rows(key.rsplit(":", 1)[0])
+            else:
+                group = [(kind, key, digest)]
+            for row in group:
+                self._drop_entry(*row)
+
+    def _mark_write(self):
+        self._pending_writes += 1
+        if self._pending_writes >= Config.COMMIT_EVERY:
+            self._db.commit()
+            self._pending_writes = 0
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size_mb": round(self._total_bytes / 1024 / 1024, 1),
+            "offline": self.offline
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+# =============================================================================
+# INSTANCE PARTAGÉE
+# =============================================================================
+
+_cache: Optional[NotionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[NotionCache]:
+    """Cache partagé du process (None si NOTION_CACHE=false)"""
+    global _cache
+
+    if not Config.NOTION_CACHE and not Config.NOTION_CACHE_OFFLINE:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = NotionCache(
+                Config.NOTION_CACHE_PATH,
+                Config.NOTION_CACHE_MAX_MB * 1024 * 1024,
+                offline=Config.NOTION_CACHE_OFFLINE
+            )
+            atexit.register(_cache.close)
+            if _cache.offline:
+                print(f"📦 Mode OFFLINE : replay depuis {Config.NOTION_CACHE_PATH}")
+        return _cache
+
+
+def print_cache_stats():
+    """Affiche les statistiques du cache (fin de run)"""
+    if _cache is None:
+        return
+    stats = _cache.stats()
+    print(f"📦 Cache Notion: {stats['hits']} hits, {stats['misses']} misses, {stats['size_mb']} MB")
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Workspace Notion enregistré sur disque (fixtures)
+Sert l'API Notion depuis un répertoire, sans réseau
+
+Layout du répertoire :
+    manifest.json                            (optionnel) paramètres de génération
+    search_page.json, search_database.json   résultats complets de /search
+    databases/<id>.json                      objet database
+    queries/<id>.jsonl                       une entrée par ligne
+    blocks/<id>.json                         arbre des blocs d'une page ("children" imbriqués)
+    pages/<id>.json                          (optionnel) objet page
+
+Utilisé par :
+- NotionClient (import et extraction) avec NOTION_FIXTURES=<répertoire> :
+  FixtureSession remplace la session HTTP, même interface que PooledSession
+- mock_servers.py notion --fixtures <répertoire> (mêmes routes, en HTTP)
+
+Produit par generate_workspace.py (synthétique, seedé) ou par
+`mock_servers.py record` (depuis le cache disque d'un vrai run).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from http_session import notify_request
+
+# =============================================================================
+# WORKSPACE
+# =============================================================================
+
+def paginate(items: List, start_cursor: Optional[str], page_size) -> Dict:
+    """Réponse paginée Notion (curseur = index de départ)"""
+    start = int(start_cursor or 0)
+    size = max(1, min(100, int(page_size or 100)))
+    results = items[start:start + size]
+    has_more = start + size < len(items)
+    return {
+        "object": "list",
+        "results": results,
+        "has_more": has_more,
+        "next_cursor": str(start + size) if has_more else None
+    }
+
+
+class FixtureWorkspace:
+    """Workspace lu depuis un répertoire de fixtures (chargé à la demande, puis gardé)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._search: Dict[str, List[Dict]] = {}
+        self._queries: Dict[str, List[Dict]] = {}
+        self._children: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, *parts) -> Optional[object]:
+        path = os.path.join(self.directory, *parts)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def search(self, object_type: str) -> List[Dict]:
+        with self._lock:
+            if object_type not in self._search:
+                self._search[object_type] = self._read(f"search_{object_type}.json") or []
+            return self._search[object_type]
+
+    def database(self, db_id: str) -> Optional[Dict]:
+        return self._read("databases", f"{db_id}.json")
+
+    def _entries(self, db_id: str) -> Optional[List[Dict]]:
+        with self._lock:
+            if db_id not in self._queries:
+                path = os.path.join(self.directory, "queries", f"{db_id}.jsonl")
+                if not os.path.exists(path):
+                    return None
+                with open(path, encoding="utf-8") as f:
+                    self._queries[db_id] = [json.loads(line) for line in f if line.strip()]
+            return self._queries[db_id]
+
+    def query(self, db_id: str, body: Dict) -> Optional[Dict]:
+        entries = self._entries(db_id)
+        if entries is None:
+            return None
+        edited_since = body.get("filter", {}).get("last_edited_time", {}).get("on_or_after")
+        if edited_since:
+            entries = [entry for entry in entries if entry.get("last_edited_time", "") >= edited_since]
+        return paginate(entries, body.get("start_cursor"), body.get("page_size"))
+
+    def children(self, block_id: str) -> Optional[List[Dict]]:
+        with self._lock:
+            if block_id in self._children:
+                return self._children[block_id]
+
+        tree = self._read("blocks", f"{block_id}.json")
+        if tree is None:
+            return []
+
+        # Arbre enregistré → enfants directs de chaque bloc (sans "children", comme l'API)
+        with self._lock:
+            stack = [(block_id, tree)]
+            while stack:
+                parent_id, blocks = stack.pop()
+                self._children[parent_id] = [
+                    {key: value for key, value in block.items() if key != "children"} for block in blocks
+                ]
+                stack.extend((block["id"], block["children"]) for block in blocks if block.get("children"))
+            return self._children[block_id]
+
+    def release(self, block_id: str):
+        """Oublie les enfants d'un bloc une fois servis (mémoire bornée sur 100k pages)"""
+        with self._lock:
+            self._children.pop(block_id, None)
+
+    def page(self, page_id: str) -> Optional[Dict]:
+        page = self._read("pages", f"{page_id}.json")
+        if page is not None:
+            return page
+        return next((item for item in self.search("page") if item.get("id") == page_id), None)
+
+# =============================================================================
+# ROUTES (partagées avec mock_servers.py)
+# =============================================================================
+
+NOTION_ROUTES = [
+    ("POST", re.compile(r"/search$"), "search"),
+    ("POST", re.compile(r"/databases/([^/]+)/query$"), "query"),
+    ("GET", re.compile(r"/databases/([^/]+)$"), "database"),
+    ("GET", re.compile(r"/blocks/([^/]+)/children$"), "children"),
+    ("GET", re.compile(r"/blocks/([^/]+)$"), "block"),
+    ("GET", re.compile(r"/pages/([^/]+)$"), "page"),
+]
+
+
+def match_route(method: str, path: str):
+    """(nom de la route, arguments) pour un chemin de l'API, ou (None, ())"""
+    for route_method, pattern, name in NOTION_ROUTES:
+        match = pattern.search(path)
+        if route_method == method and match:
+            return name, match.groups()
+    return None, ()
+
+
+def notion_route(workspace, method: str, path: str, query: Dict, body: Dict) -> Optional[Dict]:
+    """Réponse JSON d'un workspace pour une requête de l'API, None = 404"""
+    name, args = match_route(method, path)
+
+    if name == "search":
+        object_type = body.get("filter", {}).get("value", "page")
+        return paginate(workspace.search(object_type), body.get("start_cursor"), body.get("page_size"))
+    if name == "query":
+        return workspace.query(args[0], body)
+    if name == "database":
+        return workspace.database(args[0])
+    if name == "children":
+        children = workspace.children(args[0])
+        if children is None:
+            return None
+        response = paginate(children, query.get("start_cursor"), query.get("page_size"))
+        if not response["has_more"]:
+            workspace.release(args[0])
+        return response
+    if name in ("page", "block"):
+        return workspace.page(args[0])
+    return None
+
+# =============================================================================
+# SESSIONS (remplacent PooledSession / AsyncSession)
+# =============================================================================
+
+class FixtureResponse:
+    """Sous-ensemble de requests.Response lu par les clients et rate_limiter.py"""
+
+    def __init__(self, status_code: int, payload: Dict):
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self._payload = payload
+
+    def json(self) -> Dict:
+        return self._payload
+
+    @property
+    def text(self) -> str:
+        return json.dumps(self._payload, ensure_ascii=False)
+
+
+class FixtureSession:
+    """Session sans réseau : les requêtes Notion sont servies par un FixtureWorkspace"""
+
+    def __init__(self, directory: str):
+        self.name = "Notion (fixtures)"
+        self.workspace = FixtureWorkspace(directory)
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def request(self, method: str, url: str, headers: Dict = None, params: Dict = None,
+                json: Dict = None, **kwargs) -> FixtureResponse:
+        parts = urlsplit(url)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        query.update({key: str(value) for key, value in (params or {}).items()})
+
+        with self._lock:
+            self._requests += 1
+
+        start = time.perf_counter()
+        payload = notion_route(self.workspace, method, parts.path, query, json or {})
+        if payload is None:
+            response = FixtureResponse(404, {"object": "error", "status": 404, "code": "object_not_found"})
+        else:
+            response = FixtureResponse(200, payload)
+        notify_request(self.name, method, url, response, time.perf_counter() - start)
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "fixtures",
+            "pool_size": 0,
+            "keep_alive": False,
+            "requests": self._requests,
+            "connections_opened": 0,
+            "connections_reused": 0
+        }
+
+    def close(self):
+        pass
+
+
+class AsyncFixtureSession:
+    """Interface AsyncSession au-dessus d'une FixtureSession (lectures disque, pas d'I/O réseau)"""
+
+    def __init__(self, session: FixtureSession):
+        self.name = session.name
+        self.session = session
+
+    @property
+    def requests(self) -> int:
+        return self.session._requests
+
+    async def request(self, method: str, url: str, headers: Dict = None, **kwargs):
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        pass
+
+
+_sessions: Dict[str, FixtureSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def fixture_limiter():
+    """Limiter sans débit max : les fixtures ne sont pas rate-limitées"""
+    from rate_limiter import get_limiter
+    return get_limiter("Notion (fixtures)", 0, 1)
+
+
+def get_fixture_session(directory: str) -> FixtureSession:
+    """Session partagée par répertoire (les fixtures chargées sont gardées en mémoire)"""
+    with _sessions_lock:
+        if directory not in _sessions:
+            if not os.path.isdir(directory):
+                raise FileNotFoundError(f"Répertoire de fixtures introuvable: {directory}")
+            _sessions[directory] = FixtureSession(directory)
+        return _sessions[directory]
+
+# =============================================================================
+# ENREGISTREMENT DEPUIS LE CACHE DISQUE
+# =============================================================================
+
+def record_fixtures(cache_path: str, directory: str) -> Dict[str, int]:
+    """Exporte le cache disque d'un run (notion_cache.sqlite) en répertoire de fixtures"""
+    from notion_cache import NotionCache
+
+    cache = NotionCache(cache_path, max_bytes=1 << 62)
+    keys = sqlite3.connect(cache_path).execute("SELECT kind, key FROM entries").fetchall()
+    counts = {"databases": 0, "entries": 0, "pages": 0}
+
+    for sub in ("databases", "queries", "blocks"):
+        os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def write(value, *parts):
+        with open(os.path.join(directory, *parts), "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+
+    for kind, key in keys:
+        if kind == "search":
+            write(cache.get(kind, key), f"search_{key}.json")
+        elif kind == "database":
+            write(cache.get(kind, key), "databases", f"{key}.json")
+            counts["databases"] += 1
+        elif kind == "blocks":
+            write(cache.get(kind, key), "blocks", f"{key}.json")
+            counts["pages"] += 1
+        elif kind == "query":
+            marker = cache.get(kind, key)
+            with open(os.path.join(directory, "queries", f"{key}.jsonl"), "w", encoding="utf-8") as f:
+                for page in range(marker["pages"]):
+                    for entry in cache.get("query_page", f"{key}:{page}") or []:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                        counts["entries"] += 1
+
+    cache.close()
+    return counts
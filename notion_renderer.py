@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Rendu Markdown des blocs Notion
+Un seul moteur pour l'import et l'ancien migrateur (old_trash/)
+
+- Table de dispatch type de bloc → méthode, un seul passage sur l'arbre
+  (enfants sous "children", comme NotionClient.get_block_tree)
+- Sortie accumulée dans une liste de fragments, jointe une fois à la fin :
+  l'indentation des enfants est un préfixe passé en argument, jamais un
+  re-découpage du texte déjà rendu (coût linéaire en nombre de blocs)
+- Listes imbriquées : indentation à la largeur du marqueur, numérotation
+  par suite de numbered_list_item consécutifs, remise à zéro par niveau
+- Rich text : annotations (gras, italique, barré, souligné, code), liens,
+  mentions et équations en une passe par segment ; le texte brut est
+  échappé (caractères Markdown, tags #, $, marqueurs de liste en début de
+  ligne), jamais le code
+
+Les liens vers d'autres pages (mentions, sous-pages, link_to_page) restent
+des URLs notion.so : link_rewriter.py les convertit en liens de blocs SiYuan
+une fois le mapping connu. Les blocs sans équivalent (table des matières,
+fil d'Ariane, unsupported) sont ignorés.
+"""
+
+import re
+from typing import Dict, List
+
+NOTION_URL = "https://www.notion.so/"
+
+LIST_TYPES = frozenset({"bulleted_list_item", "numbered_list_item", "to_do", "toggle"})
+
+# Langages Notion sans équivalent de coloration côté SiYuan
+PLAIN_LANGUAGES = frozenset({"plain text", "markup"})
+
+# Blocs fichier : rendus en lien (image : en image)
+MEDIA_TYPES = ("image", "video", "file", "pdf", "audio", "embed", "bookmark", "link_preview")
+
+
+# Annotations qui produisent un marquage (la couleur est ignorée)
+MARKS = ("bold", "italic", "strikethrough", "underline", "code")
+
+# Caractères Markdown / SiYuan (tags #, maths $) échappés dans le texte brut.
+# "|" n'est échappé que dans les tableaux (_table)
+_ESCAPES = str.maketrans({char: "\\" + char for char in "\\`*_~[]<>#$"})
+
+# Début de ligne lu comme un bloc : liste (-, +, "1."), titre setext (=)
+_LINE_START = re.compile(r"^([ \t]*)(?:([-+=])|(\d+)([.)]))", re.M)
+
+
+def notion_url(notion_id: str) -> str:
+    return NOTION_URL + notion_id.replace("-", "")
+
+
+def escape_markdown(text: str) -> str:
+    """Texte brut → Markdown littéral (rien n'est interprété comme marquage)"""
+    text = text.translate(_ESCAPES)
+    return _LINE_START.sub(_escape_line_start, text)
+
+
+def _escape_line_start(match) -> str:
+    if match.group(2):
+        return f"{match.group(1)}\\{match.group(2)}"
+    return f"{match.group(1)}{match.group(3)}\\{match.group(4)}"
+
+# =============================================================================
+# RICH TEXT
+# =============================================================================
+
+def plain_text(segments: List[Dict]) -> str:
+    """Texte brut d'un tableau de rich_text"""
+    return "".join(segment.get("plain_text", "") for segment in segments)
+
+
+def _mention_link(segment: Dict, text: str) -> str:
+    mention = segment.get("mention") or {}
+    mention_type = mention.get("type")
+    if mention_type in ("page", "database"):
+        return f"[{escape_markdown(text)}]({notion_url(mention[mention_type]['id'])})"
+    if mention_type == "user":
+        return escape_markdown(text if text.startswith("@") else f"@{text}")
+    href = segment.get("href")
+    return f"[{escape_markdown(text)}]({href})" if href else escape_markdown(text)
+
+
+def rich_text(segments: List[Dict]) -> str:
+    """Rich text Notion → Markdown (annotations, liens, mentions, équations)"""
+    parts = []
+    for segment in segments:
+        text = segment.get("plain_text", "")
+        if not text:
+            continue
+        segment_type = segment.get("type")
+
+        if segment_type == "equation":
+            parts.append(f"${segment['equation']['expression']}$")
+            continue
+        if segment_type == "mention":
+            parts.append(_mention_link(segment, text))
+            continue
+
+        # Notion envoie toujours les annotations (toutes à False pour du texte simple)
+        annotations = segment.get("annotations") or {}
+        href = segment.get("href")
+        if not href and not any(annotations.get(mark) for mark in MARKS):
+            parts.append(escape_markdown(text))
+            continue
+
+        # Les marqueurs ne peuvent pas toucher un espace : il reste à l'extérieur
+        core = text.strip()
+        if not core:
+            parts.append(text)
+            continue
+        lead = text[:len(text) - len(text.lstrip())]
+        trail = text[len(text.rstrip()):]
+
+        if annotations.get("code"):
+            core = f"`{core}`" if "`" not in core else f"`` {core} ``"
+        else:
+            core = escape_markdown(core)
+        if annotations.get("bold"):
+            core = f"**{core}**"
+        if annotations.get("italic"):
+            core = f"*{core}*"
+        if annotations.get("strikethrough"):
+            core = f"~~{core}~~"
+        if annotations.get("underline"):
+            core = f"<u>{core}</u>"
+        if href:
+            core = f"[{core}]({href})"
+        parts.append(f"{lead}{core}{trail}")
+    return "".join(parts)
+
+# =============================================================================
+# BLOCS
+# =============================================================================
+
+class MarkdownRenderer:
+    """Arbre de blocs Notion → Markdown (une instance par rendu)"""
+
+    # Type de bloc → nom de la méthode de rendu (résolue une fois, voir DISPATCH)
+    HANDLERS = {
+        "paragraph": "_paragraph",
+        "heading_1": "_heading",
+        "heading_2": "_heading",
+        "heading_3": "_heading",
+        "quote": "_quote",
+        "callout": "_quote",
+        "code": "_code",
+        "equation": "_equation",
+        "divider": "_divider",
+        "table": "_table",
+        "column_list": "_container",
+        "column": "_container",
+        "synced_block": "_container",
+        "child_page": "_child_page",
+        "child_database": "_child_page",
+        "link_to_page": "_link_to_page",
+        **{media_type: "_media" for media_type in MEDIA_TYPES},
+    }
+
+    def __init__(self):
+        self._out: List[str] = []
+        self._last_list = False  # Dernier bloc émis : un item de liste (listes serrées)
+
+    def render(self, blocks: List[Dict]) -> str:
+        self._blocks(blocks, "")
+        return "".join(self._out)
+
+    # -------------------------------------------------------------------------
+    # Parcours
+    # -------------------------------------------------------------------------
+
+    def _blocks(self, blocks: List[Dict], prefix: str):
+        """Suite de blocs frères ; numérote les numbered_list_item consécutifs"""
+        number = 0
+        for block in blocks:
+            block_type = block.get("type")
+            number = number + 1 if block_type == "numbered_list_item" else 0
+            data = block.get(block_type) or {}
+            if block_type in LIST_TYPES:
+                self._list_item(prefix, block, data, number)
+                continue
+            handler = DISPATCH.get(block_type)
+            if handler is not None:
+                handler(self, prefix, block, data)
+            elif data.get("rich_text"):
+                self._paragraph(prefix, block, data)  # Type inconnu : son texte, sinon ignoré
+
+    def _emit(self, prefix: str, text: str, is_list: bool = False, line_prefix: str = None):
+        """
+        Un bloc : séparateur au niveau de `prefix`, puis chaque ligne préfixée
+        par `line_prefix` (celui d'une citation qui s'ouvre, sinon `prefix`)
+        """
+        if self._out:
+            if is_list and self._last_list:
+                self._out.append("\n")
+            else:
+                # Ligne vide qui garde le préfixe des citations ("> " → ">")
+                self._out.append("\n" + prefix.rstrip() + "\n")
+        if line_prefix is None:
+            line_prefix = prefix
+        self._out.append(line_prefix)
+        self._out.append(text.replace("\n", "\n" + line_prefix) if "\n" in text else text)
+        self._last_list = is_list
+
+    def _children(self, block: Dict, prefix: str):
+        children = block.get("children")
+        if children:
+            self._blocks(children, prefix)
+
+    # -------------------------------------------------------------------------
+    # Rendus par type
+    # -------------------------------------------------------------------------
+
+    def _paragraph(self, prefix: str, block: Dict, data: Dict):
+        text = rich_text(data.get("rich_text") or [])
+        if text:
+            self._emit(prefix, text)
+        self._children(block, prefix)
+
+    def _heading(self, prefix: str, block: Dict, data: Dict):
+        text = rich_text(data.get("rich_text") or [])
+        if text:
+            level = int(block["type"][-1])
+            self._emit(prefix, "#" * level + " " + text.replace("\n", " "))
+        self._children(block, prefix)  # Titre dépliable : contenu à la suite
+
+    def _list_item(self, prefix: str, block: Dict, data: Dict, number: int = 0):
+        block_type = block["type"]
+        if block_type == "numbered_list_item":
+            marker = f"{number}. "
+        elif block_type == "to_do":
+            marker = "- [x] " if data.get("checked") else "- [ ] "
+        else:
+            marker = "- "  # Toggle : item dont les enfants sont le contenu replié
+
+        child_prefix = prefix + " " * (len(marker) if block_type != "to_do" else 2)
+        text = rich_text(data.get("rich_text") or [])
+        self._emit(prefix, marker + text.replace("\n", "\n" + child_prefix[len(prefix):]), is_list=True)
+        self._children(block, child_prefix)
+
+    def _quote(self, prefix: str, block: Dict, data: Dict):
+        text = rich_text(data.get("rich_text") or [])
+        if block["type"] == "callout":
+            icon = (data.get("icon") or {}).get("emoji")
+            if icon:
+                text = f"{icon} {text}" if text else icon
+        quote_prefix = prefix + "> "
+        self._emit(prefix, text, line_prefix=quote_prefix)
+        self._children(block, quote_prefix)
+
+    def _code(self, prefix: str, block: Dict, data: Dict):
+        code = plain_text(data.get("rich_text") or [])
+        language = data.get("language") or ""
+        if language in PLAIN_LANGUAGES:
+            language = ""
+        fence = "````" if "```" in code else "```"
+        self._emit(prefix, f"{fence}{language}\n{code}\n{fence}")
+
+    def _equation(self, prefix: str, block: Dict, data: Dict):
+        self._emit(prefix, f"$$\n{data.get('expression', '')}\n$$")
+
+    def _divider(self, prefix: str, block: Dict, data: Dict):
+        self._emit(prefix, "---")
+
+    def _table(self, prefix: str, block: Dict, data: Dict):
+        rows = [row for row in block.get("children") or [] if row.get("type") == "table_row"]
+        if not rows:
+            return
+        width = data.get("table_width") or max(len(row["table_row"].get("cells") or []) for row in rows)
+
+        lines = []
+        for idx, row in enumerate(rows):
+            cells = row["table_row"].get("cells") or []
+            values = [
+                rich_text(cells[col]).replace("|", "\\|").replace("\n", "<br />") if col < len(cells) else ""
+                for col in range(width)
+            ]
+            lines.append("| " + " | ".join(values) + " |")
+            if idx == 0:
+                # Markdown impose une ligne d'en-tête : la première ligne la tient
+                lines.append("|" + " --- |" * width)
+        self._emit(prefix, "\n".join(lines))
+
+    def _container(self, prefix: str, block: Dict, data: Dict):
+        """Colonnes, blocs synchronisés : seul le contenu est rendu, à la suite"""
+        self._children(block, prefix)
+
+    def _child_page(self, prefix: str, block: Dict, data: Dict):
+        icon = "📄" if block["type"] == "child_page" else "🗃️"
+        title = escape_markdown(data.get("title") or "Sans titre")
+        self._emit(prefix, f"{icon} [{title}]({notion_url(block['id'])})")
+
+    def _link_to_page(self, prefix: str, block: Dict, data: Dict):
+        target = data.get(data.get("type") or "page_id")
+        if target:
+            self._emit(prefix, f"[→]({notion_url(target)})")
+
+    def _media(self, prefix: str, block: Dict, data: Dict):
+        url = data.get("url")  # bookmark, embed, link_preview
+        if not url and data.get("type"):
+            url = (data.get(data["type"]) or {}).get("url")  # Fichiers : external / file
+        if not url:
+            return
+        caption = rich_text(data.get("caption") or []) or data.get("name") or ""
+        if block["type"] == "image":
+            self._emit(prefix, f"![{caption}]({url})")
+        else:
+            self._emit(prefix, f"[{caption or url}]({url})")
+
+
+# Méthodes résolues une fois pour toutes (pas de getattr par bloc)
+DISPATCH = {block_type: getattr(MarkdownRenderer, name) for block_type, name in MarkdownRenderer.HANDLERS.items()}
+
+
+def render_markdown(blocks: List[Dict]) -> str:
+    """Arbre de blocs Notion → Markdown"""
+    return MarkdownRenderer().render(blocks)
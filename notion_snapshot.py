@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Snapshot local du workspace Notion (export puis import)
+Découple les deux services : l'export ne parle qu'à Notion, l'import qu'à SiYuan
+
+Étape 1 - export : databases, entrées et arbres de blocs écrits en shards
+JSONL compressés (gzip), une database après l'autre, au débit max de Notion
+(blocs récupérés en parallèle, EXPORT_WORKERS). Une database terminée est
+inscrite au manifest, avec ses entrées en échec (arbre de blocs illisible) :
+relancer l'export reprend aux databases manquantes et à ces entrées.
+
+Étape 2 - import : DataImporter lit le snapshot (NOTION_SNAPSHOT ou
+--snapshot), aucun appel Notion, au débit max de SiYuan. Reprise avec --resume
+comme un import normal.
+
+Layout du répertoire :
+    manifest.json                  databases terminées, shards, compteurs
+    migration_plan.json            copie du plan de l'extraction
+    databases/<id>.json            objet database
+    shards/<id>-00000.jsonl.gz     une entrée par ligne : {"entry": {...}, "blocks": [...]}
+    pages.pack, pages.idx          accès par id de page ou de bloc (mmap, voir snapshot_index.py)
+
+Usage :
+    python3 notion_snapshot.py export                      # → migration_output/snapshot
+    python3 notion_snapshot.py export --output /data/snap --force
+    python3 notion_snapshot.py import migration_output/snapshot --resume
+    python3 notion_snapshot.py info migration_output/snapshot
+    python3 notion_snapshot.py index migration_output/snapshot   # reconstruit pages.pack / pages.idx
+    python3 notion_snapshot.py render migration_output/snapshot  # Markdown de chaque page (tous les cœurs)
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from notion_renderer import render_markdown
+from render_pool import RenderPool
+from snapshot_index import PackReader, build_pack
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    NOTION_SNAPSHOT = os.getenv("NOTION_SNAPSHOT")  # Répertoire : l'import lit Notion depuis le snapshot
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "migration_output/snapshot")
+    SNAPSHOT_SHARD_ENTRIES = int(os.getenv("SNAPSHOT_SHARD_ENTRIES", "1000"))  # Entrées par shard
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "4"))  # Arbres de blocs récupérés en parallèle
+    OUTPUT_DIR = "migration_output"
+
+    # Arbres de blocs gardés après le passage de leur entrée (lookup sans relire le shard)
+    RECENT_BLOCKS = 4096
+
+MANIFEST_VERSION = 1
+
+# =============================================================================
+# ÉCRITURE
+# =============================================================================
+
+class ShardWriter:
+    """Écrit les entrées d'une database en shards gzip de SNAPSHOT_SHARD_ENTRIES lignes"""
+
+    def __init__(self, directory: str, db_id: str, shard_entries: int = None, first_shard: int = 0):
+        self.directory = directory
+        self.db_id = db_id
+        self.shard_entries = shard_entries or Config.SNAPSHOT_SHARD_ENTRIES
+        self.first_shard = first_shard  # Numéro du premier shard (reprise : à la suite des existants)
+        self.shards: List[str] = []
+        self.entries = 0
+        self._file = None
+        self._line = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, "shards", name)
+
+    def _open_shard(self):
+        name = f"{self.db_id}-{self.first_shard + len(self.shards):05d}.jsonl.gz"
+        self.shards.append(name)
+        # compresslevel 6 : ~2x plus rapide que 9 pour quelques % de taille en plus
+        self._file = gzip.open(self._path(name + ".tmp"), "wt", encoding="utf-8", compresslevel=6)
+        self._line = 0
+
+    def _close_shard(self):
+        if self._file is None:
+            return
+        self._file.close()
+        name = self.shards[-1]
+        os.replace(self._path(name + ".tmp"), self._path(name))
+        self._file = None
+
+    def write(self, entry: Dict, blocks: List[Dict]):
+        if self._file is None or self._line >= self.shard_entries:
+            self._close_shard()
+            self._open_shard()
+        self._file.write(json.dumps({"entry": entry, "blocks": blocks}, ensure_ascii=False,
+                                    separators=(",", ":")) + "\n")
+        self._line += 1
+        self.entries += 1
+
+    def close(self):
+        self._close_shard()
+
+    def abort(self):
+        """Database incomplète : shards et index partiels supprimés"""
+        if self._file is not None:
+            self._file.close()
+        for name in self.shards:
+            for path in (self._path(name), self._path(name + ".tmp")):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def _write_json(path: str, data):
+    """Écriture atomique (un crash ne laisse jamais un manifest tronqué)"""
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def load_manifest(directory: str) -> Dict:
+    path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "databases": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SnapshotExporter:
+    """Export Notion → snapshot, une database à la fois, blocs en parallèle"""
+
+    def __init__(self, directory: str, force: bool = False):
+        from import_data_to_siyuan import NotionClient, Config as ImportConfig
+
+        self.directory = directory
+        self.force = force
+        self.notion_client = NotionClient(ImportConfig.NOTION_TOKEN)
+        self.notion_client.snapshot = None  # L'export lit toujours Notion (ou le cache / les fixtures)
+        self.workers = max(1, Config.EXPORT_WORKERS)
+        self.manifest = load_manifest(directory)
+        self.stats = {"databases": 0, "skipped": 0, "entries": 0, "errors": []}
+
+    def run(self, plan_file: str):
+        print("\n" + "="*80)
+        print("📤 EXPORT NOTION → SNAPSHOT")
+        print("="*80 + "\n")
+
+        if not os.path.exists(plan_file):
+            print(f"❌ Fichier {plan_file} introuvable")
+            print("   Lance d'abord: python3 extract_by_workspace.py")
+            return
+        with open(plan_file, encoding="utf-8") as f:
+            plan = json.load(f)
+
+        for sub in ("databases", "shards"):
+            os.makedirs(os.path.join(self.directory, sub), exist_ok=True)
+        _write_json(os.path.join(self.directory, "migration_plan.json"), plan)
+
+        databases = plan["databases"]
+        print(f"📊 {len(databases)} databases → {self.directory} ({self.workers} workers)\n")
+
+        start = time.time()
+        try:
+            for idx, db_info in enumerate(databases, 1):
+                self._export_database(idx, len(databases), db_info)
+        except KeyboardInterrupt:
+            print("\n⚠️  Interrompu - relancer l'export pour reprendre aux databases manquantes")
+        finally:
+            build_snapshot_index(self.directory)
+
+        print("\n" + "="*80)
+        print("📊 RAPPORT D'EXPORT")
+        print("="*80)
+        print(f"✅ Databases exportées: {self.stats['databases']} ({self.stats['skipped']} déjà présentes)")
+        print(f"✅ Entrées: {self.stats['entries']} en {time.time() - start:.1f}s")
+        for error in self.stats["errors"][:10]:
+            print(f"   ❌ {error}")
+        print(f"\n💾 Snapshot: {self.directory}")
+
+    def _export_database(self, idx: int, total: int, db_info: Dict):
+        from import_data_to_siyuan import NotionFetchError
+
+        db_id = db_info["id"]
+        done = self.manifest["databases"].get(db_id)
+        retry = None  # Reprise : seulement les entrées en échec au run précédent
+        if done and done.get("complete") and not self.force:
+            if not done.get("failed"):
+                print(f"⏭️  {idx}/{total} {db_info['title']}: déjà exportée ({done['entries']} entrées)")
+                self.stats["skipped"] += 1
+                return
+            retry = set(done["failed"])
+            print(f"🔁 {idx}/{total} {db_info['title']}: {len(retry)} entrées en échec au run précédent...")
+        else:
+            done = None
+            print(f"📥 {idx}/{total} {db_info['title']}...")
+            database = self.notion_client.get_database(db_id)
+            _write_json(os.path.join(self.directory, "databases", f"{db_id}.json"), database)
+
+        # Une reprise ajoute ses shards après ceux déjà écrits
+        writer = ShardWriter(self.directory, db_id, first_shard=len(done["shards"]) if done else 0)
+        status = {"complete": False}
+        failed = []
+
+        def write(entry: Dict, future):
+            try:
+                writer.write(entry, future.result())
+            except (NotionFetchError, OSError) as e:
+                # Entrée notée en échec, la database continue (reprise au prochain run)
+                failed.append(entry["id"])
+                print(f"   ❌ {entry['id'][:8]}: {e}")
+
+        try:
+            entries = self.notion_client.iter_database(db_id, status=status)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export") as executor:
+                # Fenêtre bornée, écriture dans l'ordre de la query
+                window = deque()
+                for entry in entries:
+                    if retry is not None and entry["id"] not in retry:
+                        continue
+                    window.append((entry, executor.submit(
+                        self.notion_client.get_block_tree, entry["id"],
+                        last_edited_time=entry.get("last_edited_time")
+                    )))
+                    if len(window) >= self.workers * 4:
+                        write(*window.popleft())
+                for entry, future in window:
+                    write(entry, future)
+        except BaseException:
+            writer.abort()
+            raise
+
+        if not status["complete"]:
+            writer.abort()
+            if done is None:
+                self._mark_incomplete(db_id)
+            self.stats["errors"].append(f"{db_info['title']}: query incomplète, database non exportée")
+            print("   ❌ Query incomplète : la database sera ré-exportée au prochain run")
+            return
+
+        writer.close()
+        self.manifest["databases"][db_id] = {
+            "title": db_info["title"],
+            "entries": writer.entries + (done["entries"] if done else 0),
+            "shards": (done["shards"] if done else []) + writer.shards,
+            "complete": True,
+            "failed": failed,
+            "exported": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        self.manifest["version"] = MANIFEST_VERSION
+        _write_json(os.path.join(self.directory, "manifest.json"), self.manifest)
+        self.stats["databases"] += 1
+        self.stats["entries"] += writer.entries
+        if failed:
+            self.stats["errors"].append(f"{db_info['title']}: {len(failed)} entrées en échec (relancer l'export)")
+            print(f"   ⚠️  {writer.entries} entrées, {len(failed)} en échec : reprises au prochain export")
+        else:
+            print(f"   ✅ {writer.entries} entrées, {len(writer.shards)} shard(s)")
+
+    def _mark_incomplete(self, db_id: str):
+        """Une ré-exportation (--force) a pu écraser les shards d'un export précédent"""
+        if self.manifest["databases"].pop(db_id, None) is not None:
+            _write_json(os.path.join(self.directory, "manifest.json"), self.manifest)
+
+
+def build_snapshot_index(directory: str) -> Dict[str, int]:
+    """pages.pack / pages.idx depuis les shards des databases terminées"""
+    reader = SnapshotReader(directory)
+    reader.close()  # L'ancien index ne doit pas rester mappé pendant le remplacement
+    counts = build_pack(directory, reader.iter_records())
+    print(f"🗂️  Index: {counts['pages']} pages, {counts['blocks']} blocs adressables par id")
+    return counts
+
+# =============================================================================
+# LECTURE
+# =============================================================================
+
+class SnapshotReader:
+    """Lecture d'un snapshot : entrées en streaming, arbre de blocs par id"""
+
+    def __init__(self, directory: str):
+        if not os.path.exists(os.path.join(directory, "manifest.json")):
+            raise FileNotFoundError(f"Snapshot introuvable (pas de manifest.json): {directory}")
+        self.directory = directory
+        self.manifest = load_manifest(directory)
+        self._pack: Optional[PackReader] = None
+        # Arbres des entrées récemment lues : get_block_tree suit de près iter_entries
+        self._recent: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def plan_file(self) -> str:
+        return os.path.join(self.directory, "migration_plan.json")
+
+    def database(self, db_id: str) -> Dict:
+        path = os.path.join(self.directory, "databases", f"{db_id}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def iter_shard(self, name: str) -> Iterator[Dict]:
+        """Records {"entry", "blocks"} d'un shard (les shards sont indépendants)"""
+        with gzip.open(os.path.join(self.directory, "shards", name), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def iter_entries(self, db_id: str, limit: int = 0, edited_since: Optional[str] = None) -> Iterator[Dict]:
+        """Entrées d'une database dans l'ordre de l'export (mêmes filtres que iter_database)"""
+        info = self.manifest["databases"].get(db_id)
+        if not info or not info.get("complete"):
+            print(f"⚠️  Database {db_id} absente du snapshot")
+            return
+        if info.get("failed"):
+            print(f"⚠️  {len(info['failed'])} entrées de {info['title']} en échec à l'export, absentes du snapshot")
+
+        count = 0
+        for name in info["shards"]:
+            for record in self.iter_shard(name):
+                entry = record["entry"]
+                if edited_since and entry.get("last_edited_time", "") < edited_since:
+                    continue
+                self._remember(entry["id"], record["blocks"])
+                yield entry
+                count += 1
+                if limit > 0 and count >= limit:
+                    return
+
+    def _remember(self, page_id: str, blocks: List[Dict]):
+        with self._lock:
+            self._recent[page_id] = blocks
+            if len(self._recent) > Config.RECENT_BLOCKS:
+                self._recent.popitem(last=False)
+
+    @property
+    def pack(self) -> Optional[PackReader]:
+        """Index mmappé (pages.idx), ouvert à la première lecture par id"""
+        with self._lock:
+            if self._pack is None and PackReader.exists(self.directory):
+                self._pack = PackReader(self.directory)
+            return self._pack
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Tous les records des databases terminées, shard par shard"""
+        for info in self.manifest["databases"].values():
+            if info.get("complete"):
+                for name in info["shards"]:
+                    yield from self.iter_shard(name)
+
+    def record(self, notion_id: str) -> Optional[Dict]:
+        """Record d'une page (ou de la page d'un bloc) par id, sans lire les shards"""
+        pack = self.pack
+        return pack.record(notion_id) if pack else None
+
+    def subtree(self, block_id: str) -> Optional[Dict]:
+        """Un bloc et ses descendants, par id"""
+        pack = self.pack
+        return pack.subtree(block_id) if pack else None
+
+    def forget(self, page_id: str):
+        """Libère l'arbre gardé pour une page lue ailleurs (pool de rendu)"""
+        with self._lock:
+            self._recent.pop(page_id, None)
+
+    def blocks(self, page_id: str) -> List[Dict]:
+        """Arbre des blocs d'une page (le plus souvent sans relire le shard)"""
+        with self._lock:
+            blocks = self._recent.pop(page_id, None)
+        if blocks is not None:
+            return blocks
+        record = self.record(page_id)
+        return record["blocks"] if record else []
+
+    def close(self):
+        with self._lock:
+            if self._pack is not None:
+                self._pack.close()
+                self._pack = None
+
+    def info(self) -> Dict:
+        databases = self.manifest["databases"]
+        size = 0
+        for root, _, files in os.walk(self.directory):
+            size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return {
+            "databases": sum(1 for info in databases.values() if info.get("complete")),
+            "entries": sum(info["entries"] for info in databases.values() if info.get("complete")),
+            "shards": sum(len(info["shards"]) for info in databases.values()),
+            "size_mb": round(size / 1024 / 1024, 1)
+        }
+
+
+def render_snapshot(directory: str, output: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Re-rendu de toutes les pages en Markdown (<output>/<page_id>.md) : les
+    processus lisent les arbres dans le pack, le parent écrit dans l'ordre
+    """
+    reader = SnapshotReader(directory)
+    pack = reader.pack
+    if pack is None:
+        print(f"❌ Pas d'index dans {directory} : lancer d'abord `notion_snapshot.py index`")
+        return {}
+
+    os.makedirs(output, exist_ok=True)
+    pool = RenderPool(render_markdown, workers, snapshot_dir=directory)
+    counts = {"pages": 0, "errors": 0}
+    start = time.perf_counter()
+    try:
+        for page_id, markdown, error in pool.map(pack.page_ids()):
+            if error:
+                counts["errors"] += 1
+                print(f"⚠️  {page_id}: {error}")
+                continue
+            with open(os.path.join(output, f"{page_id}.md"), "w", encoding="utf-8") as f:
+                f.write(markdown)
+            counts["pages"] += 1
+    finally:
+        pool.close()
+        reader.close()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"📝 {counts['pages']} pages rendues en {elapsed:.1f}s ({counts['pages'] / elapsed:.0f} pages/s, "
+          f"{pool.workers} processus, {pool.chunks} lots) → {output}")
+    return counts
+
+# =============================================================================
+# INSTANCE PARTAGÉE
+# =============================================================================
+
+_snapshot: Optional[SnapshotReader] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> Optional[SnapshotReader]:
+    """Snapshot partagé du process (None sans NOTION_SNAPSHOT)"""
+    global _snapshot
+
+    if not Config.NOTION_SNAPSHOT:
+        return None
+
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = SnapshotReader(Config.NOTION_SNAPSHOT)
+            print(f"📦 Snapshot : Notion lu depuis {Config.NOTION_SNAPSHOT}, aucun appel réseau")
+        return _snapshot
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot local du workspace Notion (export / import)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Notion → snapshot (lit migration_plan.json)")
+    export.add_argument("--output", default=Config.SNAPSHOT_DIR, help=f"Répertoire (défaut: {Config.SNAPSHOT_DIR})")
+    export.add_argument("--plan", default=os.path.join(Config.OUTPUT_DIR, "migration_plan.json"))
+    export.add_argument("--force", action="store_true", help="Ré-exporte aussi les databases déjà présentes")
+
+    load = commands.add_parser("import", help="Snapshot → SiYuan (arguments suivants passés à l'import)")
+    load.add_argument("directory")
+
+    show = commands.add_parser("info", help="Contenu d'un snapshot")
+    show.add_argument("directory")
+
+    index = commands.add_parser("index", help="Reconstruit l'index par id (pages.pack / pages.idx)")
+    index.add_argument("directory")
+
+    render = commands.add_parser("render", help="Markdown de chaque page, rendu sur un pool de processus")
+    render.add_argument("directory")
+    render.add_argument("--output", default=os.path.join(Config.OUTPUT_DIR, "markdown"))
+    render.add_argument("--workers", type=int, default=None, help="Processus de rendu (défaut: RENDER_WORKERS)")
+
+    args, rest = parser.parse_known_args()
+
+    if args.command == "export":
+        from import_data_to_siyuan import Config as ImportConfig
+        if not ImportConfig.NOTION_TOKEN and not ImportConfig.NOTION_FIXTURES:
+            print("❌ NOTION_TOKEN non défini")
+            return
+        SnapshotExporter(args.output, force=args.force).run(args.plan)
+
+    elif args.command == "import":
+        import import_data_to_siyuan
+        sys.argv = [sys.argv[0], "--snapshot", args.directory] + rest
+        import_data_to_siyuan.main()
+
+    elif args.command == "index":
+        build_snapshot_index(args.directory)
+
+    elif args.command == "render":
+        render_snapshot(args.directory, args.output, args.workers)
+
+    elif args.command == "info":
+        reader = SnapshotReader(args.directory)
+        print(json.dumps(reader.info(), indent=2))
+        for db_id, info in reader.manifest["databases"].items():
+            state = "✅" if info.get("complete") and not info.get("failed") else "⏳"
+            failed = f", {len(info['failed'])} en échec" if info.get("failed") else ""
+            print(f"   {state} {info['title']}: {info['entries']} entrées{failed}, {len(info['shards'])} shard(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,16 @@ avec détection améliorée des types
 
 import requests
 import os
+import sys
 import json
-import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+# Modules partagés à la racine du repo (rate_limiter, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rate_limiter import notion_limiter
+from ancestry_index import AncestryIndex
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -48,13 +53,15 @@ class NotionClient:
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json"
         }
+        self.rate_limiter = notion_limiter()
+        self._ancestry = None  # Index d'ascendance, construit au premier filtrage
     
     def get_page(self, page_id: str) -> Dict:
         """Récupère une page"""
-        response = requests.get(
+        response = self.rate_limiter.call(lambda: requests.get(
             f"{self.base_url}/pages/{page_id}",
             headers=self.headers
-        )
+        ))
         return response.json() if response.status_code == 200 else {}
     
     def search_databases(self, parent_page_id: Optional[str] = None) -> List[Dict]:
@@ -76,11 +83,11 @@ class NotionClient:
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: requests.post(
                 f"{self.base_url}/search",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             
             if response.status_code != 200:
                 print(f"❌ Erreur Notion API: {response.status_code}")
@@ -97,28 +104,65 @@ class NotionClient:
             
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
         
         print(f"✅ {len(databases)} databases trouvées")
         return databases
     
     def _is_child_of(self, item: Dict, parent_id: str) -> bool:
-        """Vérifie si un item est enfant d'une page"""
-        parent = item.get("parent", {})
+        """Vérifie si un item est enfant (direct ou non) d'une page"""
+        index = self._get_ancestry()
+        index.add(item)
+        return index.is_descendant(item["id"], parent_id)
+    
+    def _get_ancestry(self) -> AncestryIndex:
+        """Index parent-pointer construit une fois depuis /search (toutes les pages)"""
+        if self._ancestry is not None:
+            return self._ancestry
         
-        # Direct parent
-        if parent.get("type") == "page_id" and parent.get("page_id") == parent_id:
-            return True
+        pages = []
+        has_more = True
+        start_cursor = None
         
-        # Récursif : vérifier le parent du parent
-        if parent.get("type") == "page_id":
-            parent_page_id = parent.get("page_id")
-            parent_page = self.get_page(parent_page_id)
-            if parent_page:
-                return self._is_child_of(parent_page, parent_id)
+        while has_more:
+            payload = {
+                "filter": {"property": "object", "value": "page"},
+                "page_size": 100
+            }
+            if start_cursor:
+                payload["start_cursor"] = start_cursor
+            
+            response = self.rate_limiter.call(lambda: requests.post(
+                f"{self.base_url}/search",
+                headers=self.headers,
+                json=payload
+            ))
+            
+            if response.status_code != 200:
+                break
+            
+            data = response.json()
+            pages.extend(data.get("results", []))
+            has_more = data.get("has_more", False)
+            start_cursor = data.get("next_cursor")
+        
+        # Ancêtres absents de /search : un appel par id, au plus
+        self._ancestry = AncestryIndex.from_search(pages, resolver=self._get_object)
+        return self._ancestry
+    
+    def _get_object(self, parent_type: str, object_id: str) -> Optional[Dict]:
+        """Récupère une page, une database ou un bloc (ancêtre hors /search)"""
+        if parent_type == "page_id":
+            return self.get_page(object_id) or None
+        
+        endpoint = {"database_id": "databases", "block_id": "blocks"}.get(parent_type)
+        if not endpoint:
+            return None
         
-        return False
+        response = self.rate_limiter.call(lambda: requests.get(
+            f"{self.base_url}/{endpoint}/{object_id}",
+            headers=self.headers
+        ))
+        return response.json() if response.status_code == 200 else None
 
 
 class TypeDetector:
@@ -6,11 +6,15 @@ Gère correctement les Attribute Views (databases)
 
 import requests
 import os
+import sys
 import json
-import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+# Modules partagés à la racine du repo (rate_limiter, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rate_limiter import notion_limiter
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -47,6 +51,7 @@ class NotionClient:
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json"
         }
+        self.rate_limiter = notion_limiter()
     
     def search_databases(self) -> List[Dict]:
         """Récupère toutes les databases Notion"""
@@ -64,11 +69,11 @@ class NotionClient:
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: requests.post(
                 f"{self.base_url}/search",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             
             if response.status_code != 200:
                 print(f"❌ Erreur Notion API: {response.status_code}")
@@ -80,8 +85,6 @@ class NotionClient:
             
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
         
         print(f"✅ {len(databases)} databases trouvées")
         return databases
@@ -97,11 +100,11 @@ class NotionClient:
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: requests.post(
                 f"{self.base_url}/databases/{database_id}/query",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             
             if response.status_code != 200:
                 print(f"❌ Erreur query database {database_id}: {response.status_code}")
@@ -112,8 +115,6 @@ class NotionClient:
             
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
         
         return entries
 
@@ -13,15 +13,21 @@ Author: Myrko (via Claude/JARVIS)
 """
 
 import os
+import sys
 import json
 import requests
-import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import yaml
 
+# Modules partagés à la racine du repo (rate_limiter, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rate_limiter import notion_limiter
+from notion_renderer import render_markdown
+from render_pool import RenderPool
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -85,86 +91,10 @@ class NotionPage:
         # Titre du document
         md_content.append(f"# {self.title}\n")
         
-        # Contenu des blocs
-        for block in self.content_blocks:
-            md_content.append(self._block_to_markdown(block))
+        # Contenu des blocs (notion_renderer.py : listes numérotées, annotations...)
+        md_content.append(render_markdown(self.content_blocks))
         
         return "\n".join(md_content)
-    
-    def _block_to_markdown(self, block: Dict) -> str:
-        """Convertit un bloc Notion en Markdown"""
-        block_type = block.get("type")
-        
-        if block_type == "paragraph":
-            return self._rich_text_to_markdown(block.get("paragraph", {}).get("rich_text", [])) + "\n"
-        
-        elif block_type == "heading_1":
-            text = self._rich_text_to_markdown(block.get("heading_1", {}).get("rich_text", []))
-            return f"# {text}\n"
-        
-        elif block_type == "heading_2":
-            text = self._rich_text_to_markdown(block.get("heading_2", {}).get("rich_text", []))
-            return f"## {text}\n"
-        
-        elif block_type == "heading_3":
-            text = self._rich_text_to_markdown(block.get("heading_3", {}).get("rich_text", []))
-            return f"### {text}\n"
-        
-        elif block_type == "bulleted_list_item":
-            text = self._rich_text_to_markdown(block.get("bulleted_list_item", {}).get("rich_text", []))
-            return f"- {text}\n"
-        
-        elif block_type == "numbered_list_item":
-            text = self._rich_text_to_markdown(block.get("numbered_list_item", {}).get("rich_text", []))
-            return f"1. {text}\n"
-        
-        elif block_type == "code":
-            code_data = block.get("code", {})
-            language = code_data.get("language", "")
-            text = self._rich_text_to_markdown(code_data.get("rich_text", []))
-            return f"```{language}\n{text}\n```\n"
-        
-        elif block_type == "quote":
-            text = self._rich_text_to_markdown(block.get("quote", {}).get("rich_text", []))
-            return f"> {text}\n"
-        
-        elif block_type == "divider":
-            return "---\n"
-        
-        elif block_type == "callout":
-            callout = block.get("callout", {})
-            icon = callout.get("icon", {}).get("emoji", "💡")
-            text = self._rich_text_to_markdown(callout.get("rich_text", []))
-            return f"> {icon} **Callout:** {text}\n"
-        
-        else:
-            # Type non supporté, on le note
-            return f"<!-- Notion block type '{block_type}' not converted -->\n"
-    
-    def _rich_text_to_markdown(self, rich_text: List[Dict]) -> str:
-        """Convertit le rich text Notion en Markdown"""
-        result = []
-        for text_obj in rich_text:
-            content = text_obj.get("plain_text", "")
-            annotations = text_obj.get("annotations", {})
-            
-            # Appliquer le formatage
-            if annotations.get("bold"):
-                content = f"**{content}**"
-            if annotations.get("italic"):
-                content = f"*{content}*"
-            if annotations.get("strikethrough"):
-                content = f"~~{content}~~"
-            if annotations.get("code"):
-                content = f"`{content}`"
-            
-            # Liens
-            if text_obj.get("href"):
-                content = f"[{content}]({text_obj['href']})"
-            
-            result.append(content)
-        
-        return "".join(result)
 
 @dataclass
 class SiYuanDocument:
@@ -204,6 +134,7 @@ class NotionClient:
             "Notion-Version": Config.NOTION_VERSION,
             "Content-Type": "application/json"
         }
+        self.rate_limiter = notion_limiter()
     
     def search_all_pages(self) -> List[Dict]:
         """Récupère toutes les pages du workspace"""
@@ -216,29 +147,27 @@ class NotionClient:
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: requests.post(
                 f"{Config.NOTION_API_URL}/search",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             response.raise_for_status()
             data = response.json()
             
             all_pages.extend(data.get("results", []))
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
         
         print(f"✅ {len(all_pages)} pages trouvées dans Notion")
         return all_pages
     
     def get_page_details(self, page_id: str) -> Dict:
         """Récupère les détails d'une page"""
-        response = requests.get(
+        response = self.rate_limiter.call(lambda: requests.get(
             f"{Config.NOTION_API_URL}/pages/{page_id}",
             headers=self.headers
-        )
+        ))
         response.raise_for_status()
         return response.json()
     
@@ -254,24 +183,24 @@ class NotionClient:
             if start_cursor:
                 params["start_cursor"] = start_cursor
             
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self.rate_limiter.call(
+                lambda: requests.get(url, headers=self.headers, params=params)
+            )
             response.raise_for_status()
             data = response.json()
             
             all_blocks.extend(data.get("results", []))
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
         
         return all_blocks
     
     def get_database_details(self, database_id: str) -> Dict:
         """Récupère les détails d'une database"""
-        response = requests.get(
+        response = self.rate_limiter.call(lambda: requests.get(
             f"{Config.NOTION_API_URL}/databases/{database_id}",
             headers=self.headers
-        )
+        ))
         response.raise_for_status()
         return response.json()
     
@@ -286,19 +215,17 @@ class NotionClient:
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = requests.post(
+            response = self.rate_limiter.call(lambda: requests.post(
                 f"{Config.NOTION_API_URL}/databases/{database_id}/query",
                 headers=self.headers,
                 json=payload
-            )
+            ))
             response.raise_for_status()
             data = response.json()
             
             all_entries.extend(data.get("results", []))
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-            
-            time.sleep(Config.DELAY_BETWEEN_CALLS)
         
         return all_entries
 
@@ -485,12 +412,16 @@ class NotionToSiYuanMigrator:
         target_notebook = notebooks[0]["id"]
         print(f"  📓 Notebook cible: {notebooks[0]['name']} ({target_notebook})")
         
-        for idx, notion_page in enumerate(notion_pages, 1):
+        # Conversion en Markdown sur un pool de processus (CPU pur), résultats dans l'ordre
+        render_pool = RenderPool(NotionPage.to_markdown)
+        rendered = render_pool.map(notion_pages)
+        
+        for idx, (notion_page, markdown_content, error) in enumerate(rendered, 1):
             print(f"  [{idx}/{len(notion_pages)}] Conversion: {notion_page.title[:40]}...")
             
             try:
-                # Convertir en Markdown
-                markdown_content = notion_page.to_markdown()
+                if error:
+                    raise Exception(error)
                 
                 # Créer le chemin (sanitize le titre)
                 safe_title = self._sanitize_filename(notion_page.title)
@@ -511,7 +442,8 @@ class NotionToSiYuanMigrator:
                 print(f"    ⚠️  {error_msg}")
                 self.report.errors.append(error_msg)
         
-        print(f"\n✅ {len(siyuan_docs)} documents convertis")
+        render_pool.close()
+        print(f"\n✅ {len(siyuan_docs)} documents convertis ({render_pool.workers} processus)")
         return siyuan_docs
     
     def _import_to_siyuan(self, siyuan_docs: List[SiYuanDocument]):
@@ -14,11 +14,17 @@ Features:
 """
 
 import json
+import os
 import re
+import sys
 from pathlib import Path
 from typing import Dict, List, Set
 from dataclasses import dataclass
 
+# Modules partagés à la racine du repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from link_rewriter import load_mapping, rewrite_workspace
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -38,15 +44,6 @@ class DatabaseInfo:
     name: str
     properties: Dict
     entries_count: int
-    
-@dataclass
-class LinkConversion:
-    """Info sur une conversion de lien"""
-    file_path: str
-    line_number: int
-    old_link: str
-    new_link: str
-    converted: bool
 
 # =============================================================================
 # ANALYSEUR DE DATABASES
@@ -126,21 +123,19 @@ class DatabaseAnalyzer:
 # =============================================================================
 
 class LinkConverter:
-    """Convertit les liens Notion en liens SiYuan"""
+    """Convertit les liens Notion en liens SiYuan (via link_rewriter.py)"""
     
     def __init__(self, mapping_file: Path):
         self.mapping = self._load_mapping(mapping_file)
-        self.conversions: List[LinkConversion] = []
+        self.totals: Dict = {}
     
     def _load_mapping(self, mapping_file: Path) -> Dict[str, str]:
-        """Charge le mapping Notion ID → SiYuan ID"""
+        """Charge le mapping Notion ID → SiYuan ID (IDs normalisés)"""
         if not mapping_file.exists():
             print(f"⚠️  Fichier mapping introuvable: {mapping_file}")
             return {}
         
-        with open(mapping_file) as f:
-            mapping = json.load(f)
-        
+        mapping = load_mapping(str(mapping_file))
         print(f"📋 {len(mapping)} mappings chargés")
         return mapping
     
@@ -152,101 +147,37 @@ class LinkConverter:
             print(f"⚠️  Workspace introuvable: {workspace_dir}")
             return
         
-        # Trouver tous les fichiers .sy
-        sy_files = list(workspace_dir.glob("**/*.sy"))
-        print(f"📁 {len(sy_files)} fichiers .sy trouvés")
-        
-        for sy_file in sy_files:
-            self._convert_links_in_file(sy_file)
-        
-        print(f"✅ {len([c for c in self.conversions if c.converted])} liens convertis")
-    
-    def _convert_links_in_file(self, file_path: Path):
-        """Convertit les liens dans un fichier"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Pattern pour trouver les liens Notion
-            # Ex: [text](notion-id) ou [text](https://notion.so/page-id)
-            pattern = r'\[([^\]]+)\]\(([a-f0-9]{32}|https://www\.notion\.so/[a-f0-9-]+)\)'
-            
-            def replace_link(match):
-                text = match.group(1)
-                notion_id = match.group(2)
-                
-                # Nettoyer l'ID si c'est une URL
-                if "notion.so" in notion_id:
-                    notion_id = notion_id.split('/')[-1].replace('-', '')
-                
-                # Chercher dans le mapping
-                siyuan_id = self.mapping.get(notion_id)
-                
-                if siyuan_id:
-                    # Convertir en référence de bloc SiYuan
-                    new_link = f"(({siyuan_id} '{text}'))"
-                    self.conversions.append(LinkConversion(
-                        file_path=str(file_path),
-                        line_number=0,  # TODO: calculer le numéro de ligne
-                        old_link=match.group(0),
-                        new_link=new_link,
-                        converted=True
-                    ))
-                    return new_link
-                else:
-                    # Garder l'ancien lien avec un warning
-                    self.conversions.append(LinkConversion(
-                        file_path=str(file_path),
-                        line_number=0,
-                        old_link=match.group(0),
-                        new_link=match.group(0),
-                        converted=False
-                    ))
-                    return f"<!-- TODO: Link not converted --> {match.group(0)}"
-            
-            # Appliquer les conversions
-            new_content = re.sub(pattern, replace_link, content)
-            
-            # Sauvegarder si modifié
-            if new_content != content:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-        
-        except Exception as e:
-            print(f"  ⚠️  Erreur sur {file_path.name}: {str(e)}")
+        # Fichiers .sy parcourus ligne à ligne sur un pool de processus,
+        # réécrits (remplacement atomique) seulement s'ils changent
+        self.totals = rewrite_workspace(str(workspace_dir), self.mapping, extensions=(".sy",))
+        print(f"📁 {self.totals['files']} fichiers .sy parcourus, {self.totals['changed']} modifiés")
+        print(f"✅ {self.totals['converted']} liens convertis")
     
     def generate_report(self, output_file: Path):
         """Génère un rapport des conversions"""
         print(f"\n📝 Génération du rapport: {output_file}")
         
-        converted = [c for c in self.conversions if c.converted]
-        not_converted = [c for c in self.conversions if not c.converted]
+        totals = self.totals
+        if not totals:
+            print("⚠️  Aucune conversion effectuée")
+            return
         
         with open(output_file, 'w') as f:
             f.write("# Rapport de conversion des liens\n\n")
-            f.write(f"**Total:** {len(self.conversions)} liens analysés\n")
-            f.write(f"**Convertis:** {len(converted)} ✅\n")
-            f.write(f"**Non convertis:** {len(not_converted)} ❌\n\n")
-            
-            if not_converted:
-                f.write("## Liens non convertis (action manuelle requise)\n\n")
-                for conv in not_converted:
-                    f.write(f"- `{conv.file_path}`\n")
-                    f.write(f"  - Lien: `{conv.old_link}`\n")
-                    f.write(f"  - Raison: Notion ID introuvable dans le mapping\n\n")
+            f.write(f"**Total:** {totals['links']} liens analysés dans {totals['files']} fichiers\n")
+            f.write(f"**Convertis:** {totals['converted']} ✅\n")
+            f.write(f"**Non convertis:** {totals['unresolved_links']} ❌\n")
+            f.write(f"**Fichiers modifiés:** {totals['changed']}\n\n")
             
-            f.write("\n## Statistiques par fichier\n\n")
-            files_stats = {}
-            for conv in self.conversions:
-                if conv.file_path not in files_stats:
-                    files_stats[conv.file_path] = {"total": 0, "converted": 0}
-                files_stats[conv.file_path]["total"] += 1
-                if conv.converted:
-                    files_stats[conv.file_path]["converted"] += 1
+            if totals["unresolved"]:
+                f.write("## Pages Notion introuvables dans le mapping (action manuelle requise)\n\n")
+                for notion_id, count in totals["unresolved"].most_common(100):
+                    f.write(f"- `{notion_id}` : {count} lien(s)\n")
             
-            for file_path, stats in files_stats.items():
-                ratio = stats["converted"] / stats["total"] * 100
-                f.write(f"- `{Path(file_path).name}`: {stats['converted']}/{stats['total']} ({ratio:.0f}%)\n")
+            if totals["errors"]:
+                f.write("\n## Erreurs\n\n")
+                for error in totals["errors"]:
+                    f.write(f"- {error}\n")
         
         print(f"✅ Rapport sauvegardé")
 
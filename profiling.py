@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Mode --profile des scripts (extraction, import)
+Où part le CPU : conversion des propriétés, décodage JSON, Markdown, HTTP...
+
+Modes (--profile MODE) :
+- wall   : cProfile, temps réel (attentes I/O comprises), un profiler par
+           thread fusionné à la fin (workers, pool de blocs, flush des attributes)
+- cpu    : cProfile avec l'horloge CPU du thread : les attentes I/O (réseau,
+           rate limiter, locks) disparaissent, il ne reste que le calcul
+- sample : échantillonneur de piles (~200 Hz, tous threads) à faible
+           overhead, sortie "folded" compatible flamegraph.pl / speedscope
+
+--profile-memory ajoute tracemalloc : pic mémoire, top des allocations et
+snapshot binaire (comparable entre deux runs avec tracemalloc.Snapshot.load).
+
+Fichiers écrits dans OUTPUT_DIR : profile_<script>_<horodatage>.{prof,txt,folded,tracemalloc}
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25"))                        # Fonctions affichées
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # secondes
+    TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+
+PROFILE_MODES = ("wall", "cpu", "sample")
+
+# Familles de fonctions pour la répartition du temps : (nom, motifs sur
+# "fichier:fonction"), la première qui correspond l'emporte
+CATEGORIES = [
+    ("conversion propriétés", ("PropertyConverter", "ConversionPlan", "_convert_", "convert_property_value",
+                               "convert", "compile_plan")),
+    ("markdown", ("notion_renderer", "render_markdown", "_document_markdown")),
+    ("json", ("json/", "json\\", "_json", "(loads)", "(dumps)", "(json)", "raw_decode", "iterencode")),
+    ("cache sqlite", ("notion_cache", "sqlite3", "zlib")),
+    ("disque (fixtures, journal)", ("notion_fixtures", "checkpoint_journal", "genericpath", "posix.stat",
+                                    "io.open", "fsync", "_io.")),
+    ("os.environ (proxies http)", ("getproxies", "proxy_bypass", "<frozen os>")),
+    ("réseau / http", ("socket", "ssl", "http/client", "client.py", "connection", "urllib3", "requests/",
+                       "httpx", "httpcore", "select")),
+    ("attente (sleep, locks)", ("sleep", "acquire", "wait", "_thread.lock", "SimpleQueue", "_worker")),
+]
+
+# =============================================================================
+# ARGUMENTS
+# =============================================================================
+
+def add_profile_arguments(parser):
+    """Ajoute --profile / --profile-memory / --profile-top à un ArgumentParser"""
+    parser.add_argument("--profile", nargs="?", const="wall", choices=PROFILE_MODES,
+                        help="Profile le run : wall (défaut), cpu (sans attentes I/O) ou sample")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="tracemalloc : pic mémoire et top des allocations")
+    parser.add_argument("--profile-top", type=int, default=Config.PROFILE_TOP,
+                        help=f"Nombre de fonctions dans le résumé (défaut: {Config.PROFILE_TOP})")
+
+# =============================================================================
+# PROFILER MULTI-THREAD (cProfile)
+# =============================================================================
+
+class ThreadedProfiler:
+    """cProfile sur le thread courant et sur chaque thread démarré pendant le run"""
+
+    def __init__(self, cpu_only: bool = False):
+        # Horloge CPU du thread : le temps bloqué (I/O, sleep, locks) n'est pas compté
+        self.timer = time.thread_time if cpu_only else time.perf_counter
+        self.main = cProfile.Profile(self.timer)
+        self.thread_profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _start_thread(self, frame, event, arg):
+        # Hook threading.setprofile : premier événement du nouveau thread
+        profiler = cProfile.Profile(self.timer)
+        with self._lock:
+            self.thread_profilers.append(profiler)
+        profiler.enable()  # Remplace ce hook pour le reste du thread
+
+    def start(self):
+        threading.setprofile(self._start_thread)
+        self.main.enable()
+
+    def stop(self) -> pstats.Stats:
+        self.main.disable()
+        threading.setprofile(None)
+
+        stats = pstats.Stats(self.main)
+        with self._lock:
+            profilers = list(self.thread_profilers)
+        for profiler in profilers:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                pass  # Thread sans aucun appel profilé
+        return stats
+
+# =============================================================================
+# ÉCHANTILLONNEUR DE PILES
+# =============================================================================
+
+class StackSampler:
+    """Relève les piles de tous les threads à intervalle fixe (sys._current_frames)"""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or Config.PROFILE_SAMPLE_INTERVAL
+        self.stacks: Counter = Counter()  # pile "a;b;c" → échantillons
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def top(self, limit: int) -> List[tuple]:
+        """(fonction, échantillons en propre, échantillons inclusifs), trié par temps propre"""
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            names = stack.split(";")
+            own[names[-1]] += count
+            for name in set(names):
+                inclusive[name] += count
+        return [(name, count, inclusive[name]) for name, count in own.most_common(limit)]
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+# =============================================================================
+# RÉSUMÉS
+# =============================================================================
+
+def categorize(label: str) -> str:
+    for name, patterns in CATEGORIES:
+        if any(pattern in label for pattern in patterns):
+            return name
+    return "autre"
+
+
+def category_breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    """Temps propre (tottime) cumulé par famille de fonctions"""
+    totals: Dict[str, float] = {}
+    for (filename, lineno, function), (_, _, tottime, _, _) in stats.stats.items():
+        label = f"{filename.replace(os.sep, '/')}:{lineno}({function})"
+        category = categorize(label)
+        totals[category] = totals.get(category, 0.0) + tottime
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def _format_breakdown(totals: Dict[str, float], unit: str) -> List[str]:
+    grand_total = sum(totals.values()) or 1.0
+    return [f"   {name:<28} {value:>10.2f} {unit}  {value / grand_total * 100:5.1f}%"
+            for name, value in totals.items()]
+
+# =============================================================================
+# CONTEXTE DE PROFILAGE
+# =============================================================================
+
+@contextmanager
+def profiled(script: str, args, output_dir: str):
+    """
+    Entoure un run : with profiled("import", args, Config.OUTPUT_DIR): importer.run()
+    Sans --profile ni --profile-memory, ne fait rien.
+    """
+    mode = getattr(args, "profile", None)
+    memory = getattr(args, "profile_memory", False)
+    if not mode and not memory:
+        yield
+        return
+
+    top = getattr(args, "profile_top", Config.PROFILE_TOP)
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"profile_{script}_{time.strftime('%Y%m%d-%H%M%S')}")
+
+    if memory:
+        tracemalloc.start(Config.TRACEMALLOC_FRAMES)
+
+    profiler = sampler = None
+    if mode in ("wall", "cpu"):
+        profiler = ThreadedProfiler(cpu_only=mode == "cpu")
+        profiler.start()
+    elif mode == "sample":
+        sampler = StackSampler()
+        sampler.start()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        snapshot = None
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+        report = io.StringIO()
+        report.write(f"Profil {script} ({mode or 'mémoire'}) - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        report.write(f"Durée réelle {wall:.2f}s, CPU process {cpu:.2f}s "
+                     f"(≈ {max(0.0, wall - cpu):.2f}s d'attente I/O / sleep si un seul cœur actif)\n\n")
+
+        written = []
+        if profiler:
+            stats = profiler.stop()
+            stats.dump_stats(base + ".prof")
+            written.append(base + ".prof")
+
+            unit = "s CPU" if mode == "cpu" else "s"
+            report.write("Répartition du temps propre par famille :\n")
+            report.write("\n".join(_format_breakdown(category_breakdown(stats), unit)) + "\n\n")
+
+            for sort_key, title in (("tottime", "temps propre"), ("cumulative", "temps cumulé")):
+                stats.stream = report
+                report.write(f"Top {top} - {title} :\n")
+                stats.sort_stats(sort_key).print_stats(top)
+
+        if sampler:
+            sampler.stop()
+            sampler.write_folded(base + ".folded")
+            written.append(base + ".folded")
+
+            totals: Dict[str, float] = {}
+            for stack, count in sampler.stacks.items():
+                category = categorize(stack.rsplit(";", 1)[-1])
+                totals[category] = totals.get(category, 0) + count
+            report.write(f"{sampler.samples} relevés toutes les {sampler.interval * 1000:.0f} ms, tous threads\n")
+            report.write("Répartition des échantillons par famille (fonction en tête de pile) :\n")
+            report.write("\n".join(_format_breakdown(dict(sorted(totals.items(), key=lambda i: -i[1])), "éch.")) + "\n\n")
+            report.write(f"Top {top} (échantillons en propre / inclusifs) :\n")
+            for name, own, inclusive in sampler.top(top):
+                report.write(f"   {own:>8} {inclusive:>8}  {name}\n")
+            report.write("\n")
+
+        if snapshot:
+            snapshot.dump(base + ".tracemalloc")
+            written.append(base + ".tracemalloc")
+
+            report.write(f"Mémoire (tracemalloc) : pic {peak / 1024 / 1024:.1f} Mo, "
+                         f"fin de run {current / 1024 / 1024:.1f} Mo\n")
+            report.write(f"Top {top} allocations encore vivantes :\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                report.write(f"   {stat}\n")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        written.insert(0, base + ".txt")
+
+        _print_summary(report.getvalue(), written)
+
+
+def _print_summary(report: str, written: List[str]):
+    """Affiche l'en-tête et la répartition, le détail reste dans le .txt"""
+    print("\n" + "="*80)
+    print("🔬 PROFIL")
+    print("="*80)
+    # En-tête, répartition par famille et pic mémoire (les tableaux détaillés restent dans le .txt)
+    detail = False
+    for line in report.splitlines():
+        if line.startswith("Top "):
+            detail = True
+        elif line.startswith("Mémoire"):
+            detail = False
+        if not detail:
+            print(line)
+    for path in written:
+        print(f"💾 {path}")
+    if any(path.endswith(".prof") for path in written):
+        print("   Explorer : python3 -m pstats <fichier.prof>  (ou snakeviz)")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Rate limiter partagé
+Token bucket adaptatif + gestion des 429 / Retry-After
+
+Utilisé par tous les NotionClient (et le SiYuanClient) à la place du
+time.sleep(DELAY_BETWEEN_CALLS) fixe :
+- Débit moyen ~3 req/s (limite documentée de l'API Notion) avec burst
+- Respect du header Retry-After sur 429
+- Backoff exponentiel avec jitter sur 429 / 5xx / erreurs réseau
+- Écritures non idempotentes (idempotent=False) : retry sur 429 et échec
+  de connexion seulement, la requête n'ayant alors jamais été traitée
+- Un seul bucket par service, partagé entre threads et clients
+- Variante asyncio (call_async) sur le même bucket, pour async_clients.py
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    NOTION_MAX_RPS = float(os.getenv("NOTION_MAX_RPS", "3"))
+    NOTION_BURST = int(os.getenv("NOTION_BURST", "10"))
+    SIYUAN_MAX_RPS = float(os.getenv("SIYUAN_MAX_RPS", "20"))
+    SIYUAN_BURST = int(os.getenv("SIYUAN_BURST", "20"))
+
+    # Retries sur 429 / 5xx / erreurs réseau
+    MAX_RETRIES = int(os.getenv("MAX_RETRIES", "6"))
+    BACKOFF_BASE = float(os.getenv("BACKOFF_BASE", "0.5"))  # secondes
+    BACKOFF_MAX = float(os.getenv("BACKOFF_MAX", "60"))     # secondes
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Seuls statuts sûrs à rejouer pour une écriture non idempotente : après un
+# 5xx ou un timeout de lecture, SiYuan a pu créer le document quand même
+NOT_PROCESSED_STATUS = {429}
+
+
+class ConnectError(ConnectionError):
+    """Connexion impossible : la requête n'a jamais été envoyée (http_session.py)"""
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+class TokenBucket:
+    """Token bucket thread-safe : `rate` jetons/s, capacité `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+
+    def try_acquire(self) -> float:
+        """Prend un jeton si possible : retourne 0, sinon le délai à attendre"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> float:
+        """Bloque jusqu'à obtenir un jeton ; retourne le temps attendu"""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self) -> float:
+        """Comme acquire(), sans bloquer la boucle asyncio"""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Suspend tous les appelants (Retry-After) et vide le bucket"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def slow_down(self):
+        """Réduit le débit de moitié après un 429 (AIMD)"""
+        with self._lock:
+            self.rate = max(self.max_rate / 4, self.rate / 2)
+
+    def speed_up(self):
+        """Remonte doucement vers le débit nominal après un succès"""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+# =============================================================================
+# RATE LIMITER ADAPTATIF
+# =============================================================================
+
+class AdaptiveRateLimiter:
+    """Token bucket + retries (Retry-After, backoff exponentiel avec jitter)"""
+
+    def __init__(self, name: str, rate: float, burst: int,
+                 max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = Config.MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Config.BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = Config.BACKOFF_MAX if backoff_max is None else backoff_max
+
+        # Temps passé à attendre (bucket + backoff) et nombre de retries
+        self.waited = 0.0
+        self.retries = 0
+        self._stats_lock = threading.Lock()
+
+    def acquire(self):
+        """Attend un jeton (pour les appels qui gèrent eux-mêmes les erreurs)"""
+        self._add_wait(self.bucket.acquire())
+
+    def _add_wait(self, seconds: float, retry: bool = False):
+        if not seconds and not retry:
+            return
+        with self._stats_lock:
+            self.waited += seconds
+            self.retries += retry
+
+    def stats(self) -> Dict:
+        return {
+            "rate": round(self.bucket.rate, 3),
+            "max_rate": self.bucket.max_rate,
+            "waited_seconds": round(self.waited, 3),
+            "retries": self.retries
+        }
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Backoff exponentiel avec full jitter"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Lit le header Retry-After (en secondes)"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    def call(self, send: Callable, idempotent: bool = True):
+        """
+        Exécute `send()` (qui retourne une réponse HTTP) sous rate limit.
+
+        Réessaie sur 429 / 5xx / erreur réseau. Après le dernier essai, la
+        dernière réponse est retournée (ou l'exception relancée) : c'est à
+        l'appelant de décider quoi faire d'un statut non-200.
+
+        Avec `idempotent=False` (création de document), seuls les 429 et
+        les échecs de connexion (ConnectError) sont réessayés : rejouer
+        après un 5xx ou un timeout de lecture créerait un doublon.
+        """
+        attempt = 0
+        while True:
+            self._add_wait(self.bucket.acquire())
+
+            try:
+                response = send()
+            except OSError as e:  # requests.RequestException hérite d'IOError
+                if attempt >= self.max_retries or not self._retryable_error(e, idempotent):
+                    raise
+                delay = self._network_error_delay(e, attempt)
+                time.sleep(delay)
+                self._add_wait(delay, retry=True)
+                attempt += 1
+                continue
+
+            delay = self._retry_delay(response, attempt, idempotent)
+            if delay is None:
+                return response
+
+            time.sleep(delay)
+            self._add_wait(delay, retry=True)
+            attempt += 1
+
+    async def call_async(self, send: Callable, idempotent: bool = True):
+        """
+        Variante asyncio de call() : `send()` retourne une coroutine.
+
+        Même bucket que les appels bloquants, mêmes règles de retry.
+        """
+        attempt = 0
+        while True:
+            self._add_wait(await self.bucket.acquire_async())
+
+            try:
+                response = await send()
+            except OSError as e:
+                if attempt >= self.max_retries or not self._retryable_error(e, idempotent):
+                    raise
+                delay = self._network_error_delay(e, attempt)
+                await asyncio.sleep(delay)
+                self._add_wait(delay, retry=True)
+                attempt += 1
+                continue
+
+            delay = self._retry_delay(response, attempt, idempotent)
+            if delay is None:
+                return response
+
+            await asyncio.sleep(delay)
+            self._add_wait(delay, retry=True)
+            attempt += 1
+
+    @staticmethod
+    def _retryable_error(error: Exception, idempotent: bool) -> bool:
+        return idempotent or isinstance(error, ConnectError)
+
+    def _network_error_delay(self, error: Exception, attempt: int) -> float:
+        delay = self.backoff_delay(attempt)
+        print(f"⚠️  {self.name}: erreur réseau ({error}), retry dans {delay:.1f}s")
+        return delay
+
+    def _retry_delay(self, response, attempt: int, idempotent: bool = True) -> Optional[float]:
+        """
+        Délai avant de réessayer, ou None si la réponse est définitive.
+
+        Sur 429, le bucket partagé est mis en pause : l'attente est alors
+        faite dans acquire() et le délai retourné est 0.
+        """
+        status = response.status_code
+        if status not in RETRYABLE_STATUS:
+            self.bucket.speed_up()
+            return None
+
+        if status not in (RETRYABLE_STATUS if idempotent else NOT_PROCESSED_STATUS):
+            print(f"❌ {self.name}: HTTP {status} sur une écriture non idempotente, pas de retry")
+            return None
+
+        if attempt >= self.max_retries:
+            print(f"❌ {self.name}: HTTP {status} après {attempt + 1} essais")
+            return None
+
+        retry_after = self._retry_after(response) if status == 429 else None
+        delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+
+        if status == 429:
+            # Tous les threads partagent le bucket : on les met tous en pause
+            self.bucket.slow_down()
+            self.bucket.pause(delay)
+            print(f"⏳ {self.name}: 429 rate limited, pause {delay:.1f}s")
+            return 0.0
+
+        print(f"⚠️  {self.name}: HTTP {status}, retry dans {delay:.1f}s")
+        return delay
+
+# =============================================================================
+# REGISTRE PARTAGÉ
+# =============================================================================
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_limiter(name: str, rate: float, burst: int) -> AdaptiveRateLimiter:
+    """Retourne le limiter partagé d'un service (créé au premier appel)"""
+    with _registry_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveRateLimiter(name, rate, burst)
+        return _limiters[name]
+
+
+def limiter_stats() -> Dict[str, Dict]:
+    """Statistiques de tous les limiters du process"""
+    with _registry_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def notion_limiter() -> AdaptiveRateLimiter:
+    """Limiter partagé par tous les clients Notion du process"""
+    return get_limiter("Notion", Config.NOTION_MAX_RPS, Config.NOTION_BURST)
+
+
+def siyuan_limiter() -> AdaptiveRateLimiter:
+    """Limiter partagé par tous les clients SiYuan du process"""
+    return get_limiter("SiYuan", Config.SIYUAN_MAX_RPS, Config.SIYUAN_BURST)
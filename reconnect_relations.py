@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Reconnexion des relations (PROJECT_PLAN.md Phase 4)
+ÉTAPE 3 : Après l'import
+
+L'import stocke chaque relation comme une liste d'IDs Notion séparés par des
+virgules dans l'attribute custom-<propriété>. Ce script les remplace par les
+IDs des blocs SiYuan correspondants :
+
+- Mapping Notion → SiYuan (import_mapping.json + journal) chargé une fois
+  dans un dict (ids normalisés, avec ou sans tirets)
+- Une seule passe sur la table attributes de SiYuan (/api/query/sql,
+  pagination par clé (block_id, name)) : relations de toutes les databases
+- Écritures par lots via /api/transactions (AttrBatchWriter de l'import)
+- Les IDs introuvables sont gardés tels quels (une relance après l'import de
+  la database cible les résout) et comptés par database
+
+Idempotent : un ID déjà au format SiYuan est laissé tel quel.
+"""
+
+import os
+import re
+import json
+import argparse
+from typing import Dict
+
+from checkpoint_journal import CheckpointJournal
+from import_data_to_siyuan import AttrBatchWriter, PropertyConverter, SiYuanClient, Config as ImportConfig
+from notion_snapshot import get_snapshot, Config as SnapshotConfig
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    SIYUAN_URL = ImportConfig.SIYUAN_URL
+    SIYUAN_TOKEN = ImportConfig.SIYUAN_TOKEN
+    DRY_RUN = ImportConfig.DRY_RUN
+
+    # Lignes de la table attributes lues par requête SQL
+    RELATIONS_PAGE_SIZE = int(os.getenv("RELATIONS_PAGE_SIZE", "2000"))
+
+    OUTPUT_DIR = "migration_output"
+
+# Metadata posée par l'import sur chaque document
+DB_ATTR = "custom-notion-db"
+
+SIYUAN_ID = re.compile(r"^\d{14}-[0-9a-z]{7}$")
+
+# =============================================================================
+# RECONNEXION
+# =============================================================================
+
+def normalize_id(notion_id: str) -> str:
+    """ID Notion sans tirets ni majuscules (les deux formes circulent)"""
+    return notion_id.strip().replace("-", "").lower()
+
+
+def sql_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class RelationReconnector:
+    """Résout les relations Notion → SiYuan en une passe sur les attributes"""
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.siyuan_client = SiYuanClient(Config.SIYUAN_URL, Config.SIYUAN_TOKEN)
+        self.attr_writer = None
+
+        self.id_map: Dict[str, str] = {}               # ID Notion normalisé → block SiYuan
+        self.relation_attrs: Dict[str, frozenset] = {}  # titre de database → attributes relation
+
+        # Compteurs par database (titre)
+        self.stats: Dict[str, Dict] = {}
+        self.totals = {"documents": 0, "attrs_rewritten": 0, "sql_queries": 0}
+
+    def run(self):
+        print("\n" + "="*80)
+        print("🔗 RECONNEXION DES RELATIONS NOTION → SIYUAN")
+        print("="*80 + "\n")
+        print(f"Mode: {'🧪 DRY RUN' if self.dry_run else '⚡ ÉCRITURE'}")
+
+        if not self._load_plan() or not self._load_mapping():
+            return
+
+        relation_count = sum(len(attrs) for attrs in self.relation_attrs.values())
+        if not relation_count:
+            print("✅ Aucune propriété relation dans le plan")
+            return
+        print(f"🔗 {relation_count} propriétés relation dans {len(self.relation_attrs)} databases")
+        print(f"🗂️  {len(self.id_map)} entrées dans le mapping Notion → SiYuan\n")
+
+        if not self.dry_run:
+            self.attr_writer = AttrBatchWriter(
+                self.siyuan_client, ImportConfig.ATTR_BATCH_SIZE, ImportConfig.ATTR_FLUSH_INTERVAL
+            )
+
+        try:
+            for block_id, attrs in self._iter_documents():
+                self._reconnect(block_id, attrs)
+        except KeyboardInterrupt:
+            print("\n⚠️  Interrompu - la passe peut être relancée (idempotente)")
+        finally:
+            if self.attr_writer:
+                self.attr_writer.close()
+                failed = self.attr_writer.take_failures()
+                if failed:
+                    print(f"❌ {len(failed)} documents non mis à jour (écriture des attributes)")
+                    self.totals["write_failures"] = len(failed)
+
+        self._display_report()
+
+    def _load_plan(self) -> bool:
+        """Attributes relation par database, depuis le plan (ou celui du snapshot)"""
+        plan_file = os.path.join(Config.OUTPUT_DIR, "migration_plan.json")
+        snapshot = get_snapshot()
+        if snapshot and os.path.exists(snapshot.plan_file):
+            plan_file = snapshot.plan_file
+        if not os.path.exists(plan_file):
+            print(f"❌ Fichier {plan_file} introuvable")
+            return False
+
+        with open(plan_file) as f:
+            plan = json.load(f)
+
+        # Les documents ne portent que le titre de leur database (custom-notion-db) :
+        # deux databases homonymes ne se distinguent pas, leurs relations sont fusionnées
+        titles: Dict[str, int] = {}
+        for db_info in plan["databases"]:
+            title = db_info["title"]
+            titles[title] = titles.get(title, 0) + 1
+            attrs = frozenset(
+                PropertyConverter.attr_name(prop["name"])
+                for prop in db_info["properties"] if prop.get("notion_type") == "relation"
+            )
+            if attrs:
+                self.relation_attrs[title] = self.relation_attrs.get(title, frozenset()) | attrs
+
+        for title, count in sorted(titles.items()):
+            if count > 1 and title in self.relation_attrs:
+                print(f"⚠️  {count} databases nommées \"{title}\" : leurs propriétés relation sont "
+                      f"traitées ensemble ({', '.join(sorted(self.relation_attrs[title]))})")
+        return True
+
+    def _load_mapping(self) -> bool:
+        """Mapping complet chargé une fois (rapport d'import + journal de checkpoints)"""
+        mapping = {}
+        mapping_file = os.path.join(Config.OUTPUT_DIR, "import_mapping.json")
+        if os.path.exists(mapping_file):
+            with open(mapping_file) as f:
+                mapping.update(json.load(f).get("notion_to_siyuan", {}))
+
+        journal = CheckpointJournal(os.path.join(Config.OUTPUT_DIR, "import_journal.jsonl"))
+        journal.load()
+        mapping.update(journal.completed_mapping())
+
+        if not mapping:
+            print(f"❌ Aucun mapping : lance d'abord l'import ({mapping_file})")
+            return False
+
+        self.id_map = {normalize_id(notion_id): block_id for notion_id, block_id in mapping.items()}
+        return True
+
+    def _iter_rows(self):
+        """
+        Lignes (block_id, name, value) des attributes utiles, triées par
+        (block_id, name) et paginées par clé : chaque requête reprend après
+        la dernière ligne lue, sans OFFSET (coût constant par page).
+        """
+        names = {DB_ATTR}
+        for attrs in self.relation_attrs.values():
+            names.update(attrs)
+        name_list = ", ".join(sql_quote(name) for name in sorted(names))
+        page_size = max(1, Config.RELATIONS_PAGE_SIZE)
+
+        last_block, last_name = "", ""
+        while True:
+            stmt = (
+                f"SELECT block_id, name, value FROM attributes WHERE name IN ({name_list}) "
+                f"AND (block_id > {sql_quote(last_block)} OR "
+                f"(block_id = {sql_quote(last_block)} AND name > {sql_quote(last_name)})) "
+                f"ORDER BY block_id, name LIMIT {page_size}"
+            )
+            rows = self.siyuan_client.query_sql(stmt)
+            self.totals["sql_queries"] += 1
+            if rows is None:
+                raise RuntimeError("Requête /api/query/sql en échec")
+
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last_block, last_name = rows[-1]["block_id"], rows[-1]["name"]
+
+    def _iter_documents(self):
+        """Regroupe les lignes par bloc (elles arrivent triées) : (block_id, {name: value})"""
+        current_id, attrs = None, {}
+        for row in self._iter_rows():
+            if row["block_id"] != current_id:
+                if current_id is not None:
+                    yield current_id, attrs
+                current_id, attrs = row["block_id"], {}
+            attrs[row["name"]] = row["value"]
+        if current_id is not None:
+            yield current_id, attrs
+
+    def _db_stats(self, db_title: str) -> Dict:
+        stats = self.stats.get(db_title)
+        if stats is None:
+            stats = self.stats[db_title] = {
+                "documents": 0, "relations": 0, "resolved": 0,
+                "already_resolved": 0, "unresolved": 0, "missing_targets": {}
+            }
+        return stats
+
+    def _reconnect(self, block_id: str, attrs: Dict[str, str]):
+        db_title = attrs.get(DB_ATTR)
+        relation_attrs = self.relation_attrs.get(db_title)
+        if not relation_attrs:
+            return  # Document hors migration, ou database sans relation
+
+        stats = self._db_stats(db_title)
+        stats["documents"] += 1
+        self.totals["documents"] += 1
+
+        changes = {}
+        for name in relation_attrs:
+            value = attrs.get(name)
+            if not value:
+                continue
+
+            resolved = []
+            for target in value.split(","):
+                target = target.strip()
+                if not target:
+                    continue
+                stats["relations"] += 1
+                if SIYUAN_ID.match(target):
+                    stats["already_resolved"] += 1
+                    resolved.append(target)
+                    continue
+
+                siyuan_id = self.id_map.get(normalize_id(target))
+                if siyuan_id:
+                    stats["resolved"] += 1
+                    resolved.append(siyuan_id)
+                else:
+                    stats["unresolved"] += 1
+                    missing = stats["missing_targets"]
+                    missing[target] = missing.get(target, 0) + 1
+                    resolved.append(target)
+
+            new_value = ",".join(resolved)
+            if new_value != value:
+                changes[name] = new_value
+
+        if changes:
+            self.totals["attrs_rewritten"] += len(changes)
+            if self.attr_writer:
+                self.attr_writer.add(block_id, changes, tag=db_title)
+
+    def _display_report(self):
+        print("\n" + "="*80)
+        print("📊 RAPPORT DE RECONNEXION")
+        print("="*80)
+
+        for db_title, stats in sorted(self.stats.items()):
+            status = "✅" if not stats["unresolved"] else "⚠️ "
+            print(f"{status} {db_title}: {stats['resolved']} résolues, "
+                  f"{stats['already_resolved']} déjà reconnectées, {stats['unresolved']} introuvables "
+                  f"({len(stats['missing_targets'])} cibles distinctes) sur {stats['documents']} documents")
+
+        print(f"\n📄 Documents parcourus: {self.totals['documents']} ({self.totals['sql_queries']} requêtes SQL)")
+        verb = "à réécrire" if self.dry_run else "réécrits"
+        print(f"🔗 Attributes relation {verb}: {self.totals['attrs_rewritten']}")
+        if self.attr_writer:
+            print(f"🏷️  Attributes: {self.attr_writer.requests_sent} requêtes d'écriture")
+
+        unresolved = sum(stats["unresolved"] for stats in self.stats.values())
+        if unresolved:
+            print(f"\n⚠️  {unresolved} relations vers des pages non importées : gardées en ID Notion,")
+            print("   relancer ce script après l'import des databases cibles")
+
+        # Rapport détaillé : les cibles manquantes les plus référencées par database
+        report_file = os.path.join(Config.OUTPUT_DIR, "relations_report.json")
+        report = {}
+        for db_title, stats in self.stats.items():
+            missing = sorted(stats["missing_targets"].items(), key=lambda item: -item[1])
+            report[db_title] = dict(
+                stats,
+                missing_targets=len(missing),
+                top_missing=[{"notion_id": target, "references": count} for target, count in missing[:50]]
+            )
+        with open(report_file, "w") as f:
+            json.dump({"databases": report, "totals": self.totals, "dry_run": self.dry_run}, f, indent=2)
+        print(f"\n💾 Rapport: {report_file}")
+        print("\n" + "="*80 + "\n")
+
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconnexion des relations Notion → SiYuan (Phase 4)")
+    parser.add_argument("--dry-run", action="store_true", default=Config.DRY_RUN,
+                        help="Compte les relations sans rien écrire (défaut: DRY_RUN)")
+    parser.add_argument("--snapshot", metavar="DIR", default=SnapshotConfig.NOTION_SNAPSHOT,
+                        help="Plan de migration lu dans un snapshot (notion_snapshot.py)")
+    args = parser.parse_args()
+    SnapshotConfig.NOTION_SNAPSHOT = args.snapshot
+
+    if not Config.SIYUAN_TOKEN:
+        print("❌ SIYUAN_TOKEN non défini")
+        return
+
+    RelationReconnector(dry_run=args.dry_run).run()
+
+
+if __name__ == "__main__":
+    main()
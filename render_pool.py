@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Rendu Markdown sur un pool de processus
+Étape de conversion séparée des I/O : arbre de blocs → Markdown sur tous les cœurs
+
+Avec un snapshot (ou un cache) local, le rendu est du CPU pur : dans les
+threads de l'import il est sérialisé par le GIL. RenderPool envoie les pages
+par lots à un ProcessPoolExecutor et rend les résultats dans l'ordre
+d'entrée, au fil de l'eau (fenêtre bornée de lots en vol) :
+
+- lot = RENDER_CHUNK_PAGES pages ou RENDER_CHUNK_BLOCKS blocs : un aller-retour
+  de pickling amorti sur beaucoup de petites pages, sans lot géant
+- une tâche est un arbre de blocs, ou l'id d'une page quand le snapshot a son
+  index (pages.idx) : le processus lit alors l'arbre lui-même (mmap), rien
+  n'est sérialisé à l'aller
+- une erreur de rendu ne concerne que sa page (rendue à None + message)
+
+Les processus sont lancés en "spawn" : le parent a déjà des threads (HTTP,
+écriture des attributes) qu'un fork copierait dans un état incohérent.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from snapshot_index import PackReader, iter_tree
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    # Processus de rendu (1 = rendu dans les threads de l'import, sans pool)
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+    # Taille des lots envoyés aux processus
+    RENDER_CHUNK_PAGES = int(os.getenv("RENDER_CHUNK_PAGES", "32"))
+    RENDER_CHUNK_BLOCKS = int(os.getenv("RENDER_CHUNK_BLOCKS", "2000"))
+
+# =============================================================================
+# CÔTÉ PROCESSUS
+# =============================================================================
+
+# État du processus de rendu, posé une fois par l'initializer
+_render: Optional[Callable] = None
+_pack: Optional[PackReader] = None
+
+
+def _init_worker(render: Callable, snapshot_dir: Optional[str]):
+    global _render, _pack
+    _render = render
+    if snapshot_dir and PackReader.exists(snapshot_dir):
+        _pack = PackReader(snapshot_dir)
+
+
+def _render_task(task):
+    """Une tâche : id de page (arbre lu dans le pack) ou objet passé tel quel au rendu"""
+    if isinstance(task, str):
+        return _render(_pack.blocks(task) if _pack else [])
+    return _render(task)
+
+
+def _render_chunk(tasks: List) -> List[Tuple]:
+    """(résultat, erreur) par tâche : une page en échec n'invalide pas le lot"""
+    results = []
+    for task in tasks:
+        try:
+            results.append((_render_task(task), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+# =============================================================================
+# POOL
+# =============================================================================
+
+def tree_size(tree) -> int:
+    """Poids d'une tâche pour le découpage en lots (nombre de blocs)"""
+    if isinstance(tree, list):
+        return sum(1 for _ in iter_tree(tree))
+    return 1
+
+
+class RenderPool:
+    """
+    Rendu ordonné sur un pool de processus.
+
+    `render` doit être picklable (fonction ou méthode de module) ; il reçoit un
+    arbre de blocs (ou l'objet de la tâche) et renvoie le Markdown.
+    """
+
+    def __init__(self, render: Callable, workers: int = None, snapshot_dir: Optional[str] = None,
+                 chunk_pages: int = None, chunk_blocks: int = None):
+        self.render = render
+        self.workers = max(1, Config.RENDER_WORKERS if workers is None else workers)
+        self.snapshot_dir = snapshot_dir
+        self.chunk_pages = max(1, chunk_pages or Config.RENDER_CHUNK_PAGES)
+        self.chunk_blocks = max(1, chunk_blocks or Config.RENDER_CHUNK_BLOCKS)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # Stats
+        self.pages = 0
+        self.chunks = 0
+        self.errors = 0
+
+    @property
+    def parallel(self) -> bool:
+        return self.workers > 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.render, self.snapshot_dir)
+            )
+        return self._executor
+
+    def _chunks(self, items: Iterable, task: Callable) -> Iterator[Tuple[List, List]]:
+        """(items, tâches) par lot ; une tâche None n'est pas rendue"""
+        items_chunk, tasks_chunk = [], []
+        blocks = 0
+        for item in items:
+            current = task(item)
+            items_chunk.append(item)
+            tasks_chunk.append(current)
+            if current is not None:
+                blocks += tree_size(current)
+            if len(items_chunk) >= self.chunk_pages or blocks >= self.chunk_blocks:
+                yield items_chunk, tasks_chunk
+                items_chunk, tasks_chunk = [], []
+                blocks = 0
+        if items_chunk:
+            yield items_chunk, tasks_chunk
+
+    def map(self, items: Iterable, task: Callable = lambda item: item) -> Iterator[Tuple]:
+        """
+        (item, markdown, erreur) dans l'ordre de `items`, au fil de l'eau.
+        `task(item)` donne l'arbre (ou l'id de page) à rendre, None pour ne
+        pas rendre l'item (markdown None).
+        """
+        if not self.parallel:
+            _init_worker(self.render, self.snapshot_dir)
+            for items_chunk, tasks_chunk in self._chunks(items, task):
+                yield from self._merge(items_chunk, tasks_chunk, _render_chunk(
+                    [current for current in tasks_chunk if current is not None]
+                ))
+            return
+
+        executor = self._get_executor()
+        # Fenêtre bornée : 2 lots en vol par processus, résultats pris dans l'ordre
+        pending = deque()
+        for items_chunk, tasks_chunk in self._chunks(items, task):
+            sent = [current for current in tasks_chunk if current is not None]
+            future = executor.submit(_render_chunk, sent) if sent else None
+            pending.append((items_chunk, tasks_chunk, future))
+            if len(pending) >= self.workers * 2:
+                yield from self._collect(pending.popleft())
+        while pending:
+            yield from self._collect(pending.popleft())
+
+    def _collect(self, chunk) -> Iterator[Tuple]:
+        items_chunk, tasks_chunk, future = chunk
+        yield from self._merge(items_chunk, tasks_chunk, future.result() if future else [])
+
+    def _merge(self, items_chunk: List, tasks_chunk: List, results: List[Tuple]) -> Iterator[Tuple]:
+        self.chunks += 1
+        results = iter(results)
+        for item, current in zip(items_chunk, tasks_chunk):
+            if current is None:
+                yield item, None, None
+                continue
+            markdown, error = next(results)
+            self.pages += 1
+            if error:
+                self.errors += 1
+            yield item, markdown, error
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
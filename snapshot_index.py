@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Accès aléatoire par id à un snapshot (mmap)
+Une page ou un sous-arbre de blocs lu par id sans parser le reste du snapshot
+
+Deux fichiers à côté des shards (construits par `notion_snapshot.py export`,
+ou `notion_snapshot.py index <répertoire>`) :
+
+    pages.pack   records {"entry", "blocks"} compressés un par un (zlib),
+                 chacun précédé de sa longueur (4 octets) : parcours séquentiel
+                 possible sans index
+    pages.idx    en-tête + entrées de taille fixe triées par id :
+                 id (16 octets, UUID binaire) | offset (8) | longueur (4) | type (1)
+                 Une entrée par page, et une par bloc (qui pointe sur sa page)
+
+Le lecteur mmap les deux fichiers : recherche dichotomique dans l'index,
+puis décompression du seul record visé. La mémoire du process ne dépend pas
+de la taille du snapshot (le cache de pages est celui de l'OS), ce qui permet
+les passes liens / relations sur 100k pages.
+"""
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# =============================================================================
+# FORMAT
+# =============================================================================
+
+MAGIC = b"NSIDX001"
+HEADER = struct.Struct(">8sQ")         # magic, nombre d'entrées
+ENTRY = struct.Struct(">16sQIB3x")     # id, offset, longueur, type (32 octets)
+LENGTH = struct.Struct(">I")           # préfixe des records de pages.pack
+
+KIND_PAGE = 0
+KIND_BLOCK = 1
+
+PACK_FILE = "pages.pack"
+INDEX_FILE = "pages.idx"
+
+# zlib 6 : la décompression coûte pareil quel que soit le niveau
+COMPRESSION = 6
+
+# Entrées d'index triées en mémoire à la fois (2 Mo), puis fusionnées depuis le disque
+RUN_ENTRIES = 65536
+
+
+def id_key(notion_id: str) -> bytes:
+    """Clé binaire d'un id Notion (avec ou sans tirets) ; hash pour un id non-UUID"""
+    try:
+        key = bytes.fromhex(notion_id.replace("-", ""))
+    except ValueError:
+        key = b""
+    if len(key) != 16:
+        key = hashlib.md5(notion_id.encode("utf-8")).digest()
+    return key
+
+
+def iter_tree(blocks: List[Dict]) -> Iterator[Dict]:
+    """Tous les blocs d'un arbre (enfants sous "children")"""
+    stack = list(blocks)
+    while stack:
+        block = stack.pop()
+        yield block
+        stack.extend(block.get("children") or [])
+
+# =============================================================================
+# ÉCRITURE
+# =============================================================================
+
+class PackWriter:
+    """
+    Écrit pages.pack au fil de l'eau, puis l'index trié à la fermeture.
+
+    Les entrées d'index s'accumulent dans un bytearray (32 octets chacune) ;
+    tous les RUN_ENTRIES, le lot est trié et écrit dans pages.idx.runs.
+    La fermeture fusionne ces runs : la mémoire reste bornée quel que soit
+    le nombre de blocs.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._pack = open(os.path.join(directory, PACK_FILE + ".tmp"), "wb")
+        self._runs_path = os.path.join(directory, INDEX_FILE + ".runs")
+        self._runs_file = open(self._runs_path, "w+b")
+        self._runs: List[Tuple[int, int]] = []  # (offset, nombre d'entrées) des runs triés
+        self._pending = bytearray()
+        self.entries = 0
+        self.pages = 0
+        self.blocks = 0
+
+    def add(self, record: Dict):
+        data = zlib.compress(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                             COMPRESSION)
+        offset = self._pack.tell() + LENGTH.size
+        self._pack.write(LENGTH.pack(len(data)))
+        self._pack.write(data)
+
+        self._add_entry(ENTRY.pack(id_key(record["entry"]["id"]), offset, len(data), KIND_PAGE))
+        self.pages += 1
+        for block in iter_tree(record.get("blocks") or []):
+            self._add_entry(ENTRY.pack(id_key(block["id"]), offset, len(data), KIND_BLOCK))
+            self.blocks += 1
+
+    def _add_entry(self, entry: bytes):
+        self._pending += entry
+        self.entries += 1
+        if len(self._pending) >= RUN_ENTRIES * ENTRY.size:
+            self._write_run()
+
+    def _write_run(self):
+        """Trie les entrées en attente et les écrit comme un run"""
+        if not self._pending:
+            return
+        # Tri sur les octets : l'id est en tête de chaque entrée
+        entries = sorted(self._pending[i:i + ENTRY.size] for i in range(0, len(self._pending), ENTRY.size))
+        self._runs_file.seek(0, os.SEEK_END)
+        self._runs.append((self._runs_file.tell(), len(entries)))
+        self._runs_file.write(b"".join(entries))
+        self._pending = bytearray()
+
+    def _iter_run(self, offset: int, count: int) -> Iterator[bytes]:
+        """Entrées d'un run, lues par blocs (les runs partagent le fichier : seek à chaque lecture)"""
+        end = offset + count * ENTRY.size
+        while offset < end:
+            self._runs_file.seek(offset)
+            chunk = self._runs_file.read(min(4096 * ENTRY.size, end - offset))
+            offset += len(chunk)
+            for i in range(0, len(chunk), ENTRY.size):
+                yield chunk[i:i + ENTRY.size]
+
+    def close(self):
+        self._pack.close()
+        self._write_run()
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(index_path + ".tmp", "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.entries))
+            for entry in heapq.merge(*(self._iter_run(offset, count) for offset, count in self._runs)):
+                f.write(entry)
+        self._runs_file.close()
+        os.remove(self._runs_path)
+        os.replace(os.path.join(self.directory, PACK_FILE + ".tmp"), os.path.join(self.directory, PACK_FILE))
+        os.replace(index_path + ".tmp", index_path)
+
+
+def build_pack(directory: str, records: Iterator[Dict]) -> Dict[str, int]:
+    """pages.pack + pages.idx depuis un flux de records {"entry", "blocks"}"""
+    writer = PackWriter(directory)
+    for record in records:
+        writer.add(record)
+    writer.close()
+    return {"pages": writer.pages, "blocks": writer.blocks}
+
+# =============================================================================
+# LECTURE
+# =============================================================================
+
+class PackReader:
+    """Lecture par id via l'index trié mmappé (thread-safe : lectures seules)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._files = []
+        self._index = self._map(INDEX_FILE)
+        self._pack = self._map(PACK_FILE)
+
+        magic, self.count = HEADER.unpack_from(self._index, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Index de snapshot invalide: {os.path.join(directory, INDEX_FILE)}")
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return all(os.path.exists(os.path.join(directory, name)) for name in (INDEX_FILE, PACK_FILE))
+
+    def _map(self, name: str):
+        f = open(os.path.join(self.directory, name), "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""  # Snapshot vide : mmap refuse les fichiers vides
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _find(self, notion_id: str) -> Optional[Tuple[int, int, int]]:
+        """(offset, longueur, type) par recherche dichotomique, None si absent"""
+        key = id_key(notion_id)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self._index[HEADER.size + mid * ENTRY.size:HEADER.size + mid * ENTRY.size + 16]
+            if current < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            found, offset, length, kind = ENTRY.unpack_from(self._index, HEADER.size + lo * ENTRY.size)
+            if found == key:
+                return offset, length, kind
+        return None
+
+    def _load(self, offset: int, length: int) -> Dict:
+        return json.loads(zlib.decompress(self._pack[offset:offset + length]))
+
+    def __contains__(self, notion_id: str) -> bool:
+        return self._find(notion_id) is not None
+
+    def record(self, notion_id: str) -> Optional[Dict]:
+        """Record de la page (ou de la page qui contient le bloc)"""
+        location = self._find(notion_id)
+        if location is None:
+            return None
+        return self._load(location[0], location[1])
+
+    def page(self, page_id: str) -> Optional[Dict]:
+        record = self.record(page_id)
+        return record["entry"] if record else None
+
+    def blocks(self, page_id: str) -> List[Dict]:
+        record = self.record(page_id)
+        return record["blocks"] if record else []
+
+    def subtree(self, block_id: str) -> Optional[Dict]:
+        """Un bloc et ses descendants (seule sa page est décompressée)"""
+        location = self._find(block_id)
+        if location is None or location[2] != KIND_BLOCK:
+            return None
+        record = self._load(location[0], location[1])
+        key = id_key(block_id)
+        return next((block for block in iter_tree(record["blocks"]) if id_key(block["id"]) == key), None)
+
+    def page_ids(self) -> Iterator[str]:
+        """Ids des pages dans l'ordre de l'index, sans rien décompresser"""
+        for position in range(HEADER.size, HEADER.size + self.count * ENTRY.size, ENTRY.size):
+            key, _, _, kind = ENTRY.unpack_from(self._index, position)
+            if kind == KIND_PAGE:
+                yield str(uuid.UUID(bytes=key))
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Parcours séquentiel de pages.pack (passes sur tout le snapshot, mémoire bornée)"""
+        position = 0
+        size = len(self._pack)
+        while position < size:
+            (length,) = LENGTH.unpack_from(self._pack, position)
+            position += LENGTH.size
+            yield self._load(position, length)
+            position += length
+
+    def close(self):
+        for mapped in (self._index, self._pack):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for f in self._files:
+            f.close()
@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Notion to SiYuan - Écriture directe des documents .sy (chargement initial)
+Alternative hors ligne à /api/filetree/createDocWithMd : aucun appel SiYuan
+
+L'import crée chaque entrée par l'API : SiYuan parse le Markdown côté
+serveur, un document à la fois, puis pose les attributes. Pour remplir un
+notebook vide, ce script écrit directement l'arbre de blocs natif de
+SiYuan (JSON .sy) :
+
+- un document par database, ses entrées en sous-documents
+  (<notebook>/<doc_db>.sy, <notebook>/<doc_db>/<doc_entrée>.sy)
+- IDs de blocs générés (format SiYuan AAAAMMJJhhmmss-xxxxxxx, uniques)
+- IAL du document = attributes custom-* de l'import (propriétés,
+  custom-notion-id, custom-notion-db) : reconnect_relations.py fonctionne tel quel
+- blocs Notion convertis en nœuds SiYuan (listes, to-dos, citations, code,
+  équations, tableaux, colonnes en super blocs...), rich text en text marks
+
+Sortie : le répertoire du notebook (SiYuan arrêté, puis "Reconstruire
+l'index" au redémarrage), ou une archive .sy.zip à importer depuis SiYuan
+(Importer → SiYuan .sy.zip). Le mapping Notion → SiYuan est ajouté à
+migration_output/import_mapping.json comme après un import par l'API :
+directement en sortie notebook ; pour une archive, SiYuan donne de nouveaux
+IDs à tous les blocs importés, le mapping est donc relu après l'import
+(--rebuild-mapping, attribute custom-notion-id via /api/query/sql).
+
+Usage :
+    python3 sy_writer.py --output /siyuan/data/20250101000000-abcdefg --snapshot migration_output/snapshot
+    python3 sy_writer.py --output migration_output/notion.sy.zip
+    python3 sy_writer.py --rebuild-mapping   # après l'import de l'archive dans SiYuan
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import time
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from import_data_to_siyuan import NotionClient, PropertyConverter, SiYuanClient, Config as ImportConfig
+from notion_renderer import LIST_TYPES, MEDIA_TYPES, notion_url, plain_text
+from notion_snapshot import Config as SnapshotConfig
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+class Config:
+    SY_OUTPUT = os.getenv("SY_OUTPUT", "migration_output/notion.sy.zip")  # Notebook (répertoire) ou .sy.zip
+    TEST_LIMIT = ImportConfig.TEST_LIMIT
+    OUTPUT_DIR = "migration_output"
+
+    # Racine des documents dans l'archive .sy.zip
+    ZIP_ROOT = "Notion"
+
+    # Lignes de la table attributes lues par requête SQL (--rebuild-mapping)
+    MAPPING_PAGE_SIZE = int(os.getenv("MAPPING_PAGE_SIZE", "2000"))
+
+ID_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# =============================================================================
+# IDS DE BLOCS
+# =============================================================================
+
+class BlockIds:
+    """
+    IDs au format SiYuan : horodatage du run + 7 caractères base 36.
+    Suffixe = compteur depuis un départ aléatoire : unique sur 36^7 blocs.
+    """
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.stamp = (now or datetime.now()).strftime("%Y%m%d%H%M%S")
+        self._next = random.randrange(36 ** 7 // 2)
+
+    def next(self) -> str:
+        value = self._next
+        self._next += 1
+        suffix = []
+        for _ in range(7):
+            value, digit = divmod(value, 36)
+            suffix.append(ID_ALPHABET[digit])
+        return f"{self.stamp}-{''.join(reversed(suffix))}"
+
+
+def b64(text: str) -> str:
+    """Champs []byte de Lute (sérialisés en base64 dans le .sy)"""
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+# =============================================================================
+# RICH TEXT → NŒUDS INLINE
+# =============================================================================
+
+# Annotation Notion → TextMarkType SiYuan (combinés par des espaces)
+MARKS = (("code", "code"), ("bold", "strong"), ("italic", "em"), ("strikethrough", "s"), ("underline", "u"))
+
+
+def inline_nodes(segments: List[Dict]) -> List[Dict]:
+    """Rich text Notion → NodeText / NodeTextMark"""
+    nodes = []
+    for segment in segments:
+        text = segment.get("plain_text", "")
+        if not text:
+            continue
+        segment_type = segment.get("type")
+
+        if segment_type == "equation":
+            nodes.append({"Type": "NodeTextMark", "TextMarkType": "inline-math",
+                          "TextMarkInlineMathContent": segment["equation"]["expression"]})
+            continue
+
+        href = segment.get("href")
+        if segment_type == "mention":
+            mention = segment.get("mention") or {}
+            mention_type = mention.get("type")
+            if mention_type in ("page", "database"):
+                href = notion_url(mention[mention_type]["id"])  # link_rewriter.py le résout
+            elif mention_type == "user":
+                href = None
+                text = text if text.startswith("@") else f"@{text}"
+
+        annotations = segment.get("annotations") or {}
+        types = [mark for key, mark in MARKS if annotations.get(key)]
+        if href:
+            types.append("a")
+        if not types:
+            nodes.append({"Type": "NodeText", "Data": text})
+            continue
+
+        node = {"Type": "NodeTextMark", "TextMarkType": " ".join(types), "TextMarkTextContent": text}
+        if href:
+            node["TextMarkAHref"] = href
+        nodes.append(node)
+    return nodes
+
+# =============================================================================
+# BLOCS NOTION → NŒUDS SIYUAN
+# =============================================================================
+
+class SyBuilder:
+    """Arbre de blocs Notion → nœuds de blocs SiYuan (même découpage que notion_renderer)"""
+
+    HANDLERS = {
+        "paragraph": "_paragraph",
+        "heading_1": "_heading",
+        "heading_2": "_heading",
+        "heading_3": "_heading",
+        "quote": "_quote",
+        "callout": "_quote",
+        "code": "_code",
+        "equation": "_equation",
+        "divider": "_divider",
+        "table": "_table",
+        "column_list": "_columns",
+        "synced_block": "_container",
+        "column": "_container",
+        "child_page": "_child_page",
+        "child_database": "_child_page",
+        "link_to_page": "_link_to_page",
+        **{media_type: "_media" for media_type in MEDIA_TYPES},
+    }
+
+    def __init__(self, ids: BlockIds):
+        self.ids = ids
+        self.blocks = 0
+
+    def _node(self, node_type: str, children: Optional[List[Dict]] = None, **fields) -> Dict:
+        block_id = self.ids.next()
+        self.blocks += 1
+        node = {"ID": block_id, "Type": node_type}
+        node.update(fields)
+        node["Properties"] = {"id": block_id, "updated": self.ids.stamp}
+        if children is not None:
+            node["Children"] = children
+        return node
+
+    def _text_node(self, segments: List[Dict]) -> Dict:
+        return self._node("NodeParagraph", inline_nodes(segments))
+
+    def document(self, title: str, blocks: List[Dict], attrs: Dict[str, str]) -> Dict:
+        """Document .sy : IAL = titre + attributes custom-*"""
+        children = self.nodes(blocks)
+        if not children:
+            children = [self._node("NodeParagraph", [])]  # SiYuan attend au moins un bloc
+        doc = self._node("NodeDocument", children, Spec="1")
+        doc["Properties"].update(attrs)
+        doc["Properties"]["title"] = title
+        doc["Properties"]["type"] = "doc"
+        return doc
+
+    def nodes(self, blocks: List[Dict]) -> List[Dict]:
+        out = []
+        self._append(out, blocks)
+        return out
+
+    def _append(self, out: List[Dict], blocks: List[Dict]):
+        """Blocs frères ; les items de liste consécutifs de même type forment un NodeList"""
+        current_list = None
+        current_kind = None
+        for block in blocks:
+            block_type = block.get("type")
+            data = block.get(block_type) or {}
+
+            if block_type in LIST_TYPES:
+                kind = "ordered" if block_type == "numbered_list_item" else "task" if block_type == "to_do" else "bullet"
+                if current_list is None or kind != current_kind:
+                    list_data = {"Typ": 1} if kind == "ordered" else {"Typ": 3} if kind == "task" else {}
+                    current_list, current_kind = self._node("NodeList", [], ListData=list_data), kind
+                    out.append(current_list)
+                current_list["Children"].append(
+                    self._list_item(block, data, kind, len(current_list["Children"]) + 1)
+                )
+                continue
+
+            current_list = current_kind = None
+            handler = DISPATCH.get(block_type)
+            if handler is not None:
+                handler(self, out, block, data)
+            elif data.get("rich_text"):
+                self._paragraph(out, block, data)  # Type inconnu : son texte, sinon ignoré
+
+    def _children(self, out: List[Dict], block: Dict):
+        children = block.get("children")
+        if children:
+            self._append(out, children)
+
+    # -------------------------------------------------------------------------
+    # Nœuds par type
+    # -------------------------------------------------------------------------
+
+    def _list_item(self, block: Dict, data: Dict, kind: str, number: int) -> Dict:
+        if kind == "ordered":
+            list_data = {"Typ": 1, "Delimiter": 46, "Marker": b64(f"{number}."), "Num": number}
+        else:
+            list_data = {"BulletChar": 42, "Marker": b64("*")}
+            if kind == "task":
+                list_data["Typ"] = 3
+
+        children = []
+        if kind == "task":
+            children.append({"Type": "NodeTaskListItemMarker", "TaskListItemChecked": bool(data.get("checked"))})
+        children.append(self._text_node(data.get("rich_text") or []))
+        self._children(children, block)
+
+        item = self._node("NodeListItem", children, ListData=list_data)
+        if block["type"] == "toggle" and block.get("children"):
+            item["Properties"]["fold"] = "1"  # Toggle : item replié
+        return item
+
+    def _paragraph(self, out: List[Dict], block: Dict, data: Dict):
+        segments = data.get("rich_text") or []
+        if segments:
+            out.append(self._text_node(segments))
+        self._children(out, block)
+
+    def _heading(self, out: List[Dict], block: Dict, data: Dict):
+        segments = data.get("rich_text") or []
+        if segments:
+            out.append(self._node("NodeHeading", inline_nodes(segments), HeadingLevel=int(block["type"][-1])))
+        self._children(out, block)  # Titre dépliable : contenu à la suite
+
+    def _quote(self, out: List[Dict], block: Dict, data: Dict):
+        segments = list(data.get("rich_text") or [])
+        if block["type"] == "callout":
+            icon = (data.get("icon") or {}).get("emoji")
+            if icon:
+                segments.insert(0, {"type": "text", "plain_text": f"{icon} "})
+        children = [{"Type": "NodeBlockquoteMarker", "Data": ">"}, self._text_node(segments)]
+        self._children(children, block)
+        out.append(self._node("NodeBlockquote", children))
+
+    def _code(self, out: List[Dict], block: Dict, data: Dict):
+        language = data.get("language") or ""
+        if language in ("plain text", "markup"):
+            language = ""
+        out.append(self._node("NodeCodeBlock", [
+            {"Type": "NodeCodeBlockFenceOpenMarker", "Data": "```", "CodeBlockFenceLen": 3},
+            {"Type": "NodeCodeBlockFenceInfoMarker", "CodeBlockInfo": b64(language)},
+            {"Type": "NodeCodeBlockCode", "Data": plain_text(data.get("rich_text") or [])},
+            {"Type": "NodeCodeBlockFenceCloseMarker", "Data": "```", "CodeBlockFenceLen": 3}
+        ], IsFencedCodeBlock=True, CodeBlockFenceChar=96, CodeBlockFenceLen=3,
+           CodeBlockOpenFence=b64("```"), CodeBlockInfo=b64(language), CodeBlockCloseFence=b64("```")))
+
+    def _equation(self, out: List[Dict], block: Dict, data: Dict):
+        out.append(self._node("NodeMathBlock", [
+            {"Type": "NodeMathBlockOpenMarker"},
+            {"Type": "NodeMathBlockContent", "Data": data.get("expression", "")},
+            {"Type": "NodeMathBlockCloseMarker"}
+        ]))
+
+    def _divider(self, out: List[Dict], block: Dict, data: Dict):
+        out.append(self._node("NodeThematicBreak"))
+
+    def _table(self, out: List[Dict], block: Dict, data: Dict):
+        rows = [row for row in block.get("children") or [] if row.get("type") == "table_row"]
+        if not rows:
+            return
+        width = data.get("table_width") or max(len(row["table_row"].get("cells") or []) for row in rows)
+
+        def row_node(row: Dict, cell_tag: str) -> Dict:
+            cells = row["table_row"].get("cells") or []
+            return {"Type": "NodeTableRow", "Data": "tr", "Children": [
+                {"Type": "NodeTableCell", "Data": cell_tag,
+                 "Children": inline_nodes(cells[col]) if col < len(cells) else []}
+                for col in range(width)
+            ]}
+
+        # SiYuan impose une ligne d'en-tête : la première ligne la tient
+        children = [{"Type": "NodeTableHead", "Data": "thead", "Children": [row_node(rows[0], "th")]}]
+        children.extend(row_node(row, "td") for row in rows[1:])
+        table = self._node("NodeTable", children, TableAligns=[0] * width)
+        table["Properties"]["colgroup"] = "|" * (width - 1)
+        out.append(table)
+
+    def _super_block(self, layout: str, children: List[Dict]) -> Dict:
+        return self._node("NodeSuperBlock", [
+            {"Type": "NodeSuperBlockOpenMarker"},
+            {"Type": "NodeSuperBlockLayoutMarker", "Data": layout},
+            *children,
+            {"Type": "NodeSuperBlockCloseMarker"}
+        ])
+
+    def _columns(self, out: List[Dict], block: Dict, data: Dict):
+        """column_list → super bloc en colonnes, une colonne = super bloc en lignes"""
+        columns = []
+        for column in block.get("children") or []:
+            content = self.nodes(column.get("children") or [])
+            if content:
+                columns.append(self._super_block("row", content))
+        if len(columns) > 1:
+            out.append(self._super_block("col", columns))
+        elif columns:
+            out.extend(columns[0]["Children"][2:-1])  # Une seule colonne : contenu à plat
+
+    def _container(self, out: List[Dict], block: Dict, data: Dict):
+        """Blocs synchronisés (colonne isolée) : seul le contenu compte"""
+        self._children(out, block)
+
+    def _link_paragraph(self, out: List[Dict], text: str, href: str):
+        out.append(self._node("NodeParagraph", [
+            {"Type": "NodeTextMark", "TextMarkType": "a", "TextMarkAHref": href, "TextMarkTextContent": text}
+        ]))
+
+    def _child_page(self, out: List[Dict], block: Dict, data: Dict):
+        icon = "📄" if block["type"] == "child_page" else "🗃️"
+        self._link_paragraph(out, f"{icon} {data.get('title') or 'Sans titre'}", notion_url(block["id"]))
+
+    def _link_to_page(self, out: List[Dict], block: Dict, data: Dict):
+        target = data.get(data.get("type") or "page_id")
+        if target:
+            self._link_paragraph(out, "→", notion_url(target))
+
+    def _media(self, out: List[Dict], block: Dict, data: Dict):
+        url = data.get("url")  # bookmark, embed, link_preview
+        if not url and data.get("type"):
+            url = (data.get(data["type"]) or {}).get("url")  # Fichiers : external / file
+        if not url:
+            return
+        caption = plain_text(data.get("caption") or []) or data.get("name") or ""
+        if block["type"] != "image":
+            self._link_paragraph(out, caption or url, url)
+            return
+        out.append(self._node("NodeParagraph", [{"Type": "NodeImage", "Data": "span", "Children": [
+            {"Type": "NodeBang"}, {"Type": "NodeOpenBracket"},
+            {"Type": "NodeLinkText", "Data": caption}, {"Type": "NodeCloseBracket"},
+            {"Type": "NodeOpenParen"}, {"Type": "NodeLinkDest", "Data": url}, {"Type": "NodeCloseParen"}
+        ]}]))
+
+
+# Méthodes résolues une fois pour toutes (pas de getattr par bloc)
+DISPATCH = {block_type: getattr(SyBuilder, name) for block_type, name in SyBuilder.HANDLERS.items()}
+
+# =============================================================================
+# SORTIE (RÉPERTOIRE DE NOTEBOOK OU .sy.zip)
+# =============================================================================
+
+class SyWriter:
+    """Écrit les .sy sous un notebook, ou dans une archive .sy.zip"""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.is_zip = output.endswith(".zip")
+        self.files = 0
+        self.bytes = 0
+        if self.is_zip:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            self._zip = zipfile.ZipFile(output + ".tmp", "w", zipfile.ZIP_DEFLATED, compresslevel=6)
+        else:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, path: List[str], document: Dict):
+        """`path` : IDs des documents parents puis celui du document"""
+        data = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        relative = "/".join(path) + ".sy"
+        if self.is_zip:
+            self._zip.writestr(f"{Config.ZIP_ROOT}/{relative}", data)
+        else:
+            target = os.path.join(self.output, *path) + ".sy"
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+        self.files += 1
+        self.bytes += len(data)
+
+    def close(self):
+        if self.is_zip:
+            self._zip.close()
+            os.replace(self.output + ".tmp", self.output)
+
+    def abort(self):
+        if self.is_zip:
+            self._zip.close()
+            os.remove(self.output + ".tmp")
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+class SyExporter:
+    """Plan de migration → un document par database, un sous-document par entrée"""
+
+    def __init__(self, output: str):
+        self.notion_client = NotionClient(ImportConfig.NOTION_TOKEN)
+        self.ids = BlockIds()
+        self.builder = SyBuilder(self.ids)
+        self.writer = SyWriter(output)
+        self.notion_to_siyuan: Dict[str, str] = {}
+        self.stats = {"databases": 0, "documents": 0, "errors": 0}
+
+    def run(self, plan_file: str):
+        print("\n" + "="*80)
+        print("📝 ÉCRITURE DIRECTE DES DOCUMENTS .sy")
+        print("="*80 + "\n")
+        print(f"Sortie: {self.writer.output}{' (archive)' if self.writer.is_zip else ' (notebook)'}")
+
+        snapshot = self.notion_client.snapshot
+        if snapshot and os.path.exists(snapshot.plan_file):
+            plan_file = snapshot.plan_file
+        with open(plan_file) as f:
+            databases = json.load(f)["databases"]
+        print(f"📊 {len(databases)} databases\n")
+
+        start = time.perf_counter()
+        try:
+            for idx, db_info in enumerate(databases, 1):
+                print(f"[{idx}/{len(databases)}] 📁 {db_info['title']}")
+                self._write_database(db_info)
+        except BaseException:
+            self.writer.abort()
+            raise
+        self.writer.close()
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        if self.writer.is_zip:
+            # IDs régénérés par SiYuan à l'import de l'archive : mapping relu après coup
+            print("\n⚠️  Mapping non écrit : SiYuan attribue de nouveaux IDs aux blocs d'une archive")
+        else:
+            self._save_mapping()
+        print("\n" + "="*80)
+        print(f"✅ {self.stats['documents']} documents, {self.builder.blocks} blocs, "
+              f"{self.stats['databases']} databases en {elapsed:.1f}s "
+              f"({self.stats['documents'] / elapsed:.0f} docs/s, {self.writer.bytes / 1024 / 1024:.1f} Mo)")
+        if self.stats["errors"]:
+            print(f"❌ {self.stats['errors']} entrées en erreur")
+        if self.writer.is_zip:
+            print(f"📦 Importer dans SiYuan : Importer → SiYuan .sy.zip → {self.writer.output}")
+            print("🗂️  Puis : python3 sy_writer.py --rebuild-mapping (mapping Notion → SiYuan)")
+        else:
+            print("🔄 Redémarrer SiYuan puis Paramètres → À propos → Reconstruire l'index")
+        print("🔗 Ensuite : reconnect_relations.py (relations), link_rewriter.py (liens)")
+        print("="*80 + "\n")
+
+    def _write_database(self, db_info: Dict):
+        plan = PropertyConverter.compile_plan(db_info)
+        db_doc = self.builder.document(db_info["title"], [], {"custom-notion-id": db_info["id"]})
+        db_doc_id = db_doc["ID"]
+        self.writer.write([db_doc_id], db_doc)
+        self.notion_to_siyuan[db_info["id"]] = db_doc_id  # Liens vers la database
+
+        count = 0
+        for entry in self.notion_client.iter_database(db_info["id"], limit=Config.TEST_LIMIT):
+            try:
+                tree = self.notion_client.get_block_tree(entry["id"], last_edited_time=entry.get("last_edited_time"))
+                document = self.builder.document(plan.title(entry), tree, plan.convert(entry))
+                self.writer.write([db_doc_id, document["ID"]], document)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"   ❌ Entrée {entry['id'][:8]}: {e}")
+                continue
+            self.notion_to_siyuan[entry["id"]] = document["ID"]
+            count += 1
+
+        self.stats["databases"] += 1
+        self.stats["documents"] += count + 1
+        print(f"   ✅ {count} entrées")
+
+    def _save_mapping(self):
+        """Mapping ajouté à import_mapping.json (reconnect_relations.py, link_rewriter.py)"""
+        save_mapping(self.notion_to_siyuan, dict(self.stats, output=self.writer.output, blocks=self.builder.blocks))
+
+
+def save_mapping(notion_to_siyuan: Dict[str, str], report: Dict):
+    """Fusionne le mapping dans import_mapping.json (rapport sous la clé sy_writer)"""
+    mapping_file = os.path.join(Config.OUTPUT_DIR, "import_mapping.json")
+    data = {"notion_to_siyuan": {}}
+    if os.path.exists(mapping_file):
+        with open(mapping_file) as f:
+            data = json.load(f)
+    data.setdefault("notion_to_siyuan", {}).update(notion_to_siyuan)
+    data["sy_writer"] = report
+
+    os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+    with open(mapping_file, "w") as f:
+        json.dump(data, f, indent=2)
+    print(f"\n💾 Mapping: {mapping_file} ({len(notion_to_siyuan)} IDs)")
+
+
+def rebuild_mapping() -> Optional[Dict[str, str]]:
+    """
+    Mapping Notion → SiYuan relu dans SiYuan après l'import d'une archive :
+    attribute custom-notion-id de chaque document, pagination par clé
+    """
+    client = SiYuanClient(ImportConfig.SIYUAN_URL, ImportConfig.SIYUAN_TOKEN)
+    page_size = max(1, Config.MAPPING_PAGE_SIZE)
+    mapping = {}
+    last_block = ""
+    while True:
+        rows = client.query_sql(
+            "SELECT block_id, value FROM attributes WHERE name = 'custom-notion-id' "
+            f"AND block_id > '{last_block}' ORDER BY block_id LIMIT {page_size}"
+        )
+        if rows is None:
+            print("❌ Requête /api/query/sql en échec")
+            return None
+        for row in rows:
+            mapping[row["value"]] = row["block_id"]
+        if len(rows) < page_size:
+            return mapping
+        last_block = rows[-1]["block_id"]
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Écrit les entrées Notion en documents .sy (sans API SiYuan)")
+    parser.add_argument("--output", default=Config.SY_OUTPUT,
+                        help=f"Répertoire du notebook, ou archive .sy.zip (défaut: {Config.SY_OUTPUT})")
+    parser.add_argument("--plan", default=os.path.join(Config.OUTPUT_DIR, "migration_plan.json"))
+    parser.add_argument("--snapshot", metavar="DIR", default=SnapshotConfig.NOTION_SNAPSHOT,
+                        help="Lit Notion depuis un snapshot (notion_snapshot.py export)")
+    parser.add_argument("--force", action="store_true", help="Écrit même si le notebook contient déjà des documents")
+    parser.add_argument("--rebuild-mapping", action="store_true",
+                        help="Relit le mapping dans SiYuan après l'import d'une archive .sy.zip")
+    args = parser.parse_args()
+    SnapshotConfig.NOTION_SNAPSHOT = args.snapshot
+
+    if args.rebuild_mapping:
+        if not ImportConfig.SIYUAN_TOKEN:
+            print("❌ SIYUAN_TOKEN non défini")
+            return
+        mapping = rebuild_mapping()
+        if mapping is not None:
+            save_mapping(mapping, {"rebuilt_from": ImportConfig.SIYUAN_URL, "documents": len(mapping)})
+        return
+
+    if not ImportConfig.NOTION_TOKEN and not args.snapshot and not ImportConfig.NOTION_FIXTURES:
+        print("❌ NOTION_TOKEN non défini")
+        return
+    if not os.path.exists(args.plan) and not args.snapshot:
+        print(f"❌ Fichier {args.plan} introuvable")
+        return
+
+    # Chargement initial : un notebook déjà rempli serait dupliqué
+    if not args.output.endswith(".zip") and os.path.isdir(args.output) and not args.force:
+        if any(name.endswith(".sy") for name in os.listdir(args.output)):
+            print(f"❌ {args.output} contient déjà des documents (--force pour écrire quand même)")
+            return
+
+    SyExporter(args.output).run(args.plan)
+
+
+if __name__ == "__main__":
+    main()